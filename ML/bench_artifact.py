@@ -0,0 +1,118 @@
+"""
+Model load benchmark: joblib pickle against the memory-mapped artifact.
+
+Each format is loaded in fresh interpreters, several at once, so the
+report shows load time, first-prediction time and how much of each process's
+memory is private versus shared with the other workers (from
+/proc/self/smaps_rollup, Linux only).
+
+Usage: python bench_artifact.py [--model student_dropout_model.pkl] [--workers 4]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+from student_dropout_predictor import StudentDropoutPredictor
+import_seconds = time.perf_counter() - start
+
+predictor = StudentDropoutPredictor()
+start = time.perf_counter()
+if sys.argv[1] == 'artifact':
+    predictor.load_artifact(sys.argv[2], verify=sys.argv[3] == '1')
+else:
+    predictor.load_model(sys.argv[2], compile=sys.argv[3] == '1')
+load_seconds = time.perf_counter() - start
+
+X = predictor.transform.assemble([{'avg_assignment_grade': 60.0, 'attendance_trend': -0.2, 'avg_attendance': 70.0}])
+start = time.perf_counter()
+predictor.generate_predictions(X)
+first_prediction_seconds = time.perf_counter() - start
+
+memory = {}
+try:
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            if name in ('Rss', 'Pss', 'Private_Clean', 'Private_Dirty', 'Shared_Clean'):
+                memory[name] = int(value.split()[0]) / 1024
+except OSError:
+    pass
+
+# Wait for the other workers before exiting so shared pages are counted
+sys.stdin.read()
+print(json.dumps({
+    'load_seconds': load_seconds,
+    'first_prediction_seconds': first_prediction_seconds,
+    'memory_mb': memory,
+}))
+'''
+
+
+def measure(kind, path, option, workers):
+    """
+    Load path in `workers` concurrent interpreters; returns their results.
+    """
+    processes = [
+        subprocess.Popen([sys.executable, '-c', _PROBE, kind, path, '1' if option else '0'],
+                         cwd=ML_DIR, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        for _ in range(workers)
+    ]
+    results = []
+    for process in processes:
+        output, _ = process.communicate('')
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return results
+
+
+def run(model_path, workers=4):
+    """
+    Return {format label: [per-worker results]} for the pickle and an
+    artifact converted from it.
+    """
+    sys.path.insert(0, ML_DIR)
+    from student_dropout_predictor import StudentDropoutPredictor
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        artifact_path = os.path.join(tmp_dir, 'model.mmap')
+        predictor = StudentDropoutPredictor()
+        predictor.load_model(model_path)
+        predictor.save_artifact(artifact_path)
+
+        return {
+            'joblib pickle': measure('pickle', model_path, False, workers),
+            'joblib + compile': measure('pickle', model_path, True, workers),
+            'artifact (verified)': measure('artifact', artifact_path, True, workers),
+            'artifact': measure('artifact', artifact_path, False, workers),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', default=os.path.join(ML_DIR, 'student_dropout_model.pkl'))
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    results = run(os.path.abspath(args.model), args.workers)
+    print(f"{'format':<22}{'load ms':>10}{'1st pred ms':>13}{'RSS MB':>9}{'PSS MB':>9}{'private MB':>12}")
+    for label, workers in results.items():
+        def mean(values):
+            return sum(values) / len(values)
+        memory = [w['memory_mb'] for w in workers]
+        private = [m.get('Private_Clean', 0) + m.get('Private_Dirty', 0) for m in memory]
+        print(f"{label:<22}{mean([w['load_seconds'] for w in workers]) * 1000:>10.1f}"
+              f"{mean([w['first_prediction_seconds'] for w in workers]) * 1000:>13.2f}"
+              f"{mean([m.get('Rss', 0) for m in memory]):>9.1f}{mean([m.get('Pss', 0) for m in memory]):>9.1f}"
+              f"{mean(private):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Latency benchmark of the NumPy-compiled tree ensembles against the library
+estimators' predict_proba, for every model family of train_models.
+
+Usage: python bench_compiled.py [--rows 1 100 10000] [--repeat 50]
+"""
+
+import argparse
+
+import numpy as np
+
+from bench_prediction import fit_candidates, time_call
+from tree_ensemble import compile_ensemble
+
+
+def run(row_counts=(1, 100, 10000), repeat=50):
+    """
+    Return {model name: {rows: (library_seconds, compiled_seconds, max_abs_diff)}}.
+    """
+    models, X = fit_candidates()
+    X = X.to_numpy()
+
+    results = {}
+    for name, model in models.items():
+        compiled = compile_ensemble(model)
+        results[name] = {}
+        for rows in row_counts:
+            X_batch = np.resize(X, (rows, X.shape[1]))
+            diff = np.abs(compiled.predict_proba(X_batch) - model.predict_proba(X_batch)[:, 1]).max()
+            results[name][rows] = (
+                time_call(lambda: model.predict_proba(X_batch), repeat),
+                time_call(lambda: compiled.predict_proba(X_batch), repeat),
+                float(diff),
+            )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1, 100, 10000])
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    results = run(args.rows, args.repeat)
+    print(f"{'model':<20}{'rows':>8}{'library us':>13}{'compiled us':>13}{'speedup':>9}{'max diff':>11}")
+    for name, by_rows in results.items():
+        for rows, (library, compiled, diff) in by_rows.items():
+            print(f"{name:<20}{rows:>8}{library * 1e6:>13.1f}{compiled * 1e6:>13.1f}"
+                  f"{library / compiled:>8.1f}x{diff:>11.1e}")
+
+
+if __name__ == "__main__":
+    main()
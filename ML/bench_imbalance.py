@@ -0,0 +1,128 @@
+"""
+Class-imbalance strategy benchmark for train_models.
+
+For each strategy in imbalance.STRATEGIES, and for the previous approach
+of SMOTE over the whole training split before the CV split ('smote-leaky'),
+reports resampling time, fit time over the folds and the full fit, the
+peak traced memory of resampling and fitting (the resampled folds, SMOTE's
+neighbour search and the models' fit-time allocations), the mean CV AUC
+and the AUC on the held-out test split. As in bench_suite.py, the timed
+runs are repeated once under tracemalloc for the memory figure. CV scores of the per-fold
+strategies are honest: validation folds contain real rows only.
+
+Usage: python bench_imbalance.py [--students 20000] [--models "Random Forest" LightGBM]
+       [--cv 5] [--seed 0]
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+
+def prepare(n_students, seed):
+    """Scaled features and target of a synthetic cohort, split like train_models"""
+    import contextlib
+    import io
+    from sklearn.model_selection import train_test_split
+    from student_dropout_predictor import StudentDropoutPredictor
+
+    predictor = StudentDropoutPredictor()
+    with contextlib.redirect_stdout(io.StringIO()):
+        X, y = predictor.preprocess_data(predictor._generate_synthetic_data(n_students, seed))
+    return train_test_split(X.to_numpy(), y.to_numpy(), test_size=0.2, random_state=seed, stratify=y)
+
+
+def resample_folds(strategy, X_train, y_train, cv, leaky=False):
+    """
+    ((X, y, w) for the full fit, [(X, y, w, X_eval, y_eval)] per fold).
+    leaky resamples once and then splits the resampled rows into folds.
+    """
+    from sklearn.model_selection import StratifiedKFold
+
+    full = strategy.resample(X_train, y_train)
+    if leaky:
+        X, y, _ = full
+        return full, [(X[t], y[t], None, X[e], y[e]) for t, e in StratifiedKFold(n_splits=cv).split(X, y)]
+    return full, [(*strategy.resample(X_train[t], y_train[t]), X_train[e], y_train[e])
+                  for t, e in StratifiedKFold(n_splits=cv).split(X_train, y_train)]
+
+
+def traced(fn):
+    """(fn(), traced memory still held afterwards, peak traced memory), in bytes"""
+    tracemalloc.start()
+    try:
+        result = fn()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current, peak
+
+
+def run(n_students=20000, models=('Random Forest', 'LightGBM'), cv=5, seed=0):
+    """
+    Return one result dict per (strategy, model).
+    """
+    from sklearn.base import clone
+    from sklearn.metrics import roc_auc_score
+    from imbalance import STRATEGIES, fit_weighted, get_strategy
+    from model_training import build_candidates
+
+    X_train, X_test, y_train, y_test = prepare(n_students, seed)
+    candidates = build_candidates(random_state=seed, n_jobs=1)
+    variants = [(name, name, False) for name in STRATEGIES] + [('smote-leaky', 'smote', True)]
+
+    results = []
+    for label, strategy_name, leaky in variants:
+        start = time.perf_counter()
+        resample_folds(get_strategy(strategy_name, seed), X_train, y_train, cv, leaky)
+        resample_seconds = time.perf_counter() - start
+        # The resampled data stays held while the models fit
+        (full, folds), held, resample_peak = traced(
+            lambda: resample_folds(get_strategy(strategy_name, seed), X_train, y_train, cv, leaky))
+
+        for model_name in models:
+            def fit():
+                scores = []
+                for X, y, w, X_eval, y_eval in folds:
+                    model = fit_weighted(clone(candidates[model_name]), X, y, w)
+                    scores.append(roc_auc_score(y_eval, model.predict_proba(X_eval)[:, 1]))
+                return fit_weighted(clone(candidates[model_name]), *full), scores
+
+            start = time.perf_counter()
+            fit()
+            fit_seconds = time.perf_counter() - start
+            (model, scores), _, fit_peak = traced(fit)
+
+            results.append({
+                'strategy': label,
+                'model': model_name,
+                'train_rows': len(full[1]),
+                'resample_seconds': resample_seconds,
+                'fit_seconds': fit_seconds,
+                'peak_mb': max(resample_peak, held + fit_peak) / 2 ** 20,
+                'cv_auc': float(np.mean(scores)),
+                'test_auc': float(roc_auc_score(y_test, model.predict_proba(X_test)[:, 1])),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, default=20000)
+    parser.add_argument('--models', nargs='+', default=['Random Forest', 'LightGBM'])
+    parser.add_argument('--cv', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    results = run(args.students, args.models, args.cv, args.seed)
+    print(f"{'strategy':<14}{'model':<15}{'rows':>8}{'resample s':>12}{'fit s':>8}{'peak MB':>9}"
+          f"{'CV AUC':>8}{'test AUC':>10}")
+    for row in results:
+        print(f"{row['strategy']:<14}{row['model']:<15}{row['train_rows']:>8}{row['resample_seconds']:>12.3f}"
+              f"{row['fit_seconds']:>8.2f}{row['peak_mb']:>9.1f}{row['cv_auc']:>8.4f}{row['test_auc']:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Prediction latency benchmark across the model families of train_models.
+
+Compares the old two-pass scoring (predict followed by predict_proba) with
+the single predict_proba pass used by generate_predictions, for one student
+and for a batch.
+
+Usage: python bench_prediction.py [--batch-size 1000] [--repeat 50]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+
+def time_call(fn, repeat):
+    """Median wall time of fn() in seconds over repeat runs"""
+    fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def fit_candidates(n_students=1000, seed=42):
+    """Fit every train_models candidate on a synthetic cohort"""
+    from model_training import build_candidates
+    from student_dropout_predictor import StudentDropoutPredictor
+
+    predictor = StudentDropoutPredictor()
+    X, y = predictor.preprocess_data(predictor._generate_synthetic_data(n_students))
+    models = build_candidates(random_state=seed)
+    for model in models.values():
+        model.fit(X, y)
+    return models, X
+
+
+def run(batch_size=1000, repeat=50):
+    """
+    Return {model name: {rows: (two_pass_seconds, single_pass_seconds)}}.
+    """
+    models, X = fit_candidates()
+    X = X.to_numpy()
+    batches = {1: X[:1], batch_size: np.resize(X, (batch_size, X.shape[1]))}
+
+    results = {}
+    for name, model in models.items():
+        results[name] = {}
+        for rows, X_batch in batches.items():
+            def two_pass():
+                model.predict(X_batch)
+                model.predict_proba(X_batch)[:, 1]
+
+            def single_pass():
+                model.predict_proba(X_batch)[:, 1] > 0.5
+
+            results[name][rows] = (time_call(two_pass, repeat), time_call(single_pass, repeat))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    results = run(args.batch_size, args.repeat)
+    print(f"{'model':<20}{'rows':>8}{'two-pass ms':>14}{'one-pass ms':>14}{'saving':>9}")
+    for name, by_rows in results.items():
+        for rows, (two_pass, single_pass) in by_rows.items():
+            saving = 1 - single_pass / two_pass
+            print(f"{name:<20}{rows:>8}{two_pass * 1000:>14.3f}{single_pass * 1000:>14.3f}{saving:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Startup benchmark for the ML serving process.
+
+Measures, in a fresh interpreter, how long `import main` takes, how long the
+persisted model takes to load, the resulting peak RSS and which heavy modules
+ended up imported. Exits non-zero when the serving import path regresses.
+
+Usage: python bench_startup.py [--model student_dropout_model.pkl]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Training/plotting modules that must never be imported just to serve
+FORBIDDEN_MODULES = [
+    'matplotlib', 'seaborn', 'plotly', 'imblearn', 'model_training', 'visualization',
+]
+
+# Modules `import main` must not load before any model is loaded
+IMPORT_FORBIDDEN_MODULES = ['pandas']
+
+# Libraries a persisted model may legitimately need, keyed by its top-level
+# module (the XGBoost/LightGBM wrappers subclass sklearn estimators)
+MODEL_LIBRARIES = {
+    'sklearn': ['sklearn'],
+    'xgboost': ['xgboost', 'sklearn'],
+    'lightgbm': ['lightgbm', 'sklearn'],
+}
+
+DEFAULT_MAX_IMPORT_SECONDS = 1.0
+DEFAULT_MAX_RSS_MB = 300.0
+
+_PROBE = '''
+import json, resource, sys, time
+
+def peak_rss_kb():
+    # ru_maxrss also counts the parent process the probe was forked from on
+    # Linux; VmHWM is this process's own high-water mark
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+start = time.perf_counter()
+import main
+import_seconds = time.perf_counter() - start
+import_rss = peak_rss_kb()
+import_modules = set(sys.modules)
+
+load_seconds = None
+if sys.argv[1]:
+    start = time.perf_counter()
+    predictor = main.StudentDropoutPredictor()
+    predictor.load_model(sys.argv[1])
+    load_seconds = time.perf_counter() - start
+    model_module = type(predictor.best_model).__module__
+else:
+    model_module = None
+
+print(json.dumps({
+    'import_seconds': import_seconds,
+    'load_seconds': load_seconds,
+    'import_rss_mb': import_rss / 1024,
+    'peak_rss_mb': peak_rss_kb() / 1024,
+    'import_modules': sorted(import_modules),
+    'modules': sorted(sys.modules),
+    'model_module': model_module,
+}))
+'''
+
+
+def _loaded(prefix, modules):
+    return any(m == prefix or m.startswith(prefix + '.') for m in modules)
+
+
+def measure_startup(model_path=None):
+    """
+    Run the startup probe in a fresh interpreter and return its measurements.
+    """
+    output = subprocess.run(
+        [sys.executable, '-c', _PROBE, model_path or ''],
+        cwd=ML_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def check_startup(result, max_import_seconds=DEFAULT_MAX_IMPORT_SECONDS,
+                  max_rss_mb=DEFAULT_MAX_RSS_MB):
+    """
+    Return a list of regressions found in a measure_startup result.
+    """
+    problems = []
+
+    if result['import_seconds'] > max_import_seconds:
+        problems.append(
+            f"import main took {result['import_seconds']:.3f}s (limit {max_import_seconds:.3f}s)"
+        )
+    if result['peak_rss_mb'] > max_rss_mb:
+        problems.append(f"peak RSS {result['peak_rss_mb']:.1f}MB (limit {max_rss_mb:.1f}MB)")
+
+    # Importing main alone must not pull in any model or training library
+    import_forbidden = FORBIDDEN_MODULES + IMPORT_FORBIDDEN_MODULES
+    model_libraries = sorted({p for libs in MODEL_LIBRARIES.values() for p in libs})
+    for prefix in import_forbidden + model_libraries:
+        if _loaded(prefix, result['import_modules']):
+            problems.append(f"import main loaded {prefix}")
+
+    # Loading the model may only add the library of the persisted model type
+    allowed = set()
+    if result['model_module']:
+        allowed.update(MODEL_LIBRARIES.get(result['model_module'].split('.')[0], []))
+    for prefix in FORBIDDEN_MODULES:
+        if _loaded(prefix, result['modules']):
+            problems.append(f"serving path loaded {prefix}")
+    for prefix in model_libraries:
+        if prefix not in allowed and _loaded(prefix, result['modules']):
+            problems.append(f"serving path loaded {prefix} for a {result['model_module']} model")
+
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', default='student_dropout_model.pkl',
+                        help="model file to load after import (empty to skip)")
+    parser.add_argument('--max-import-seconds', type=float, default=DEFAULT_MAX_IMPORT_SECONDS)
+    parser.add_argument('--max-rss-mb', type=float, default=DEFAULT_MAX_RSS_MB)
+    args = parser.parse_args()
+
+    result = measure_startup(args.model)
+    print(f"import main:  {result['import_seconds'] * 1000:8.1f} ms "
+          f"({result['import_rss_mb']:.1f} MB RSS)")
+    if result['load_seconds'] is not None:
+        print(f"load model:   {result['load_seconds'] * 1000:8.1f} ms ({result['model_module']})")
+    print(f"peak RSS:     {result['peak_rss_mb']:8.1f} MB")
+
+    problems = check_startup(result, args.max_import_seconds, args.max_rss_mb)
+    for problem in problems:
+        print(f"REGRESSION: {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+"""
+Benchmark and performance-regression suite for the ML service.
+
+`run` times each stage on synthetic cohorts for every model family:
+preprocess_data, generate_predictions, train_models (each family's fits
+within it), and the API's /predict and /predict/bulk, driven in-process
+through the ASGI test client with the prediction cache off. Every case
+records latency percentiles, throughput and peak traced memory, and the
+run is appended to a JSON history file. `compare` checks the latest run
+against an earlier one and exits non-zero on regressions beyond the
+tolerance.
+
+Usage: python bench_suite.py run [--sizes 1 1000 100000 1000000] [--stages ...]
+       [--models ...] [--repeat 5] [--history bench_history.json] [--label TEXT]
+       python bench_suite.py compare [--baseline -2] [--candidate -1] [--tolerance 0.1]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_HISTORY = os.path.join(ML_DIR, 'bench_history.json')
+
+STAGES = ['preprocess_data', 'generate_predictions', 'train_models', 'api_predict', 'api_bulk']
+MODEL_FAMILIES = ['Random Forest', 'Gradient Boosting', 'XGBoost', 'LightGBM']
+DEFAULT_SIZES = [1, 1000, 100_000, 1_000_000]
+# Cohort size limits per stage: train_models needs both classes in every
+# fold, /predict scores one student per request, and larger runs take
+# minutes each
+STAGE_MIN_ROWS = {'train_models': 1000}
+STAGE_MAX_ROWS = {'train_models': 10_000, 'api_predict': 1, 'api_bulk': 100_000}
+# Rows the per-family models are fitted on
+FIT_ROWS = 5000
+# A case stops repeating after this many seconds, once it has one timing
+MAX_CASE_SECONDS = 10.0
+
+
+def measure(fn, rows, repeat=5, max_seconds=MAX_CASE_SECONDS, warmup=True):
+    """
+    Time fn() up to repeat times, then once more under tracemalloc for the
+    peak memory. Returns the case's metrics.
+    """
+    if warmup:
+        fn()
+    timings = []
+    deadline = time.perf_counter() + max_seconds
+    while len(timings) < repeat and (not timings or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings = np.array(timings)
+    return {
+        'runs': len(timings),
+        'p50_ms': float(np.percentile(timings, 50)) * 1000,
+        'p95_ms': float(np.percentile(timings, 95)) * 1000,
+        'p99_ms': float(np.percentile(timings, 99)) * 1000,
+        'throughput_rows_s': rows / float(np.median(timings)),
+        'peak_mb': peak / 2 ** 20,
+    }
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the training code's progress prints"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def cohort(n, seed=0):
+    from synthetic_data import generate_synthetic_data
+    return generate_synthetic_data(n, seed)
+
+
+def fit_family_predictors(models, seed=0):
+    """{family: StudentDropoutPredictor} with each family fitted on FIT_ROWS students"""
+    from model_training import build_candidates
+    from student_dropout_predictor import StudentDropoutPredictor
+
+    predictors = {}
+    candidates = build_candidates(random_state=seed)
+    for name in models:
+        predictor = StudentDropoutPredictor()
+        with quiet():
+            X, y = predictor.preprocess_data(cohort(FIT_ROWS, seed))
+            predictor.best_model = candidates[name].fit(X.to_numpy(), y)
+            predictor.compile_model()
+        predictors[name] = predictor
+    return predictors
+
+
+def api_students(df):
+    return [
+        {'student_id': student_id, 'avg_attendance': attendance, 'avg_assignment_grade': grade,
+         'attendance_trend': trend}
+        for student_id, attendance, grade, trend in zip(
+            df['student_id'].tolist(), df['avg_attendance'].tolist(), df['avg_assignment_score'].tolist(),
+            df['attendance_trend'].tolist())
+    ]
+
+
+@contextlib.contextmanager
+def api_client(predictor):
+    """
+    The app run in-process on a temporary registry holding predictor's
+    model, with the prediction cache disabled.
+    """
+    from fastapi.testclient import TestClient
+    import main
+    from model_registry import ModelRegistry
+
+    saved = (main.REGISTRY_DIR, main.CACHE_SIZE, main.REGISTRY_POLL_S)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = os.path.join(tmp_dir, 'model.pkl')
+        with quiet():
+            predictor.save_model(model_path)
+        registry_dir = os.path.join(tmp_dir, 'registry')
+        ModelRegistry(registry_dir).publish(model_path, set_current=True)
+        main.REGISTRY_DIR, main.CACHE_SIZE, main.REGISTRY_POLL_S = registry_dir, 0, None
+        try:
+            with TestClient(main.app) as client:
+                deadline = time.monotonic() + 60
+                while client.get('/ready').status_code != 200:
+                    if time.monotonic() > deadline:
+                        raise RuntimeError("API did not become ready")
+                    time.sleep(0.05)
+                yield client
+        finally:
+            main.REGISTRY_DIR, main.CACHE_SIZE, main.REGISTRY_POLL_S = saved
+
+
+def stage_sizes(stage, sizes):
+    return [n for n in sizes
+            if STAGE_MIN_ROWS.get(stage, 1) <= n <= STAGE_MAX_ROWS.get(stage, n)]
+
+
+def run_cases(stages=STAGES, sizes=DEFAULT_SIZES, models=MODEL_FAMILIES, repeat=5, seed=0, verbose=True):
+    """Run every (stage, model, size) case; returns the result rows"""
+    from student_dropout_predictor import StudentDropoutPredictor
+
+    results = []
+
+    def record(stage, model, rows, metrics):
+        results.append({'stage': stage, 'model': model, 'rows': rows, **metrics})
+        if verbose:
+            peak = '-' if metrics['peak_mb'] is None else f"{metrics['peak_mb']:.1f}"
+            print(f"{stage:<22}{model:<18}{rows:>9}{metrics['p50_ms']:>12.3f}"
+                  f"{metrics['throughput_rows_s']:>14,.0f}{peak:>9}", flush=True)
+
+    if verbose:
+        print(f"{'stage':<22}{'model':<18}{'rows':>9}{'p50 ms':>12}{'rows/s':>14}{'peak MB':>9}")
+    cohorts = {n: cohort(n, seed) for n in sorted(set(sizes))}
+
+    if 'preprocess_data' in stages:
+        for n in stage_sizes('preprocess_data', sizes):
+            predictor = StudentDropoutPredictor()
+            with quiet():
+                metrics = measure(lambda: predictor.preprocess_data(cohorts[n]), n, repeat)
+            record('preprocess_data', '-', n, metrics)
+
+    if 'train_models' in stages:
+        for n in stage_sizes('train_models', sizes):
+            predictor = StudentDropoutPredictor()
+            with quiet():
+                X, y = predictor.preprocess_data(cohorts[n])
+                start = time.perf_counter()
+                predictor.train_models(X, y, seed=seed, n_jobs=1)
+            wall = time.perf_counter() - start
+            record('train_models', 'all', n, {
+                'runs': 1, 'p50_ms': wall * 1000, 'p95_ms': wall * 1000, 'p99_ms': wall * 1000,
+                'throughput_rows_s': n / wall, 'peak_mb': None,
+            })
+            # Each family's full fit plus its fold fits within that run
+            for row in predictor.training_report:
+                if row['model'] in models:
+                    seconds = row['fit_seconds']
+                    record('train_models.fit', row['model'], n, {
+                        'runs': 1, 'p50_ms': seconds * 1000, 'p95_ms': seconds * 1000, 'p99_ms': seconds * 1000,
+                        'throughput_rows_s': n / seconds, 'peak_mb': None,
+                    })
+
+    serving_stages = [s for s in ('generate_predictions', 'api_predict', 'api_bulk') if s in stages]
+    if not serving_stages:
+        return results
+
+    for model, predictor in fit_family_predictors(models, seed).items():
+        if 'generate_predictions' in stages:
+            for n in stage_sizes('generate_predictions', sizes):
+                X = predictor.transform.assemble_frame(cohorts[n])
+                record('generate_predictions', model, n,
+                       measure(lambda: predictor.generate_predictions(X), n, repeat))
+
+        if 'api_predict' in stages or 'api_bulk' in stages:
+            with api_client(predictor) as client:
+                if 'api_predict' in stages and stage_sizes('api_predict', sizes):
+                    body = json.dumps(api_students(cohorts[min(sizes)].iloc[:1])[0])
+
+                    def predict():
+                        response = client.post('/predict', content=body,
+                                               headers={'Content-Type': 'application/json'})
+                        assert response.status_code == 200, response.text
+                    record('api_predict', model, 1, measure(predict, 1, max(repeat, 50)))
+
+                if 'api_bulk' in stages:
+                    for n in stage_sizes('api_bulk', sizes):
+                        body = json.dumps({'students': api_students(cohorts[n])})
+
+                        def bulk():
+                            response = client.post('/predict/bulk', content=body,
+                                                   headers={'Content-Type': 'application/json'})
+                            assert response.status_code == 200, response.text
+                        record('api_bulk', model, n, measure(bulk, n, repeat))
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ML_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def append_history(path, record):
+    history = load_history(path)
+    history.append(record)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(history, f, indent=1)
+    os.replace(tmp_path, path)
+    return len(history) - 1
+
+
+def run(history=DEFAULT_HISTORY, label=None, **options):
+    """Run the suite and append it to history; returns the run record"""
+    record = {
+        'timestamp': time.time(),
+        'label': label,
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'machine': f"{platform.machine()} x{os.cpu_count()}",
+        'results': run_cases(**options),
+    }
+    if history:
+        append_history(history, record)
+    return record
+
+
+def compare(baseline, candidate, tolerance=0.1, min_ms=0.1):
+    """
+    Compare matching cases of two run records. A case regresses when its
+    p50 latency or peak memory grew by more than tolerance (latency changes
+    under min_ms are ignored). Returns rows with 'change' and 'regression'.
+    """
+    before = {(r['stage'], r['model'], r['rows']): r for r in baseline['results']}
+    rows = []
+    for result in candidate['results']:
+        key = (result['stage'], result['model'], result['rows'])
+        if key not in before:
+            continue
+        old = before[key]
+        change = result['p50_ms'] / old['p50_ms'] - 1 if old['p50_ms'] else 0.0
+        slower = change > tolerance and result['p50_ms'] - old['p50_ms'] > min_ms
+        # Cases timed from the training report have no memory figure
+        memory_change = (result['peak_mb'] / old['peak_mb'] - 1
+                         if old['peak_mb'] and result['peak_mb'] is not None else 0.0)
+        bigger = memory_change > tolerance
+        rows.append({
+            'stage': key[0], 'model': key[1], 'rows': key[2],
+            'baseline_ms': old['p50_ms'], 'candidate_ms': result['p50_ms'], 'change': change,
+            'memory_change': memory_change, 'regression': bool(slower or bigger),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="run the suite and append it to the history")
+    run_parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    run_parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    run_parser.add_argument('--models', nargs='+', choices=MODEL_FAMILIES, default=MODEL_FAMILIES)
+    run_parser.add_argument('--repeat', type=int, default=5)
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--history', default=DEFAULT_HISTORY)
+    run_parser.add_argument('--label')
+
+    compare_parser = commands.add_parser('compare', help="compare two runs from the history")
+    compare_parser.add_argument('--history', default=DEFAULT_HISTORY)
+    compare_parser.add_argument('--baseline', type=int, default=-2, help="history index (default: previous run)")
+    compare_parser.add_argument('--candidate', type=int, default=-1, help="history index (default: latest run)")
+    compare_parser.add_argument('--tolerance', type=float, default=0.1, help="allowed relative slowdown")
+    compare_parser.add_argument('--min-ms', type=float, default=0.1, help="ignore latency changes below this")
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        sys.path.insert(0, ML_DIR)
+        record = run(args.history, args.label, stages=args.stages, sizes=args.sizes, models=args.models,
+                     repeat=args.repeat, seed=args.seed)
+        print(f"Recorded {len(record['results'])} cases in {args.history}")
+        return
+
+    history = load_history(args.history)
+    if len(history) < 2:
+        sys.exit(f"Need at least two runs in {args.history} to compare")
+    rows = compare(history[args.baseline], history[args.candidate], args.tolerance, args.min_ms)
+    print(f"{'stage':<22}{'model':<18}{'rows':>9}{'base ms':>11}{'new ms':>11}{'change':>9}{'memory':>9}")
+    for row in rows:
+        flag = '  REGRESSION' if row['regression'] else ''
+        print(f"{row['stage']:<22}{row['model']:<18}{row['rows']:>9}{row['baseline_ms']:>11.3f}"
+              f"{row['candidate_ms']:>11.3f}{row['change']:>+9.1%}{row['memory_change']:>+9.1%}{flag}")
+    regressions = sum(row['regression'] for row in rows)
+    print(f"{regressions} regression(s) in {len(rows)} comparable cases")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,445 @@
+"""
+Columnar request and response formats for bulk scoring.
+
+The bulk endpoint accepts JSON, NDJSON (one student object per line), CSV
+and Arrow IPC streams, and answers in JSON, NDJSON or Arrow as the client
+accepts. The streaming endpoint reads NDJSON or CSV line batches as they
+arrive.
+Request bodies are parsed straight into one array per field and validated
+with whole-column checks, so no per-student model objects are built.
+Arrow support needs pyarrow, which is imported only when Arrow is used.
+"""
+
+import asyncio
+import csv
+import json
+
+import numpy as np
+
+JSON = 'application/json'
+NDJSON = 'application/x-ndjson'
+ARROW = 'application/vnd.apache.arrow.stream'
+CSV = 'text/csv'
+MEDIA_TYPES = [JSON, NDJSON, ARROW]
+
+# Validation errors reported per request before giving up
+MAX_ERRORS = 20
+
+
+class ColumnValidationError(ValueError):
+    """
+    Raised for invalid rows; errors are FastAPI-style dicts with loc, msg
+    and type. Locations are relative to the batch: [row, field].
+    """
+
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} validation error(s)")
+        self.errors = errors
+
+    def located(self, *prefix):
+        """The errors with prefix (e.g. 'body', 'students') prepended to each loc"""
+        return [{**error, 'loc': [*prefix, *error['loc']]} for error in self.errors]
+
+
+class UnsupportedFormatError(ValueError):
+    """Raised for a media type that cannot be parsed or produced here."""
+
+
+def media_type(content_type):
+    """The bare media type of a Content-Type header, lower-cased"""
+    return (content_type or '').split(';', 1)[0].strip().lower()
+
+
+def negotiate(accept, supported=MEDIA_TYPES, default=JSON):
+    """
+    Pick the response media type from an Accept header: the supported type
+    with the highest q-value, JSON for wildcards or no header. Returns None
+    when the header accepts none of the supported types.
+    """
+    best, best_q = None, 0.0
+    for part in (accept or '').split(','):
+        name, *params = [p.strip() for p in part.split(';')]
+        name = name.lower()
+        q = 1.0
+        for param in params:
+            if param.startswith('q='):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if name in ('*/*', 'application/*'):
+            name = default
+        if name in supported and q > best_q:
+            best, best_q = name, q
+    if not (accept or '').strip():
+        return default
+    return best
+
+
+class StudentColumns:
+    """
+    A batch of students as columns: ids is an object array of student IDs,
+    values maps every numeric field to a float64 array.
+    """
+
+    def __init__(self, ids, values):
+        self.ids = ids
+        self.values = values
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class ColumnSchema:
+    """
+    Field names, kinds ('str', 'float' or 'int'), required flags, defaults
+    and allowed ranges of a student record, applied to whole columns.
+    """
+
+    def __init__(self, fields, ranges=None):
+        # fields: [(name, kind, required, default)]
+        self.fields = list(fields)
+        self.ranges = ranges or {}
+        self.id_field = next(name for name, kind, _, _ in self.fields if kind == 'str')
+
+    @classmethod
+    def from_model(cls, model, ranges=None):
+        """Derive the schema from a pydantic (v1) model's fields"""
+        kinds = {str: 'str', float: 'float', int: 'int'}
+        fields = [(name, kinds[field.type_], field.required, field.default)
+                  for name, field in model.__fields__.items()]
+        return cls(fields, ranges)
+
+    def from_rows(self, rows, row_offset=0):
+        """
+        Columns from a list of dicts (decoded JSON objects). A missing key
+        takes the field default; null leaves a numeric field missing.
+        """
+        errors = []
+        for i, row in enumerate(rows):
+            if not isinstance(row, dict):
+                errors.append(_error(row_offset + i, None, "value is not a valid dict", 'type_error.dict'))
+                if len(errors) >= MAX_ERRORS:
+                    break
+        if errors:
+            raise ColumnValidationError(errors)
+
+        columns = {}
+        for name, kind, required, default in self.fields:
+            fill = None if required else default
+            columns[name] = [row.get(name, fill) for row in rows]
+        return self.from_columns(columns, row_offset, n_rows=len(rows))
+
+    def from_columns(self, columns, row_offset=0, n_rows=None):
+        """
+        Validate a mapping of field name to column (lists or arrays) and
+        return StudentColumns. Absent optional columns take their default.
+        """
+        if n_rows is None:
+            n_rows = len(next(iter(columns.values()))) if columns else 0
+        errors = []
+        values = {}
+        ids = None
+        for name, kind, required, default in self.fields:
+            column = columns.get(name)
+            if column is None:
+                if required:
+                    errors.append(_error(None, name, "field required", 'value_error.missing'))
+                    continue
+                column = [default] * n_rows if kind == 'str' else np.full(n_rows, np.nan if default is None else default)
+
+            if kind == 'str':
+                ids = _to_ids(column, row_offset, name, errors)
+                continue
+
+            try:
+                array = np.asarray(column, dtype=np.float64)
+                missing = np.isnan(array)
+            except (TypeError, ValueError):
+                array, invalid = _to_float_slow(column, row_offset, name, kind, errors)
+                missing = np.isnan(array)
+                missing[invalid] = False
+            if required:
+                for i in np.flatnonzero(missing)[:MAX_ERRORS]:
+                    errors.append(_error(row_offset + int(i), name, "none is not an allowed value",
+                                         'type_error.none.not_allowed'))
+            if kind == 'int':
+                array = np.trunc(array)
+            if name in self.ranges:
+                low, high, message = self.ranges[name]
+                for i in np.flatnonzero(~missing & ((array < low) | (array > high)))[:MAX_ERRORS]:
+                    errors.append(_error(row_offset + int(i), name, message, 'value_error'))
+            values[name] = array
+
+        if errors:
+            raise ColumnValidationError(errors[:MAX_ERRORS])
+        return StudentColumns(ids, values)
+
+
+def _error(row, field, message, error_type):
+    loc = []
+    if row is not None:
+        loc.append(row)
+    if field is not None:
+        loc.append(field)
+    return {'loc': loc, 'msg': message, 'type': error_type}
+
+
+def _to_ids(column, row_offset, name, errors):
+    # Numbers are coerced to str as pydantic does; anything else is rejected
+    ids = np.empty(len(column), dtype=object)
+    for i, value in enumerate(column):
+        if isinstance(value, str):
+            ids[i] = value
+        elif isinstance(value, (int, float)):
+            ids[i] = str(value)
+        elif len(errors) < MAX_ERRORS:
+            if value is None:
+                errors.append(_error(row_offset + i, name, "none is not an allowed value",
+                                     'type_error.none.not_allowed'))
+            else:
+                errors.append(_error(row_offset + i, name, "str type expected", 'type_error.str'))
+    return ids
+
+
+def _to_float_slow(column, row_offset, name, kind, errors):
+    # Locate the offending values once the vectorized conversion has failed
+    array = np.empty(len(column))
+    invalid = np.zeros(len(column), dtype=bool)
+    for i, value in enumerate(column):
+        try:
+            array[i] = np.nan if value is None else float(value)
+        except (TypeError, ValueError):
+            array[i] = np.nan
+            invalid[i] = True
+            if len(errors) < MAX_ERRORS:
+                errors.append(_error(row_offset + i, name, f"value is not a valid {kind}", f'type_error.{kind}'))
+    return array, invalid
+
+
+def parse_json(body, schema, key='students'):
+    """
+    Parse a JSON body of the form {key: [student objects]}.
+    """
+    try:
+        data = json.loads(body)
+    except ValueError as e:
+        raise ColumnValidationError([{'loc': [], 'msg': f"Invalid JSON: {e}", 'type': 'value_error.jsondecode'}])
+    rows = data.get(key) if isinstance(data, dict) else None
+    if rows is None:
+        raise ColumnValidationError([_error(None, key, "field required", 'value_error.missing')])
+    if not isinstance(rows, list):
+        raise ColumnValidationError([_error(None, key, "value is not a valid list", 'type_error.list')])
+    try:
+        return schema.from_rows(rows)
+    except ColumnValidationError as e:
+        raise ColumnValidationError(e.located(key))
+
+
+def parse_ndjson(body, schema, row_offset=0):
+    """
+    Parse NDJSON bytes (one student object per line, blank lines ignored).
+    """
+    return parse_ndjson_lines([line for line in body.split(b'\n') if line.strip()], schema, row_offset)
+
+
+def parse_ndjson_lines(lines, schema, row_offset=0):
+    """Parse a list of non-blank NDJSON lines (bytes)"""
+    try:
+        # One C-level decode of the whole batch instead of one per line
+        rows = json.loads(b'[' + b','.join(lines) + b']')
+    except ValueError:
+        rows = []
+        for i, line in enumerate(lines):
+            try:
+                rows.append(json.loads(line))
+            except ValueError as e:
+                raise ColumnValidationError([_error(row_offset + i, None, f"Invalid JSON: {e}",
+                                                    'value_error.jsondecode')])
+    return schema.from_rows(rows, row_offset)
+
+
+def _decode(line, row, encoding='utf-8'):
+    try:
+        return line.decode(encoding)
+    except UnicodeDecodeError as e:
+        raise ColumnValidationError([_error(row, None, f"Invalid UTF-8: {e}", 'value_error.unicode')])
+
+
+def parse_csv_header(line):
+    """Field names from a CSV header line (bytes)"""
+    try:
+        return [name.strip() for name in next(csv.reader([_decode(line, None, 'utf-8-sig')]))]
+    except csv.Error as e:
+        raise ColumnValidationError([_error(None, None, f"Invalid CSV header: {e}", 'value_error.csv')])
+
+
+def parse_csv_lines(lines, header, schema, row_offset=0):
+    """
+    Parse CSV data lines (bytes) under header. Empty cells count as absent,
+    so optional fields take their defaults. Quoted fields may not span lines.
+    A required field missing from the header is reported once, not per row.
+    """
+    missing = [name for name, _, required, _ in schema.fields if required and name not in header]
+    if missing:
+        raise ColumnValidationError([_error(None, name, "field required", 'value_error.missing')
+                                     for name in missing])
+    rows = []
+    reader = csv.reader([_decode(line, row_offset + i) for i, line in enumerate(lines)])
+    try:
+        for i, values in enumerate(reader):
+            if len(values) != len(header):
+                raise ColumnValidationError([_error(row_offset + i, None,
+                                                    f"expected {len(header)} values, got {len(values)}",
+                                                    'value_error.csv')])
+            rows.append({name: value for name, value in zip(header, values) if value != ''})
+    except csv.Error as e:
+        raise ColumnValidationError([_error(row_offset + reader.line_num - 1, None, f"Invalid CSV: {e}",
+                                            'value_error.csv')])
+    return schema.from_rows(rows, row_offset)
+
+
+def parse_csv(body, schema):
+    """Parse CSV bytes with a header line"""
+    lines = [line for line in body.split(b'\n') if line.strip()]
+    if not lines:
+        return schema.from_rows([])
+    return parse_csv_lines(lines[1:], parse_csv_header(lines[0]), schema)
+
+
+async def iter_line_batches(chunks, max_rows, max_wait=None):
+    """
+    Regroup an async iterator of byte chunks into lists of complete,
+    non-blank lines. Lines are accumulated across chunks into batches of
+    max_rows; a smaller batch is released only at the end of the stream, or
+    once its first line has waited max_wait seconds for the rest.
+    """
+    loop = asyncio.get_running_loop()
+    chunks = chunks.__aiter__()
+    pending = b''
+    lines = []
+    deadline = None
+    next_chunk = None
+    try:
+        while True:
+            if next_chunk is None:
+                next_chunk = asyncio.ensure_future(chunks.__anext__())
+            timeout = None if deadline is None else max(deadline - loop.time(), 0.0)
+            done, _ = await asyncio.wait((next_chunk,), timeout=timeout)
+            if not done:
+                # The client is slow: release what has arrived so far
+                batch, lines, deadline = lines, [], None
+                yield batch
+                continue
+            task, next_chunk = next_chunk, None
+            try:
+                chunk = task.result()
+            except StopAsyncIteration:
+                break
+            complete = (pending + chunk).split(b'\n')
+            pending = complete.pop()
+            lines.extend(line for line in complete if line.strip())
+            while len(lines) >= max_rows:
+                batch, lines = lines[:max_rows], lines[max_rows:]
+                yield batch
+            if not lines:
+                deadline = None
+            elif deadline is None and max_wait is not None:
+                deadline = loop.time() + max_wait
+    finally:
+        if next_chunk is not None:
+            next_chunk.cancel()
+    if pending.strip():
+        lines.append(pending)
+    if lines:
+        yield lines
+
+
+def require_pyarrow():
+    """Import pyarrow, or raise UnsupportedFormatError if it is not installed"""
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc  # noqa: F401
+    except ImportError as e:
+        raise UnsupportedFormatError("Arrow payloads require pyarrow on the server") from e
+    return pa
+
+
+def parse_arrow(body, schema):
+    """
+    Parse an Arrow IPC stream whose columns are student fields.
+    """
+    pa = require_pyarrow()
+    try:
+        table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+    except pa.ArrowInvalid as e:
+        raise ColumnValidationError([{'loc': [], 'msg': f"Invalid Arrow stream: {e}", 'type': 'value_error.arrow'}])
+    columns = {}
+    for name in table.column_names:
+        column = table.column(name)
+        if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+            columns[name] = column.to_pylist()
+        else:
+            columns[name] = column.to_numpy(zero_copy_only=False).astype(np.float64)
+    return schema.from_columns(columns, n_rows=table.num_rows)
+
+
+def parse_columns(content_type, body, schema):
+    """Parse a bulk request body by media type"""
+    if content_type == JSON:
+        return parse_json(body, schema)
+    if content_type == NDJSON:
+        return parse_ndjson(body, schema)
+    if content_type == ARROW:
+        return parse_arrow(body, schema)
+    if content_type == CSV:
+        return parse_csv(body, schema)
+    raise UnsupportedFormatError(f"Unsupported content type: {content_type}")
+
+
+def encode_ndjson(student_ids, predictions, probabilities, assessment, summary=True):
+    """
+    One JSON object per student per line, followed by a {"summary": ...} line.
+    Each shared recommendation list is encoded once.
+    """
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    confidences = np.maximum(probabilities, 1 - probabilities)
+    encoded = {}
+    lines = []
+    for student_id, probability, risk_level, predicted, confidence, recommendations in zip(
+        student_ids, probabilities.tolist(), assessment.band_names.tolist(),
+        np.asarray(predictions, dtype=bool).tolist(), confidences.tolist(), assessment.recommendations
+    ):
+        key = id(recommendations)
+        if key not in encoded:
+            encoded[key] = json.dumps(recommendations)
+        lines.append(
+            f'{{"student_id":{json.dumps(student_id)},"dropout_probability":{probability!r},'
+            f'"risk_level":"{risk_level}","predicted_dropout":{"true" if predicted else "false"},'
+            f'"confidence":{confidence!r},"recommendations":{encoded[key]}}}\n'
+        )
+    if summary:
+        lines.append(json.dumps({'summary': assessment.summary()}) + '\n')
+    return ''.join(lines).encode()
+
+
+def encode_arrow(student_ids, predictions, probabilities, assessment):
+    """
+    An Arrow IPC stream with one row per student; the summary is stored as
+    JSON in the schema metadata.
+    """
+    pa = require_pyarrow()
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    table = pa.table({
+        'student_id': pa.array(list(student_ids), type=pa.string()),
+        'dropout_probability': probabilities,
+        'risk_level': pa.array(assessment.band_names.tolist(), type=pa.string()).dictionary_encode(),
+        'predicted_dropout': np.asarray(predictions, dtype=bool),
+        'confidence': np.maximum(probabilities, 1 - probabilities),
+        'recommendations': pa.array(assessment.recommendations, type=pa.list_(pa.string())),
+    })
+    table = table.replace_schema_metadata({'summary': json.dumps(assessment.summary())})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
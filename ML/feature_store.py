@@ -0,0 +1,348 @@
+"""
+Per-student model features maintained incrementally from raw records.
+
+The API's StudentData fields are aggregates over a student's whole
+history. FeatureStore keeps, per student, the running sums they are
+computed from, so each new record updates them in O(1) rather than
+rescanning the history:
+
+- attendance: one record per session, (student_id, day, present). Absences
+  are records with present=False
+- assignments: one record per graded submission, (student_id, day, score
+  0-100, late)
+
+Days are integer days since 1970-01-01 or anything NumPy converts to
+datetime64[D]. A student's records of one kind must arrive in day order.
+Student IDs are kept as strings, so 101 and "101" are the same student
+and IDs survive a snapshot unchanged.
+
+Features (FEATURES) are running means, least-squares slopes over time,
+counters and an absence streak. The state lives in one float64 array with a
+row per student and snapshots to a local .npz file. recompute() builds the
+same state from full record tables in one vectorized pass; both give the
+same features for the same records.
+"""
+
+import os
+
+import numpy as np
+
+from columnar import StudentColumns
+
+FEATURES = ['avg_attendance', 'avg_assignment_grade', 'attendance_trend', 'assignment_trend',
+            'low_attendance_months', 'failing_assignments', 'missed_consecutive_days', 'late_submissions']
+
+# A calendar month below this attendance rate counts as a low attendance month
+LOW_ATTENDANCE_RATE = 0.75
+# Scores below this count as failing assignments
+FAILING_GRADE = 60.0
+# Trends are the change in attendance rate, or in score / 100, per this many days
+TREND_DAYS = 30.0
+
+# Columns of the state array. t is the day relative to the student's first
+# record of that kind, which keeps the slope sums small and exact
+FIELDS = [
+    # attendance: first and last day, sessions, sessions attended, sums for the slope
+    'att_origin', 'att_last', 'att_n', 'att_present', 'att_t', 'att_tt', 'att_tx',
+    # current calendar month (index and first day of the next), its sessions
+    # and attended sessions, and completed months below LOW_ATTENDANCE_RATE
+    'month', 'month_next', 'month_n', 'month_present', 'low_months',
+    # current and longest run of consecutive absences
+    'streak', 'max_streak',
+    # assignments: first and last day, count, score sum, sums for the slope,
+    # failing and late counts
+    'asg_origin', 'asg_last', 'asg_n', 'asg_sum', 'asg_t', 'asg_tt', 'asg_tx', 'asg_failing', 'asg_late',
+]
+_F = {name: i for i, name in enumerate(FIELDS)}
+SNAPSHOT_VERSION = 1
+
+
+def to_days(values):
+    """Integer days since 1970-01-01 of day numbers or dates"""
+    values = np.asarray(values)
+    if values.dtype.kind in 'iuf':
+        return values.astype(np.int64)
+    return values.astype('datetime64[D]').astype(np.int64)
+
+
+def month_bounds(days):
+    """(month index, first day of the next month) of each day"""
+    months = np.asarray(days, dtype='datetime64[D]').astype('datetime64[M]')
+    return months.astype(np.int64), (months + 1).astype('datetime64[D]').astype(np.int64)
+
+
+def _slopes(n, t, tt, tx, x):
+    """Least-squares slope of x over t per day from the running sums; 0 where t does not vary"""
+    denominator = n * tt - t * t
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slopes = (n * tx - t * x) / denominator
+    return np.where(denominator > 0, slopes, 0.0)
+
+
+def features_from_state(state):
+    """{feature: column} of state rows"""
+    s = {name: state[:, i] for name, i in _F.items()}
+    att_n, asg_n = s['att_n'], s['asg_n']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_attendance = np.where(att_n > 0, 100 * s['att_present'] / att_n, np.nan)
+        avg_grade = np.where(asg_n > 0, s['asg_sum'] / asg_n, np.nan)
+        month_low = (s['month_n'] > 0) & (s['month_present'] / s['month_n'] < LOW_ATTENDANCE_RATE)
+    return {
+        'avg_attendance': avg_attendance,
+        'avg_assignment_grade': avg_grade,
+        'attendance_trend': TREND_DAYS * _slopes(att_n, s['att_t'], s['att_tt'], s['att_tx'], s['att_present']),
+        'assignment_trend': TREND_DAYS / 100 * _slopes(asg_n, s['asg_t'], s['asg_tt'], s['asg_tx'], s['asg_sum']),
+        'low_attendance_months': s['low_months'] + month_low,
+        'failing_assignments': s['asg_failing'].copy(),
+        'missed_consecutive_days': s['max_streak'].copy(),
+        'late_submissions': s['asg_late'].copy(),
+    }
+
+
+def to_id(student_id):
+    """The store's key for a student ID"""
+    return student_id if type(student_id) is str else str(student_id)
+
+
+class FeatureStore:
+    """
+    Running feature state per student, updated one record at a time.
+    """
+
+    def __init__(self, capacity=1024):
+        self._state = np.zeros((capacity, len(FIELDS)), dtype=np.float64)
+        self._ids = []
+        self._rows = {}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, student_id):
+        return to_id(student_id) in self._rows
+
+    @property
+    def student_ids(self):
+        return list(self._ids)
+
+    def _row(self, student_id):
+        if type(student_id) is not str:
+            student_id = str(student_id)
+        row = self._rows.get(student_id)
+        if row is None:
+            row = len(self._ids)
+            if row == len(self._state):
+                grown = np.zeros((2 * len(self._state), len(FIELDS)), dtype=np.float64)
+                grown[:row] = self._state
+                self._state = grown
+            self._rows[student_id] = row
+            self._ids.append(student_id)
+        return self._state[row]
+
+    def add_attendance(self, student_id, day, present):
+        """Record one session of student_id on day, attended or not"""
+        day = day if type(day) is int else int(to_days(day))
+        s = self._row(student_id)
+        n = s[_F['att_n']]
+        if n == 0:
+            s[_F['att_origin']] = day
+        elif day < s[_F['att_last']]:
+            raise ValueError(f"Attendance for {student_id} on day {day} is older than its last record")
+        s[_F['att_last']] = day
+        t = day - s[_F['att_origin']]
+        x = 1.0 if present else 0.0
+        s[_F['att_n']] = n + 1
+        s[_F['att_present']] += x
+        s[_F['att_t']] += t
+        s[_F['att_tt']] += t * t
+        s[_F['att_tx']] += t * x
+
+        if n == 0 or day >= s[_F['month_next']]:
+            if n > 0 and s[_F['month_present']] / s[_F['month_n']] < LOW_ATTENDANCE_RATE:
+                s[_F['low_months']] += 1
+            month, month_next = month_bounds(day)
+            s[_F['month']], s[_F['month_next']] = month, month_next
+            s[_F['month_n']] = s[_F['month_present']] = 0
+        s[_F['month_n']] += 1
+        s[_F['month_present']] += x
+
+        if present:
+            s[_F['streak']] = 0
+        else:
+            s[_F['streak']] += 1
+            s[_F['max_streak']] = max(s[_F['max_streak']], s[_F['streak']])
+
+    def add_assignment(self, student_id, day, score, late=False):
+        """Record one graded submission of student_id on day"""
+        day = day if type(day) is int else int(to_days(day))
+        s = self._row(student_id)
+        n = s[_F['asg_n']]
+        if n == 0:
+            s[_F['asg_origin']] = day
+        elif day < s[_F['asg_last']]:
+            raise ValueError(f"Assignment for {student_id} on day {day} is older than its last record")
+        s[_F['asg_last']] = day
+        t = day - s[_F['asg_origin']]
+        s[_F['asg_n']] = n + 1
+        s[_F['asg_sum']] += score
+        s[_F['asg_t']] += t
+        s[_F['asg_tt']] += t * t
+        s[_F['asg_tx']] += t * score
+        s[_F['asg_failing']] += score < FAILING_GRADE
+        s[_F['asg_late']] += bool(late)
+
+    def add_attendance_records(self, student_ids, days, present):
+        """add_attendance for each record, in the given order"""
+        for student_id, day, attended in zip(student_ids, to_days(days).tolist(), np.asarray(present).tolist()):
+            self.add_attendance(student_id, day, attended)
+
+    def add_assignment_records(self, student_ids, days, scores, late=None):
+        """add_assignment for each record, in the given order"""
+        late = np.zeros(len(student_ids), dtype=bool) if late is None else np.asarray(late)
+        for student_id, day, score, was_late in zip(student_ids, to_days(days).tolist(),
+                                                    np.asarray(scores, dtype=np.float64).tolist(), late.tolist()):
+            self.add_assignment(student_id, day, score, was_late)
+
+    def features(self, student_ids=None):
+        """
+        StudentColumns of FEATURES for student_ids (default: every student).
+        Unknown students get NaN averages and zero counts.
+        """
+        if student_ids is None:
+            return StudentColumns(list(self._ids), features_from_state(self._state[:len(self._ids)]))
+        student_ids = [to_id(i) for i in student_ids]
+        rows = np.fromiter((self._rows.get(i, -1) for i in student_ids), dtype=np.int64, count=len(student_ids))
+        state = self._state[np.maximum(rows, 0)]
+        state[rows < 0] = 0
+        return StudentColumns(student_ids, features_from_state(state))
+
+    def assemble(self, transform, student_ids=None):
+        """
+        (student IDs, raw feature array) for predictor.generate_predictions;
+        features the store does not compute take the transform's medians.
+        """
+        columns = self.features(student_ids)
+        return columns.ids, transform.assemble_columns(columns.values, len(columns))
+
+    def save(self, path):
+        """Snapshot the state to an .npz file, atomically replacing path"""
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, version=SNAPSHOT_VERSION, fields=np.array(FIELDS), ids=np.array(self._ids, dtype=str),
+                 state=self._state[:len(self._ids)])
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """A store from a save() snapshot"""
+        with np.load(path) as snapshot:
+            if int(snapshot['version']) != SNAPSHOT_VERSION or snapshot['fields'].tolist() != FIELDS:
+                raise ValueError(f"{path} is not a compatible feature store snapshot")
+            return cls._from_state(snapshot['ids'].tolist(), snapshot['state'])
+
+    @classmethod
+    def open(cls, path):
+        """The snapshot at path, or an empty store if there is none yet"""
+        return cls.load(path) if os.path.exists(path) else cls()
+
+    @classmethod
+    def _from_state(cls, ids, state):
+        store = cls(capacity=max(len(ids), 1))
+        store._state[:len(ids)] = state
+        store._ids = list(ids)
+        store._rows = {student_id: row for row, student_id in enumerate(store._ids)}
+        return store
+
+
+def _group_sums(index, n_groups, values):
+    return np.bincount(index, weights=values, minlength=n_groups)
+
+
+def recompute(attendance=None, assignments=None):
+    """
+    Build a FeatureStore from full record tables in one vectorized pass.
+    attendance has columns student_id, day, present; assignments has
+    student_id, day, score and optionally late. Each student's records are
+    taken in day order, ties in table order, as add_attendance and
+    add_assignment would see them.
+    """
+    import pandas as pd
+
+    tables = [t for t in (attendance, assignments) if t is not None]
+    ids = pd.unique(np.concatenate([t['student_id'].astype(str).to_numpy(dtype=object) for t in tables])) \
+        if tables else []
+    rows = {student_id: row for row, student_id in enumerate(ids)}
+    state = np.zeros((len(ids), len(FIELDS)), dtype=np.float64)
+
+    def sorted_records(table):
+        index = table['student_id'].astype(str).map(rows).to_numpy(dtype=np.int64)
+        days = to_days(table['day'].to_numpy())
+        order = np.lexsort((days, index))
+        return index[order], days[order], order
+
+    def column(name, values):
+        state[:, _F[name]] = values
+
+    if attendance is not None and len(attendance):
+        index, days, order = sorted_records(attendance)
+        x = attendance['present'].to_numpy(dtype=bool)[order].astype(np.float64)
+        n = len(ids)
+        first = np.r_[True, index[1:] != index[:-1]]
+        last = np.r_[index[1:] != index[:-1], True]
+        origin = np.zeros(n)
+        origin[index[first]] = days[first]
+        t = (days - origin[index]).astype(np.float64)
+        column('att_origin', origin)
+        state[index[last], _F['att_last']] = days[last]
+        column('att_n', np.bincount(index, minlength=n))
+        column('att_present', _group_sums(index, n, x))
+        column('att_t', _group_sums(index, n, t))
+        column('att_tt', _group_sums(index, n, t * t))
+        column('att_tx', _group_sums(index, n, t * x))
+
+        # Sessions per (student, month); each student's last month stays open
+        months, month_next = month_bounds(days)
+        new_month = first | np.r_[True, months[1:] != months[:-1]]
+        month_id = np.cumsum(new_month) - 1
+        month_n = np.bincount(month_id)
+        month_present = np.bincount(month_id, weights=x)
+        month_student = index[new_month]
+        month_low = month_present / month_n < LOW_ATTENDANCE_RATE
+        last_month = np.r_[month_student[1:] != month_student[:-1], True]
+        column('low_months', np.bincount(month_student, weights=month_low & ~last_month, minlength=n))
+        students = month_student[last_month]
+        state[students, _F['month']] = months[last]
+        state[students, _F['month_next']] = month_next[last]
+        state[students, _F['month_n']] = month_n[last_month]
+        state[students, _F['month_present']] = month_present[last_month]
+
+        # Runs of absences: each run follows a student's first record or an
+        # attended session
+        run_id = np.cumsum(first | (x == 1)) - 1
+        run_length = np.bincount(run_id, weights=1 - x)
+        run_student = index[first | (x == 1)]
+        max_streak = np.zeros(n)
+        np.maximum.at(max_streak, run_student, run_length)
+        column('max_streak', max_streak)
+        state[index[last], _F['streak']] = run_length[run_id[last]]
+
+    if assignments is not None and len(assignments):
+        index, days, order = sorted_records(assignments)
+        scores = assignments['score'].to_numpy(dtype=np.float64)[order]
+        late = (assignments['late'].to_numpy(dtype=bool)[order] if 'late' in assignments
+                else np.zeros(len(order), dtype=bool))
+        n = len(ids)
+        first = np.r_[True, index[1:] != index[:-1]]
+        last = np.r_[index[1:] != index[:-1], True]
+        origin = np.zeros(n)
+        origin[index[first]] = days[first]
+        t = (days - origin[index]).astype(np.float64)
+        column('asg_origin', origin)
+        state[index[last], _F['asg_last']] = days[last]
+        column('asg_n', np.bincount(index, minlength=n))
+        column('asg_sum', _group_sums(index, n, scores))
+        column('asg_t', _group_sums(index, n, t))
+        column('asg_tt', _group_sums(index, n, t * t))
+        column('asg_tx', _group_sums(index, n, t * scores))
+        column('asg_failing', _group_sums(index, n, (scores < FAILING_GRADE).astype(np.float64)))
+        column('asg_late', _group_sums(index, n, late.astype(np.float64)))
+
+    return FeatureStore._from_state(list(ids), state)
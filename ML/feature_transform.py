@@ -0,0 +1,153 @@
+"""
+Frozen feature transform shared by model training and serving.
+
+Training fits the medians and scaling statistics once; serving only maps raw
+request fields into a float array and applies a single affine op.
+"""
+
+import numpy as np
+
+# Request fields that feed model features stored under a different name
+FEATURE_ALIASES = {
+    'avg_assignment_score': 'avg_assignment_grade',
+}
+
+
+class FeatureTransform:
+    """
+    Median imputation followed by standard scaling, frozen as NumPy arrays.
+    """
+
+    def __init__(self, feature_names, mean, scale, medians):
+        self.feature_names = list(feature_names)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.medians = np.asarray(medians, dtype=np.float64)
+
+        # (x - mean) / scale precomputed as x * coef + offset
+        self.coef = 1.0 / self.scale
+        self.offset = -self.mean * self.coef
+
+    @property
+    def n_features(self):
+        return len(self.feature_names)
+
+    @classmethod
+    def fit(cls, X):
+        """
+        Fit medians and scaling statistics on a raw training feature DataFrame.
+        """
+        values = X.to_numpy(dtype=np.float64)
+        medians = np.nanmedian(values, axis=0)
+        values = np.where(np.isnan(values), medians, values)
+
+        mean = values.mean(axis=0)
+        scale = values.std(axis=0)
+        # Constant features are left unscaled, as StandardScaler does
+        scale[scale == 0.0] = 1.0
+
+        return cls(X.columns, mean, scale, medians)
+
+    @classmethod
+    def from_scaler(cls, scaler, feature_names, medians=None):
+        """
+        Build a transform from a fitted StandardScaler. Models saved before the
+        transform existed did not store medians, so missing values fall back
+        to the training mean.
+        """
+        if medians is None:
+            medians = scaler.mean_
+        return cls(feature_names, scaler.mean_, scaler.scale_, medians)
+
+    def assemble(self, records, out=None):
+        """
+        Map raw records (dicts or objects with feature attributes) straight into
+        a preallocated (n_records, n_features) float array. Missing or None
+        values are filled with the training median.
+        """
+        n = len(records)
+        if out is None:
+            out = np.empty((n, self.n_features), dtype=np.float64)
+        if n == 0:
+            return out
+
+        if isinstance(records[0], dict):
+            def get(record, name):
+                return record.get(name)
+        else:
+            def get(record, name):
+                return getattr(record, name, None)
+
+        for j, name in enumerate(self.feature_names):
+            alias = FEATURE_ALIASES.get(name, name)
+            median = self.medians[j]
+            column = out[:, j]
+            for i, record in enumerate(records):
+                value = get(record, name)
+                if value is None:
+                    value = get(record, alias)
+                column[i] = median if value is None else value
+
+        return out
+
+    def assemble_frame(self, df, out=None):
+        """
+        Pull the model features out of a raw DataFrame into a float array,
+        accepting aliased column names and filling NaNs with the medians.
+        """
+        if out is None:
+            out = np.empty((len(df), self.n_features), dtype=np.float64)
+
+        for j, name in enumerate(self.feature_names):
+            if name in df.columns:
+                column = df[name]
+            elif FEATURE_ALIASES.get(name) in df.columns:
+                column = df[FEATURE_ALIASES[name]]
+            else:
+                raise ValueError("Input data is missing required features.")
+            out[:, j] = column.to_numpy(dtype=np.float64, na_value=np.nan)
+
+        nan_rows, nan_cols = np.nonzero(np.isnan(out))
+        out[nan_rows, nan_cols] = self.medians[nan_cols]
+        return out
+
+    def assemble_columns(self, columns, n_rows, out=None):
+        """
+        Copy model features out of a mapping of field name to float array,
+        accepting aliased names. Absent fields and NaNs take the medians.
+        """
+        if out is None:
+            out = np.empty((n_rows, self.n_features), dtype=np.float64)
+
+        for j, name in enumerate(self.feature_names):
+            column = columns.get(name)
+            if column is None:
+                column = columns.get(FEATURE_ALIASES.get(name, name))
+            if column is None:
+                out[:, j] = self.medians[j]
+            else:
+                out[:, j] = column
+
+        nan_rows, nan_cols = np.nonzero(np.isnan(out))
+        out[nan_rows, nan_cols] = self.medians[nan_cols]
+        return out
+
+    def transform(self, X, out=None):
+        """
+        Scale an assembled raw feature array. Pass out=X to scale in place.
+        """
+        out = np.multiply(X, self.coef, out=out)
+        out += self.offset
+        return out
+
+    def to_dict(self):
+        return {
+            'feature_names': self.feature_names,
+            'mean': self.mean,
+            'scale': self.scale,
+            'medians': self.medians,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['feature_names'], data['mean'], data['scale'], data['medians'])
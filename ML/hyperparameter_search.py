@@ -0,0 +1,367 @@
+"""
+Hyperparameter search for the train_models candidate families.
+
+Successive halving spends little resource (trees or training rows) on many
+configurations and promotes the best third to the next rung. Configurations
+come from a random sampler or a TPE-style sampler that learns from earlier
+trials. Fold splits and per-fold imbalance resampling are computed once and
+reused by every trial, and finished trials can be checkpointed to a JSON
+file so an interrupted search resumes without refitting them. The
+checkpoint records a signature of the search (estimator, fixed parameters,
+folds, seed, resampling, resource kind and data); a checkpoint written by
+any other search is ignored.
+"""
+
+import hashlib
+import json
+import math
+import os
+import time
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import StratifiedKFold
+
+from imbalance import fit_weighted, get_strategy
+
+
+# Parameter spaces: name -> ('int'|'float', low, high, log) or ('choice', options)
+SEARCH_SPACES = {
+    'Random Forest': {
+        'max_depth': ('choice', [5, 10, 20, None]),
+        'min_samples_split': ('int', 2, 10, False),
+        'min_samples_leaf': ('int', 1, 4, False),
+        'max_features': ('choice', ['sqrt', 'log2', None]),
+    },
+    'Gradient Boosting': {
+        'learning_rate': ('float', 0.01, 0.3, True),
+        'max_depth': ('int', 2, 6, False),
+        'subsample': ('float', 0.6, 1.0, False),
+        'min_samples_leaf': ('int', 1, 20, True),
+    },
+    'XGBoost': {
+        'learning_rate': ('float', 0.01, 0.3, True),
+        'max_depth': ('int', 3, 9, False),
+        'subsample': ('float', 0.6, 1.0, False),
+        'colsample_bytree': ('float', 0.6, 1.0, False),
+        'min_child_weight': ('float', 1.0, 10.0, True),
+    },
+    'LightGBM': {
+        'learning_rate': ('float', 0.01, 0.3, True),
+        'num_leaves': ('int', 8, 128, True),
+        'min_child_samples': ('int', 5, 50, True),
+        'bagging_fraction': ('float', 0.6, 1.0, False),
+        'colsample_bytree': ('float', 0.6, 1.0, False),
+    },
+}
+
+# Parameters fixed for every trial of a family
+FIXED_PARAMS = {
+    'LightGBM': {'bagging_freq': 1},
+}
+
+
+class RandomSampler:
+    """
+    Samples every parameter independently and uniformly (log-uniformly for
+    log-scaled ranges).
+    """
+
+    def __init__(self, space, seed=None):
+        self.space = space
+        self.rng = np.random.default_rng(seed)
+
+    def tell(self, params, score, rung):
+        pass
+
+    def ask(self):
+        return {name: self._sample(spec) for name, spec in self.space.items()}
+
+    def _sample(self, spec):
+        if spec[0] == 'choice':
+            return spec[1][self.rng.integers(len(spec[1]))]
+        kind, low, high, log = spec
+        value = _from_unit(self.rng.random(), low, high, log)
+        return int(round(value)) if kind == 'int' else value
+
+
+class TPESampler(RandomSampler):
+    """
+    Tree-structured Parzen estimator: observations are split into the best
+    gamma fraction and the rest, and each parameter takes the candidate that
+    maximises the ratio of its density under the good and bad groups. Uses
+    the highest rung that has at least n_startup observations; samples at
+    random until then.
+    """
+
+    def __init__(self, space, seed=None, n_startup=8, gamma=0.25, n_candidates=24):
+        super().__init__(space, seed)
+        self.n_startup = n_startup
+        self.gamma = gamma
+        self.n_candidates = n_candidates
+        self.history = {}
+
+    def tell(self, params, score, rung):
+        self.history.setdefault(rung, []).append((params, score))
+
+    def ask(self):
+        rungs = [rung for rung, obs in self.history.items() if len(obs) >= self.n_startup]
+        if not rungs:
+            return super().ask()
+
+        observations = sorted(self.history[max(rungs)], key=lambda obs: obs[1], reverse=True)
+        n_good = max(1, int(math.ceil(self.gamma * len(observations))))
+        good = [params for params, _ in observations[:n_good]]
+        bad = [params for params, _ in observations[n_good:]]
+        return {name: self._suggest(spec, [p[name] for p in good], [p[name] for p in bad])
+                for name, spec in self.space.items()}
+
+    def _suggest(self, spec, good, bad):
+        if spec[0] == 'choice':
+            options = spec[1]
+            good_weights = np.array([1.0 + good.count(o) for o in options])
+            bad_weights = np.array([1.0 + bad.count(o) for o in options])
+            good_weights /= good_weights.sum()
+            bad_weights /= bad_weights.sum()
+            candidates = self.rng.choice(len(options), size=self.n_candidates, p=good_weights)
+            best = candidates[np.argmax(good_weights[candidates] / bad_weights[candidates])]
+            return options[best]
+
+        kind, low, high, log = spec
+        good_unit = np.array([_to_unit(v, low, high, log) for v in good])
+        bad_unit = np.array([_to_unit(v, low, high, log) for v in bad])
+        bandwidth = max(0.05, 0.5 * len(good_unit) ** -0.2 * max(good_unit.std(), 0.1))
+
+        centres = self.rng.choice(good_unit, size=self.n_candidates)
+        candidates = np.clip(centres + self.rng.normal(0, bandwidth, self.n_candidates), 0.0, 1.0)
+        ratio = _parzen(candidates, good_unit, bandwidth) / _parzen(candidates, bad_unit, bandwidth)
+        value = _from_unit(candidates[np.argmax(ratio)], low, high, log)
+        return int(round(value)) if kind == 'int' else float(value)
+
+
+def _to_unit(value, low, high, log):
+    if log:
+        return (math.log(value) - math.log(low)) / (math.log(high) - math.log(low))
+    return (value - low) / (high - low)
+
+
+def _from_unit(unit, low, high, log):
+    if log:
+        return float(math.exp(math.log(low) + unit * (math.log(high) - math.log(low))))
+    return float(low + unit * (high - low))
+
+
+def _parzen(x, centres, bandwidth):
+    """Gaussian mixture density on [0, 1] with a uniform prior component."""
+    if len(centres) == 0:
+        return np.ones_like(x)
+    kernels = np.exp(-0.5 * ((x[:, None] - centres[None, :]) / bandwidth) ** 2) / bandwidth
+    return (kernels.sum(axis=1) + 1.0) / (len(centres) + 1)
+
+
+SAMPLERS = {
+    'random': RandomSampler,
+    'tpe': TPESampler,
+}
+
+
+class FoldCache:
+    """
+    Stratified folds of the training split, each with its training part
+    passed through the imbalance strategy once and reused by every trial.
+    Resampling inside the fold keeps synthetic points out of the validation
+    part.
+    """
+
+    def __init__(self, X, y, cv=5, seed=None, resampler=None):
+        self.X = np.asarray(X)
+        self.y = np.asarray(y)
+        self.splits = list(StratifiedKFold(n_splits=cv, shuffle=True, random_state=seed).split(self.X, self.y))
+        self.resampler = get_strategy(resampler, seed)
+        self.seed = seed
+        self._folds = {}
+
+    def fold(self, index):
+        """
+        Return (X_train, y_train, w_train, X_valid, y_valid, order); w_train
+        is None unless the strategy weights rows, and order is a fixed
+        permutation of the training rows used for row-subsampled rungs.
+        """
+        if index not in self._folds:
+            train_idx, valid_idx = self.splits[index]
+            X_train, y_train, w_train = self.resampler.resample(self.X[train_idx], self.y[train_idx])
+            order = np.random.default_rng(self.seed).permutation(len(y_train))
+            self._folds[index] = (X_train, y_train, w_train, self.X[valid_idx], self.y[valid_idx], order)
+        return self._folds[index]
+
+
+class SearchResult:
+    """
+    Outcome of a search, with the GridSearchCV attribute names callers use.
+    """
+
+    def __init__(self, best_params, best_score, best_estimator, trials, n_fits, elapsed):
+        self.best_params_ = best_params
+        self.best_score_ = best_score
+        self.best_estimator_ = best_estimator
+        self.trials_ = trials
+        self.n_fits_ = n_fits
+        self.elapsed_ = elapsed
+
+
+class SuccessiveHalvingSearch:
+    """
+    Successive halving over n_estimators ('n_estimators') or over the
+    fraction of training rows ('samples').
+
+    n_configs configurations start at the lowest rung; each rung multiplies
+    the resource by eta and keeps the best 1/eta of the configurations, until
+    max_resource. Scores are mean fold AUC.
+    """
+
+    def __init__(self, estimator, space, sampler='tpe', resource='n_estimators', n_configs=27,
+                 eta=3, min_resource=None, max_resource=None, cv=5, seed=None, resampler=None,
+                 fixed_params=None, checkpoint=None, verbose=True):
+        self.estimator = estimator
+        self.space = space
+        self.sampler = SAMPLERS[sampler](space, seed=seed)
+        self.resource = resource
+        self.n_configs = n_configs
+        self.eta = eta
+        if resource == 'n_estimators':
+            self.max_resource = max_resource or 300
+            self.min_resource = min_resource or max(10, self.max_resource // eta ** 3)
+        elif resource == 'samples':
+            self.max_resource = max_resource or 1.0
+            self.min_resource = min_resource or self.max_resource / eta ** 2
+        else:
+            raise ValueError(f"Unknown resource: {resource}")
+        self.cv = cv
+        self.seed = seed
+        self.resampler = get_strategy(resampler, seed)
+        self.fixed_params = fixed_params or {}
+        self.checkpoint = checkpoint
+        self.verbose = verbose
+
+        self.n_fits = 0
+        # Mean fold AUC by trial key, loaded from the checkpoint by fit
+        self._scores = {}
+        self._signature = None
+
+    def rungs(self):
+        """Resource of every rung, lowest first, ending at max_resource."""
+        n_rungs = int(math.floor(math.log(self.max_resource / self.min_resource, self.eta) + 1e-9)) + 1
+        resources = [self.max_resource / self.eta ** (n_rungs - 1 - k) for k in range(n_rungs)]
+        if self.resource == 'n_estimators':
+            resources = [max(1, int(round(r))) for r in resources]
+        return resources
+
+    def fit(self, X, y):
+        start = time.perf_counter()
+        self._signature = self.signature(X, y)
+        self._scores = self._load_checkpoint()
+        folds = FoldCache(X, y, self.cv, self.seed, self.resampler)
+        trials = []
+
+        configs = None
+        for rung, resource in enumerate(self.rungs()):
+            scored = []
+            # The first rung asks one config at a time so TPE learns from it
+            for i in range(self.n_configs if configs is None else len(configs)):
+                params = self._ask_new([p for _, p in scored]) if configs is None else configs[i]
+                score = self._evaluate(params, resource, folds)
+                self.sampler.tell(params, score, rung)
+                trials.append({'params': params, 'rung': rung, 'resource': resource, 'score': score})
+                scored.append((score, params))
+
+            scored.sort(key=lambda item: item[0], reverse=True)
+            if self.verbose:
+                print(f"Rung {rung}: {len(scored)} configs at {self.resource}={resource}, "
+                      f"best CV AUC {scored[0][0]:.4f}")
+
+            keep = max(1, len(scored) // self.eta)
+            configs = [params for _, params in scored[:keep]]
+            best_score, best_params = scored[0]
+
+        best_estimator = self._build(best_params, self.rungs()[-1])
+        fit_weighted(best_estimator, *self.resampler.resample(X, y))
+        self.n_fits += 1
+
+        return SearchResult(best_params, best_score, best_estimator, trials, self.n_fits,
+                            time.perf_counter() - start)
+
+    def signature(self, X, y):
+        """
+        What a trial's score depends on besides its parameters and resource:
+        checkpointed scores are only reused by a search with the same one.
+        """
+        data = hashlib.sha256()
+        for array in (np.ascontiguousarray(X, dtype=np.float64), np.ascontiguousarray(y, dtype=np.float64)):
+            data.update(repr(array.shape).encode())
+            data.update(array.tobytes())
+        estimator = type(self.estimator)
+        return {
+            'estimator': f"{estimator.__module__}.{estimator.__qualname__}",
+            'estimator_params': json.dumps(self.estimator.get_params(deep=False), sort_keys=True, default=repr),
+            'fixed_params': json.dumps(self.fixed_params, sort_keys=True, default=repr),
+            'cv': self.cv,
+            'seed': self.seed,
+            'resampler': self.resampler.name,
+            'resource': self.resource,
+            'data': data.hexdigest(),
+        }
+
+    def _ask_new(self, seen, attempts=20):
+        """Ask the sampler for a config not in seen, giving up after attempts."""
+        for _ in range(attempts):
+            params = self.sampler.ask()
+            if params not in seen:
+                break
+        return params
+
+    def _build(self, params, resource):
+        model = clone(self.estimator).set_params(**self.fixed_params, **params)
+        if self.resource == 'n_estimators':
+            model.set_params(n_estimators=resource)
+        return model
+
+    def _evaluate(self, params, resource, folds):
+        key = json.dumps({'params': params, 'resource': resource}, sort_keys=True)
+        if key in self._scores:
+            return self._scores[key]
+
+        scores = []
+        for index in range(self.cv):
+            X_train, y_train, w_train, X_valid, y_valid, order = folds.fold(index)
+            if self.resource == 'samples':
+                rows = order[:max(2 * self.cv, int(resource * len(order)))]
+                X_train, y_train = X_train[rows], y_train[rows]
+                w_train = None if w_train is None else w_train[rows]
+            model = self._build(params, resource)
+            fit_weighted(model, X_train, y_train, w_train)
+            scores.append(roc_auc_score(y_valid, model.predict_proba(X_valid)[:, 1]))
+            self.n_fits += 1
+
+        score = float(np.mean(scores))
+        self._scores[key] = score
+        self._save_checkpoint()
+        return score
+
+    def _load_checkpoint(self):
+        if self.checkpoint and os.path.exists(self.checkpoint):
+            with open(self.checkpoint) as f:
+                saved = json.load(f)
+            if saved.get('signature') == self._signature:
+                return saved['scores']
+            if self.verbose:
+                print(f"Ignoring checkpoint {self.checkpoint}: it was written by a different search")
+        return {}
+
+    def _save_checkpoint(self):
+        if not self.checkpoint:
+            return
+        tmp_path = f"{self.checkpoint}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'signature': self._signature, 'scores': self._scores}, f)
+        os.replace(tmp_path, self.checkpoint)
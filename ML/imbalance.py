@@ -0,0 +1,155 @@
+"""
+Class-imbalance strategies for model training.
+
+A strategy turns a training split into (X, y, sample_weight) and is applied
+to each CV fold's training part separately, so no synthetic point built
+from a validation row can leak into training:
+
+- 'none': the data as is
+- 'class_weight': no resampling; balanced per-row weights (for XGBoost this
+  is equivalent to scale_pos_weight)
+- 'smote': imblearn's SMOTE with exact nearest neighbours
+- 'approx_smote': SMOTE with approximate neighbours, searched only among
+  rows close to each other along a random projection
+
+Objects with imblearn's fit_resample are accepted wherever a strategy is.
+"""
+
+import numpy as np
+
+DEFAULT_STRATEGY = 'class_weight'
+
+
+def balanced_weights(y):
+    """Per-row weights giving both classes equal total weight"""
+    y = np.asarray(y)
+    counts = np.bincount(y, minlength=2)
+    if counts.min() == 0:
+        raise ValueError("Training data must contain both classes.")
+    return (len(y) / (2 * counts))[y]
+
+
+def fit_weighted(model, X, y, sample_weight=None):
+    """model.fit, passing sample_weight only when there is one"""
+    if sample_weight is None:
+        return model.fit(X, y)
+    return model.fit(X, y, sample_weight=sample_weight)
+
+
+class NoResampling:
+    name = 'none'
+
+    def __init__(self, seed=None):
+        self.seed = seed
+
+    def resample(self, X, y):
+        return np.asarray(X), np.asarray(y), None
+
+
+class ClassWeights(NoResampling):
+    name = 'class_weight'
+
+    def resample(self, X, y):
+        y = np.asarray(y)
+        return np.asarray(X), y, balanced_weights(y)
+
+
+class SMOTEResampling(NoResampling):
+    name = 'smote'
+
+    def __init__(self, seed=None, k_neighbors=5):
+        self.seed = seed
+        self.k_neighbors = k_neighbors
+
+    def resample(self, X, y):
+        from imblearn.over_sampling import SMOTE
+        X, y = SMOTE(random_state=self.seed, k_neighbors=self.k_neighbors).fit_resample(np.asarray(X),
+                                                                                        np.asarray(y))
+        return X, y, None
+
+
+class ApproxSMOTE(SMOTEResampling):
+    """
+    SMOTE whose neighbour search looks only at the `window` minority rows on
+    either side of each row in a random-projection ordering, instead of
+    all of them: O(n * window) rather than a full nearest-neighbour search.
+    """
+
+    name = 'approx_smote'
+
+    def __init__(self, seed=None, k_neighbors=5, window=16):
+        super().__init__(seed, k_neighbors)
+        self.window = window
+
+    def neighbours(self, X_min, rng):
+        """(n_minority, k) indices of each row's approximate nearest neighbours"""
+        n = len(X_min)
+        order = np.argsort(X_min @ rng.normal(size=X_min.shape[1]), kind='stable')
+        position = np.empty(n, dtype=np.int64)
+        position[order] = np.arange(n)
+
+        offsets = np.concatenate([np.arange(-self.window, 0), np.arange(1, self.window + 1)])
+        candidates = order[np.clip(position[:, None] + offsets, 0, n - 1)]
+        distances = ((X_min[candidates] - X_min[:, None, :]) ** 2).sum(axis=2)
+        # Rows near the ends see clipped duplicates of themselves
+        distances[candidates == np.arange(n)[:, None]] = np.inf
+        k = min(self.k_neighbors, n - 1)
+        nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        return np.take_along_axis(candidates, nearest, axis=1)
+
+    def resample(self, X, y):
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y)
+        counts = np.bincount(y, minlength=2)
+        minority = int(np.argmin(counts))
+        X_min = X[y == minority]
+        n_new = int(counts.max() - counts.min())
+        if n_new == 0 or len(X_min) < 2:
+            return X, y, None
+
+        rng = np.random.default_rng(self.seed)
+        neighbours = self.neighbours(X_min, rng)
+        base = rng.integers(0, len(X_min), n_new)
+        partner = neighbours[base, rng.integers(0, neighbours.shape[1], n_new)]
+        gap = rng.random((n_new, 1))
+        synthetic = X_min[base] + gap * (X_min[partner] - X_min[base])
+        return (np.vstack([X, synthetic]),
+                np.concatenate([y, np.full(n_new, minority, dtype=y.dtype)]), None)
+
+
+class _FitResampleAdapter:
+    """A strategy wrapping an object with imblearn's fit_resample"""
+
+    def __init__(self, resampler):
+        self.resampler = resampler
+        self.name = type(resampler).__name__
+
+    def resample(self, X, y):
+        X, y = self.resampler.fit_resample(np.asarray(X), np.asarray(y))
+        return X, y, None
+
+
+STRATEGIES = {
+    'none': NoResampling,
+    'class_weight': ClassWeights,
+    'smote': SMOTEResampling,
+    'approx_smote': ApproxSMOTE,
+}
+
+
+def get_strategy(strategy=DEFAULT_STRATEGY, seed=None):
+    """
+    A strategy object from a name in STRATEGIES, a strategy, an object
+    with fit_resample, or None (no resampling).
+    """
+    if strategy is None:
+        return NoResampling(seed)
+    if isinstance(strategy, str):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown imbalance strategy: {strategy} (choose from {', '.join(STRATEGIES)})")
+        return STRATEGIES[strategy](seed=seed)
+    if hasattr(strategy, 'resample'):
+        return strategy
+    if hasattr(strategy, 'fit_resample'):
+        return _FitResampleAdapter(strategy)
+    raise TypeError(f"Not an imbalance strategy: {strategy!r}")
@@ -0,0 +1,220 @@
+"""
+Off-loop inference for the ML API: a bounded thread/process pool plus a
+micro-batcher that merges concurrent single-student requests into one
+generate_predictions call.
+"""
+
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import numpy as np
+
+
+class QueueFullError(Exception):
+    """Raised when the micro-batcher queue is at its depth limit."""
+
+
+# Predictor owned by each process-pool worker, loaded by _init_worker
+_worker_predictor = None
+
+
+def _init_worker(model_path, compile_model=False):
+    global _worker_predictor
+    from student_dropout_predictor import StudentDropoutPredictor
+    _worker_predictor = StudentDropoutPredictor()
+    _worker_predictor.load_model(model_path, compile=compile_model)
+
+
+def predict_in_worker(X):
+    """
+    generate_predictions on the process-pool worker's own predictor.
+    """
+    return _worker_predictor.generate_predictions(X)
+
+
+def create_executor(kind='thread', max_workers=None, model_path=None, compile_model=False):
+    """
+    Create the pool inference runs on. Process workers load their own copy of
+    the model from model_path and must be called through predict_in_worker.
+    """
+    if kind == 'process':
+        return ProcessPoolExecutor(max_workers, initializer=_init_worker,
+                                   initargs=(model_path, compile_model))
+    if kind == 'thread':
+        return ThreadPoolExecutor(max_workers, thread_name_prefix='inference')
+    raise ValueError(f"Unknown executor kind: {kind}")
+
+
+class BatcherStats:
+    """
+    Counters for queue wait and batch size of a MicroBatcher.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.rejected = 0
+        self.batches = 0
+        self.rows = 0
+        self.max_batch_size = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        # Batch count per power-of-two size bucket (1, 2, 4, ...)
+        self.batch_size_buckets = {}
+
+    def record_batch(self, size, waits):
+        self.batches += 1
+        self.rows += size
+        self.max_batch_size = max(self.max_batch_size, size)
+        bucket = 1 << (size - 1).bit_length()
+        self.batch_size_buckets[bucket] = self.batch_size_buckets.get(bucket, 0) + 1
+        self.queue_wait_total += sum(waits)
+        self.queue_wait_max = max(self.queue_wait_max, max(waits))
+
+    def to_dict(self):
+        dispatched = self.requests - self.rejected
+        return {
+            'requests': self.requests,
+            'rejected': self.rejected,
+            'batches': self.batches,
+            'rows': self.rows,
+            'mean_batch_size': self.rows / self.batches if self.batches else 0.0,
+            'max_batch_size': self.max_batch_size,
+            'batch_size_buckets': dict(sorted(self.batch_size_buckets.items())),
+            'mean_queue_wait_ms': 1000 * self.queue_wait_total / dispatched if dispatched else 0.0,
+            'max_queue_wait_ms': 1000 * self.queue_wait_max,
+        }
+
+
+class MicroBatcher:
+    """
+    Merge concurrent prediction requests arriving within max_wait_ms into one
+    predict_fn call on the executor, then fan the results back out.
+
+    predict_fn takes a raw (rows, n_features) array and returns
+    (predictions, probabilities). At most max_in_flight batches run at once;
+    while they do, new requests keep accumulating into the next batch. Once
+    max_queue_depth requests are waiting, submit raises QueueFullError.
+    """
+
+    def __init__(self, predict_fn, executor=None, max_batch_size=256, max_wait_ms=2.0,
+                 max_queue_depth=1024, max_in_flight=1):
+        self.predict_fn = predict_fn
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue_depth = max_queue_depth
+        self.max_in_flight = max_in_flight
+        self.stats = BatcherStats()
+
+        self._pending = deque()
+        self._pending_rows = 0
+        self._task = None
+        self._dispatches = set()
+
+    @property
+    def queue_depth(self):
+        return len(self._pending)
+
+    def start(self):
+        self._has_items = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self, drain=False):
+        """
+        Stop batching. With drain, requests already queued are scored first;
+        otherwise they fail with RuntimeError.
+        """
+        if drain:
+            while self._task is not None and self._pending:
+                await asyncio.sleep(max(self.max_wait, 0.001))
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._dispatches:
+            await asyncio.gather(*self._dispatches, return_exceptions=True)
+        while self._pending:
+            _, future, _ = self._pending.popleft()
+            if not future.done():
+                future.set_exception(RuntimeError("Inference batcher stopped"))
+        self._pending_rows = 0
+
+    async def submit(self, X):
+        """
+        Queue raw feature rows for prediction and wait for their results.
+        """
+        if self._task is None:
+            raise RuntimeError("Inference batcher is not running")
+
+        self.stats.requests += 1
+        if len(self._pending) >= self.max_queue_depth:
+            self.stats.rejected += 1
+            raise QueueFullError(f"Inference queue is full ({self.max_queue_depth} requests waiting)")
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((X, future, time.perf_counter()))
+        self._pending_rows += len(X)
+        self._has_items.set()
+        if self._pending_rows >= self.max_batch_size:
+            self._batch_full.set()
+        return await future
+
+    async def _run(self):
+        while True:
+            await self._slots.acquire()
+            await self._has_items.wait()
+
+            # Give concurrent requests a few milliseconds to join this batch
+            if self._pending_rows < self.max_batch_size and self.max_wait > 0:
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), self.max_wait)
+                except asyncio.TimeoutError:
+                    pass
+
+            batch = [self._pending.popleft()]
+            rows = len(batch[0][0])
+            while self._pending and rows + len(self._pending[0][0]) <= self.max_batch_size:
+                item = self._pending.popleft()
+                batch.append(item)
+                rows += len(item[0])
+            self._pending_rows -= rows
+
+            if not self._pending:
+                self._has_items.clear()
+            if self._pending_rows < self.max_batch_size:
+                self._batch_full.clear()
+
+            dispatch = asyncio.get_running_loop().create_task(self._dispatch(batch, rows))
+            self._dispatches.add(dispatch)
+            dispatch.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch, rows):
+        try:
+            now = time.perf_counter()
+            self.stats.record_batch(rows, [now - queued for _, _, queued in batch])
+
+            X = batch[0][0] if len(batch) == 1 else np.concatenate([item[0] for item in batch])
+            loop = asyncio.get_running_loop()
+            try:
+                predictions, probabilities = await loop.run_in_executor(self.executor, self.predict_fn, X)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            offset = 0
+            for X_item, future, _ in batch:
+                n = len(X_item)
+                if not future.done():
+                    future.set_result((predictions[offset:offset + n], probabilities[offset:offset + n]))
+                offset += n
+        finally:
+            self._slots.release()
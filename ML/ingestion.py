@@ -0,0 +1,206 @@
+"""
+Chunked training data ingestion.
+
+Term-history exports are read in column-pruned batches with compact dtypes
+(float32 features, int8 target, categorical student_id), and the feature
+transform statistics are accumulated one batch at a time, so memory stays a
+small multiple of one chunk regardless of file size.
+"""
+
+import os
+
+import numpy as np
+
+from feature_transform import FeatureTransform
+
+DEFAULT_CHUNK_SIZE = 100_000
+# Values kept per feature for the median estimate; exact below this many rows
+RESERVOIR_SIZE = 100_000
+ID_COLUMN = 'student_id'
+TARGET_COLUMN = 'dropped_out'
+
+
+def _file_format(path):
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix not in ('.csv', '.parquet'):
+        raise ValueError(f"Unsupported input format: {suffix or path}")
+    return suffix[1:]
+
+
+def _read_columns(path):
+    if _file_format(path) == 'parquet':
+        import pyarrow.parquet as pq
+        return list(pq.ParquetFile(path).schema_arrow.names)
+    import pandas as pd
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def feature_columns(path):
+    """
+    Feature columns of a CSV or Parquet file: everything but the ID and target.
+    """
+    return [col for col in _read_columns(path) if col not in (ID_COLUMN, TARGET_COLUMN)]
+
+
+def iter_batches(path, features=None, chunk_size=DEFAULT_CHUNK_SIZE, include_ids=False, dtype=np.float32):
+    """
+    Yield DataFrames of at most chunk_size rows holding only the feature
+    columns (float32 unless dtype says otherwise), the target if present
+    (int8) and, when include_ids, student_id as a categorical.
+    """
+    import pandas as pd
+
+    available = _read_columns(path)
+    features = feature_columns(path) if features is None else list(features)
+    columns = list(features)
+    if TARGET_COLUMN in available:
+        columns.append(TARGET_COLUMN)
+    if include_ids and ID_COLUMN in available:
+        columns.append(ID_COLUMN)
+    dtypes = {name: dtype for name in features}
+    dtypes[TARGET_COLUMN] = np.int8
+    dtypes[ID_COLUMN] = 'category'
+
+    if _file_format(path) == 'parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            df = batch.to_pandas()
+            yield df.astype({name: dtypes[name] for name in df.columns})
+    else:
+        yield from pd.read_csv(path, usecols=columns, dtype={name: dtypes[name] for name in columns},
+                               chunksize=chunk_size)
+
+
+class StreamingStats:
+    """
+    One-pass FeatureTransform statistics.
+
+    Mean and variance of the non-missing values are merged batch by batch
+    (Chan et al.), and the median comes from a per-feature reservoir sample.
+    Once the median is known, mean and variance of the median-imputed column
+    follow exactly from the missing count, matching FeatureTransform.fit.
+    """
+
+    def __init__(self, feature_names, reservoir_size=RESERVOIR_SIZE, seed=0):
+        self.feature_names = list(feature_names)
+        n_features = len(self.feature_names)
+        self.count = np.zeros(n_features, dtype=np.int64)
+        self.missing = np.zeros(n_features, dtype=np.int64)
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)
+        self.reservoirs = [np.empty(reservoir_size) for _ in range(n_features)]
+        self.reservoir_size = reservoir_size
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, X):
+        """
+        Add a (rows, n_features) batch of raw values; NaN marks a missing value.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        for j in range(len(self.feature_names)):
+            column = X[:, j]
+            values = column[~np.isnan(column)]
+            self.missing[j] += len(column) - len(values)
+            if len(values) == 0:
+                continue
+
+            n_a, n_b = self.count[j], len(values)
+            mean_b = values.mean()
+            delta = mean_b - self.mean[j]
+            n = n_a + n_b
+            self.mean[j] += delta * n_b / n
+            self.m2[j] += ((values - mean_b) ** 2).sum() + delta ** 2 * n_a * n_b / n
+            self._sample(j, values, n_a)
+            self.count[j] = n
+
+    def _sample(self, j, values, seen):
+        """Reservoir sampling (Algorithm R) of values into feature j's reservoir."""
+        reservoir = self.reservoirs[j]
+        free = max(0, self.reservoir_size - seen)
+        reservoir[seen:seen + min(free, len(values))] = values[:free]
+        rest = values[free:]
+        if len(rest):
+            positions = seen + free + np.arange(len(rest))
+            slots = self.rng.integers(0, positions + 1)
+            keep = slots < self.reservoir_size
+            reservoir[slots[keep]] = rest[keep]
+
+    @classmethod
+    def from_transform(cls, transform, n_rows, reservoir_size=RESERVOIR_SIZE, seed=0):
+        """
+        Approximate statistics of n_rows training rows from a fitted transform,
+        for models saved without their statistics: the transform's mean and
+        scale, and a reservoir holding only the median.
+        """
+        stats = cls(transform.feature_names, reservoir_size, seed)
+        stats.count[:] = n_rows
+        stats.mean[:] = transform.mean
+        stats.m2[:] = transform.scale ** 2 * n_rows
+        for reservoir, median in zip(stats.reservoirs, transform.medians):
+            reservoir[:] = median
+        return stats
+
+    def to_dict(self):
+        kept = [reservoir[:min(count, self.reservoir_size)].copy()
+                for reservoir, count in zip(self.reservoirs, self.count)]
+        return {
+            'feature_names': self.feature_names,
+            'count': self.count.copy(),
+            'missing': self.missing.copy(),
+            'mean': self.mean.copy(),
+            'm2': self.m2.copy(),
+            'reservoirs': kept,
+            'reservoir_size': self.reservoir_size,
+            'rng_state': self.rng.bit_generator.state,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls(data['feature_names'], data['reservoir_size'])
+        stats.count[:] = data['count']
+        stats.missing[:] = data['missing']
+        stats.mean[:] = data['mean']
+        stats.m2[:] = data['m2']
+        for reservoir, kept in zip(stats.reservoirs, data['reservoirs']):
+            reservoir[:len(kept)] = kept
+        stats.rng.bit_generator.state = data['rng_state']
+        return stats
+
+    def medians(self):
+        return np.array([
+            np.median(reservoir[:min(count, self.reservoir_size)]) if count else 0.0
+            for reservoir, count in zip(self.reservoirs, self.count)
+        ])
+
+    def to_transform(self):
+        """
+        Build the FeatureTransform these statistics describe.
+        """
+        medians = self.medians()
+        # Merge each feature's observed values with its missing values
+        # imputed as the median (a group of zero variance)
+        total = self.count + self.missing
+        safe_total = np.maximum(total, 1)
+        delta = medians - self.mean
+        mean = self.mean + delta * self.missing / safe_total
+        m2 = self.m2 + delta ** 2 * self.count * self.missing / safe_total
+        scale = np.sqrt(m2 / safe_total)
+        # Constant features are left unscaled, as StandardScaler does
+        scale[scale == 0.0] = 1.0
+        return FeatureTransform(self.feature_names, mean, scale, medians)
+
+
+def fit_transform_streaming(path, features=None, chunk_size=DEFAULT_CHUNK_SIZE, reservoir_size=RESERVOIR_SIZE):
+    """
+    Fit a FeatureTransform over a CSV or Parquet file in a single chunked pass.
+    Returns (transform, n_rows, positives).
+    """
+    features = feature_columns(path) if features is None else list(features)
+    stats = StreamingStats(features, reservoir_size)
+    n_rows = positives = 0
+    for df in iter_batches(path, features, chunk_size):
+        stats.update(df[features].to_numpy())
+        n_rows += len(df)
+        if TARGET_COLUMN in df.columns:
+            positives += int(df[TARGET_COLUMN].sum())
+    return stats.to_transform(), n_rows, positives
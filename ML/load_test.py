@@ -0,0 +1,167 @@
+"""
+Load test of serve.py as the worker count scales.
+
+For each worker count a fresh server is started on a temporary registry
+(seeded from student_dropout_model.pkl), and --concurrency client threads
+with keep-alive connections send prediction requests for --duration
+seconds. Reports requests/s and p50/p99 latency. The prediction cache is
+disabled unless --cache is given, so every request reaches the model.
+
+Usage: python load_test.py [--workers 1 2 4] [--concurrency 16] [--duration 10]
+       [--endpoint predict|bulk] [--bulk-size 100]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(port, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/ready')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"Server on port {port} did not become ready")
+
+
+def make_bodies(endpoint, bulk_size, n=256, seed=0):
+    """Request bodies with varied students"""
+    rng = np.random.default_rng(seed)
+
+    def student(i):
+        return {
+            'student_id': f'STU_{i:06d}',
+            'avg_attendance': float(rng.uniform(30, 100)),
+            'avg_assignment_grade': float(rng.uniform(20, 100)),
+            'attendance_trend': float(rng.uniform(-1, 1)),
+        }
+
+    if endpoint == 'bulk':
+        return [json.dumps({'students': [student(i * bulk_size + j) for j in range(bulk_size)]}).encode()
+                for i in range(n)]
+    return [json.dumps(student(i)).encode() for i in range(n)]
+
+
+def drive(port, path, bodies, concurrency, duration):
+    """
+    Send requests from concurrency threads for duration seconds. Returns
+    (latencies in seconds, error count, elapsed seconds).
+    """
+    latencies = [[] for _ in range(concurrency)]
+    errors = [0] * concurrency
+    stop_at = time.perf_counter() + duration
+    headers = {'Content-Type': 'application/json'}
+
+    def client(k):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        i = k
+        while time.perf_counter() < stop_at:
+            body = bodies[i % len(bodies)]
+            i += concurrency
+            start = time.perf_counter()
+            try:
+                conn.request('POST', path, body, headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    errors[k] += 1
+                    continue
+            except OSError:
+                errors[k] += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                continue
+            latencies[k].append(time.perf_counter() - start)
+        conn.close()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(k,)) for k in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return np.concatenate([np.array(l) for l in latencies]), sum(errors), time.perf_counter() - start
+
+
+def run(worker_counts=(1, 2, 4), concurrency=16, duration=10.0, endpoint='predict', bulk_size=100,
+        cache=False):
+    """
+    Return [{workers, requests_per_s, p50_ms, p99_ms, errors}] per worker count.
+    """
+    path = '/predict/bulk' if endpoint == 'bulk' else '/predict'
+    bodies = make_bodies(endpoint, bulk_size)
+    results = []
+    for workers in worker_counts:
+        port = free_port()
+        with tempfile.TemporaryDirectory() as registry_dir:
+            env = dict(os.environ, ML_MODEL_REGISTRY=registry_dir)
+            if not cache:
+                env['ML_CACHE_SIZE'] = '0'
+            server = subprocess.Popen(
+                [sys.executable, 'serve.py', '--host', '127.0.0.1', '--port', str(port),
+                 '--workers', str(workers)],
+                cwd=ML_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            try:
+                wait_until_ready(port)
+                # Give every worker time to finish its own startup
+                time.sleep(1.0)
+                drive(port, path, bodies, concurrency, min(1.0, duration))
+                latencies, errors, elapsed = drive(port, path, bodies, concurrency, duration)
+            finally:
+                server.send_signal(signal.SIGTERM)
+                server.wait(timeout=60)
+
+        results.append({
+            'workers': workers,
+            'requests_per_s': len(latencies) / elapsed,
+            'p50_ms': float(np.percentile(latencies, 50)) * 1000 if len(latencies) else float('nan'),
+            'p99_ms': float(np.percentile(latencies, 99)) * 1000 if len(latencies) else float('nan'),
+            'errors': errors,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--endpoint', choices=['predict', 'bulk'], default='predict')
+    parser.add_argument('--bulk-size', type=int, default=100)
+    parser.add_argument('--cache', action='store_true', help="leave the prediction cache enabled")
+    args = parser.parse_args()
+
+    results = run(args.workers, args.concurrency, args.duration, args.endpoint, args.bulk_size, args.cache)
+    print(f"{'workers':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for row in results:
+        print(f"{row['workers']:>8}{row['requests_per_s']:>10.1f}{row['p50_ms']:>10.2f}"
+              f"{row['p99_ms']:>10.2f}{row['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,60 +3,139 @@ FastAPI backend for Student Dropout Prediction ML Model
 Integrates with MERN stack frontend via REST API
 """
 
-import uvicorn
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Query, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel, validator
 from typing import List, Optional, Dict, Any
-import pandas as pd
 import numpy as np
-import joblib
 import os
-from datetime import datetime
+import json
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
 # Import our ML model
 from student_dropout_predictor import StudentDropoutPredictor
+from inference import MicroBatcher, QueueFullError, create_executor, predict_in_worker
+from prediction_cache import ExplanationCache, PredictionCache, SQLiteBackend
+import columnar
+import instrumentation
+from risk_rules import DEFAULT_ENGINE as RISK_ENGINE, summarize
+from model_registry import DEFAULT_REGISTRY_DIR, ModelManager, ModelNotFoundError, ModelRegistry, ServingModel
+from risk_index import DEFAULT_INDEX_DIR, RiskIndexReader
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Global variables for model
-predictor = None
-model_loaded = False
+MODEL_PATH = 'student_dropout_model.pkl'
+
+# Inference pool and micro-batching settings
+EXECUTOR_KIND = os.environ.get("ML_EXECUTOR", "thread")
+INFERENCE_WORKERS = int(os.environ.get("ML_INFERENCE_WORKERS", "2"))
+BATCH_MAX_SIZE = int(os.environ.get("ML_BATCH_MAX_SIZE", "256"))
+BATCH_MAX_WAIT_MS = float(os.environ.get("ML_BATCH_MAX_WAIT_MS", "2"))
+MAX_QUEUE_DEPTH = int(os.environ.get("ML_MAX_QUEUE_DEPTH", "1024"))
+
+# Score with the NumPy-compiled tree ensemble instead of the library estimator
+USE_COMPILED_MODEL = os.environ.get("ML_COMPILED_MODEL", "1") == "1"
+
+# Prediction result cache; size 0 disables it. With a path, workers on the
+# host share results through a SQLite file
+CACHE_SIZE = int(os.environ.get("ML_CACHE_SIZE", "10000"))
+CACHE_TTL_S = float(os.environ.get("ML_CACHE_TTL_S", "300"))
+CACHE_PATH = os.environ.get("ML_CACHE_PATH")
+# Larger lookups, and any that touch the shared file, run on a worker thread
+CACHE_INLINE_ROWS = 64
+# Per-feature contributions served by /predict/explain, cached in process
+EXPLAIN_CACHE_SIZE = int(os.environ.get("ML_EXPLAIN_CACHE_SIZE", "10000"))
+
+# Streaming endpoint: students scored per model call, and how long a
+# partial batch waits for more rows before it is scored anyway
+STREAM_BATCH_ROWS = int(os.environ.get("ML_STREAM_BATCH_ROWS", "1000"))
+STREAM_MAX_WAIT_MS = float(os.environ.get("ML_STREAM_MAX_WAIT_MS", "200"))
+
+# Versioned model registry; serving processes follow its CURRENT version
+REGISTRY_DIR = DEFAULT_REGISTRY_DIR
+REGISTRY_POLL_S = float(os.environ.get("ML_REGISTRY_POLL_S", "5"))
+# Materialized risk table built by risk_index.py; reopened when it is rebuilt
+RISK_INDEX_DIR = os.environ.get("ML_RISK_INDEX_DIR", DEFAULT_INDEX_DIR)
+RISK_INDEX_CHECK_S = 1.0
+
+# Token required in the X-Admin-Token header by /admin endpoints, if set
+ADMIN_TOKEN = os.environ.get("ML_ADMIN_TOKEN")
+
+# Predictors loaded before the app starts, by registry version. serve.py
+# fills this in the parent process so forked workers share the model
+PRELOADED_MODELS = {}
+
+# Global variables for model serving
+manager = None
+cache = None
+explanation_cache = None
+risk_reader = None
+
+def build_serving_model(version: str, model_path: str) -> ServingModel:
+    """Load a registry version with its own inference pool and batcher"""
+    predictor = PRELOADED_MODELS.pop(version, None)
+    if predictor is None:
+        predictor = StudentDropoutPredictor()
+        predictor.load_model(model_path, compile=USE_COMPILED_MODEL)
+
+    # Process workers load their own model copy; threads share ours
+    executor = create_executor(EXECUTOR_KIND, INFERENCE_WORKERS, os.path.abspath(model_path),
+                               USE_COMPILED_MODEL)
+    predict_fn = predict_in_worker if EXECUTOR_KIND == "process" else predictor.generate_predictions
+    batcher = MicroBatcher(
+        predict_fn, executor,
+        max_batch_size=BATCH_MAX_SIZE,
+        max_wait_ms=BATCH_MAX_WAIT_MS,
+        max_queue_depth=MAX_QUEUE_DEPTH,
+        max_in_flight=INFERENCE_WORKERS
+    )
+    return ServingModel(version, predictor, executor, predict_fn, batcher)
+
+def open_registry() -> ModelRegistry:
+    """Open the registry, importing the legacy model file as its first version"""
+    registry = ModelRegistry(REGISTRY_DIR)
+    if not registry.versions() and os.path.exists(MODEL_PATH):
+        version = registry.publish(MODEL_PATH, {"imported_from": MODEL_PATH}, set_current=True)
+        logger.info(f"Imported {MODEL_PATH} into the model registry as {version}")
+    return registry
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup
-    global predictor, model_loaded
+    # Startup: the model loads in the background; /ready reports when it is
+    # serving. Models are trained offline (train_model.py), never here
+    global manager, cache, explanation_cache
     try:
-        predictor = StudentDropoutPredictor()
-        
-        # Try to load existing model, if not create and train a new one
-        if os.path.exists('student_dropout_model.pkl'):
-            predictor.load_model('student_dropout_model.pkl')
-            logger.info("Loaded existing model from file")
-        else:
-            logger.info("No existing model found. Training new model...")
-            # Generate data and train model
-            df = predictor.load_data()
-            X, y = predictor.preprocess_data(df)
-            results, X_test, y_test = predictor.train_models(X, y)
-            predictor.save_model('student_dropout_model.pkl')
-            logger.info("New model trained and saved")
-        
-        model_loaded = True
-        logger.info("ML Model initialized successfully")
+        manager = ModelManager(open_registry(), build_serving_model, poll_interval=REGISTRY_POLL_S)
+        if CACHE_SIZE > 0:
+            backend = SQLiteBackend(CACHE_PATH, CACHE_TTL_S) if CACHE_PATH else None
+            cache = PredictionCache(CACHE_SIZE, CACHE_TTL_S, backend)
+        if EXPLAIN_CACHE_SIZE > 0:
+            explanation_cache = ExplanationCache(EXPLAIN_CACHE_SIZE, CACHE_TTL_S)
+        loading = asyncio.get_running_loop().create_task(manager.start())
+        if manager.registry.current() is None:
+            logger.warning("Model registry is empty. Run train_model.py to publish a model.")
     except Exception as e:
-        logger.error(f"Failed to initialize ML model: {e}")
-        model_loaded = False
+        logger.error(f"Failed to initialize ML model registry: {e}")
+        loading = None
     
     yield
     
     # Shutdown
     logger.info("Shutting down ML service")
+    if loading is not None:
+        loading.cancel()
+        try:
+            await loading
+        except asyncio.CancelledError:
+            pass
+    if manager is not None:
+        await manager.stop()
 
 app = FastAPI(
     title="Student Dropout Prediction API",
@@ -73,6 +152,13 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(instrumentation.RequestTimer)
+
+# Allowed ranges of numeric request fields: (low, high, error message)
+FIELD_RANGES = {
+    'avg_attendance': (0, 100, 'Attendance must be between 0 and 100'),
+    'avg_assignment_grade': (0, 100, 'Assignment grade must be between 0 and 100'),
+}
 
 # Pydantic models for request/response
 class StudentData(BaseModel):
@@ -88,16 +174,11 @@ class StudentData(BaseModel):
     participation_score: Optional[float] = 75.0
     previous_gpa: Optional[float] = 3.0
     
-    @validator('avg_attendance')
-    def validate_attendance(cls, v):
-        if not 0 <= v <= 100:
-            raise ValueError('Attendance must be between 0 and 100')
-        return v
-    
-    @validator('avg_assignment_grade')
-    def validate_grade(cls, v):
-        if not 0 <= v <= 100:
-            raise ValueError('Assignment grade must be between 0 and 100')
+    @validator(*FIELD_RANGES)
+    def validate_range(cls, v, field):
+        low, high, message = FIELD_RANGES[field.name]
+        if not low <= v <= high:
+            raise ValueError(message)
         return v
 
 class BulkStudentData(BaseModel):
@@ -115,6 +196,53 @@ class BulkPredictionResponse(BaseModel):
     predictions: List[PredictionResponse]
     summary: Dict[str, Any]
 
+class StudentExplanation(BaseModel):
+    student_id: str
+    dropout_probability: float
+    risk_level: str
+    contributions: Dict[str, float]
+    risk_drivers: List[str]
+    recommendations: List[str]
+
+class ExplanationResponse(BaseModel):
+    base_value: float
+    output: str
+    feature_names: List[str]
+    explanations: List[StudentExplanation]
+    summary: Dict[str, Any]
+
+# The same fields and checks applied column-wise to bulk requests
+STUDENT_SCHEMA = columnar.ColumnSchema.from_model(StudentData, FIELD_RANGES)
+
+class RiskRecord(BaseModel):
+    student_id: str
+    dropout_probability: float
+    risk_level: str
+    course: Optional[str]
+    percentile: float
+
+class RiskIndexInfo(BaseModel):
+    model_fingerprint: str
+    built_at: float
+    stale: bool
+
+class StudentRisk(RiskRecord):
+    index: RiskIndexInfo
+
+class RiskTop(BaseModel):
+    index: RiskIndexInfo
+    students: List[RiskRecord]
+
+class RiskPage(BaseModel):
+    index: RiskIndexInfo
+    total: int
+    students: List[RiskRecord]
+
+class RiskPercentiles(BaseModel):
+    index: RiskIndexInfo
+    students: int
+    percentiles: Dict[str, Optional[float]]
+
 class ModelMetrics(BaseModel):
     accuracy: float
     auc_score: float
@@ -124,56 +252,231 @@ class ModelMetrics(BaseModel):
 # Helper functions
 def get_risk_level(probability: float) -> str:
     """Determine risk level based on dropout probability"""
-    if probability >= 0.7:
-        return "HIGH"
-    elif probability >= 0.3:
-        return "MEDIUM"
-    else:
-        return "LOW"
+    return RISK_ENGINE.band_names[RISK_ENGINE.band_codes(probability)]
 
 def get_recommendations(probability: float, student_data: dict) -> List[str]:
     """Generate recommendations based on risk level and student data"""
-    recommendations = []
-    
-    if probability >= 0.7:
-        recommendations.extend([
-            "Immediate intervention required",
-            "Schedule emergency counseling session",
-            "Implement daily attendance monitoring",
-            "Provide intensive academic support"
-        ])
-        
-        if student_data.get('avg_attendance', 100) < 70:
-            recommendations.append("Critical attendance issue - contact family")
-        
-        if student_data.get('avg_assignment_grade', 100) < 60:
-            recommendations.append("Severe academic performance concern - consider tutoring")
-            
-    elif probability >= 0.3:
-        recommendations.extend([
-            "Enhanced monitoring recommended",
-            "Weekly check-ins with advisor",
-            "Additional tutoring support",
-            "Monitor for declining trends"
-        ])
-        
-        if student_data.get('avg_attendance', 100) < 80:
-            recommendations.append("Improve attendance tracking")
-            
+    features = {name: [student_data[name]] for name in RISK_ENGINE.features if name in student_data}
+    return list(RISK_ENGINE.assess([probability], features).recommendations[0])
+
+def rule_features(students: List[StudentData]) -> Dict[str, np.ndarray]:
+    """Columns of the features the risk rules look at"""
+    return {
+        name: np.fromiter((getattr(s, name) for s in students), dtype=np.float64, count=len(students))
+        for name in RISK_ENGINE.features
+    }
+
+def build_bulk_response(student_ids, predictions: np.ndarray, probabilities: np.ndarray,
+                        assessment) -> Dict[str, Any]:
+    """Shape a cohort's predictions and their RiskAssessment like BulkPredictionResponse"""
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    confidences = np.maximum(probabilities, 1 - probabilities)
+
+    response_data = [
+        {
+            "student_id": student_id,
+            "dropout_probability": probability,
+            "risk_level": risk_level,
+            "predicted_dropout": bool(predicted_dropout),
+            "confidence": confidence,
+            "recommendations": student_recommendations
+        }
+        for student_id, probability, risk_level, predicted_dropout, confidence, student_recommendations in zip(
+            student_ids, probabilities.tolist(), assessment.band_names.tolist(), np.asarray(predictions).tolist(),
+            confidences.tolist(), assessment.recommendations
+        )
+    ]
+
+    return {"predictions": response_data, "summary": assessment.summary()}
+
+def render_bulk_response(media_type: str, student_ids, predictions: np.ndarray, probabilities: np.ndarray,
+                         features: Dict[str, np.ndarray]) -> Response:
+    """Assess a cohort's predictions and encode them in the negotiated media type"""
+    start = instrumentation.clock()
+    assessment = RISK_ENGINE.assess(probabilities, features)
+    start = instrumentation.record('recommendations', start)
+    if media_type == columnar.JSON:
+        # Already shaped like BulkPredictionResponse; skip per-row response validation
+        response = JSONResponse(content=build_bulk_response(student_ids, predictions, probabilities, assessment))
+    elif media_type == columnar.NDJSON:
+        response = Response(content=columnar.encode_ndjson(student_ids, predictions, probabilities, assessment),
+                            media_type=media_type)
     else:
-        recommendations.extend([
-            "Continue regular monitoring",
-            "Maintain current support level",
-            "Consider as peer mentor candidate"
-        ])
-    
-    return recommendations
+        response = Response(content=columnar.encode_arrow(student_ids, predictions, probabilities, assessment),
+                            media_type=media_type)
+    instrumentation.record('serialization', start)
+    return response
+
+def assemble_timed(transform, columns) -> np.ndarray:
+    """transform.assemble_columns, recorded as the feature_assembly stage"""
+    start = instrumentation.clock()
+    X = transform.assemble_columns(columns.values, len(columns))
+    instrumentation.record('feature_assembly', start)
+    return X
 
-def check_model_ready():
-    """Dependency to check if model is loaded"""
-    if not model_loaded or predictor is None:
+async def predict_cached(serving: ServingModel, X: np.ndarray, infer):
+    """
+    Serve the rows of X found in the prediction cache and score the rest
+    with infer (the version's batcher.submit or run_inference), caching their results.
+    """
+    if cache is None:
+        return await infer(X)
+
+    # Hashing a cohort's rows is kept off the event loop
+    offload = len(X) > CACHE_INLINE_ROWS or cache.backend is not None
+    version = serving.fingerprint
+    if offload:
+        keys, found, predictions, probabilities = await asyncio.to_thread(cache.get_many, X, version)
+    else:
+        keys, found, predictions, probabilities = cache.get_many(X, version)
+
+    if not found.all():
+        missing = ~found
+        missing_predictions, missing_probabilities = await infer(X[missing])
+        predictions[missing] = missing_predictions
+        probabilities[missing] = missing_probabilities
+        missing_keys = [key for key, hit in zip(keys, found) if not hit]
+        if offload:
+            await asyncio.to_thread(cache.put_many, missing_keys, missing_predictions, missing_probabilities)
+        else:
+            cache.put_many(missing_keys, missing_predictions, missing_probabilities)
+    return predictions, probabilities
+
+def explain_rows(serving: ServingModel, X: np.ndarray):
+    """
+    (probabilities, contributions) of the rows of X, from the explanation
+    cache where possible. Runs on a worker thread
+    """
+    predictor = serving.predictor
+    if explanation_cache is None:
+        return predictor.explain(X)
+
+    keys, found, probabilities, contributions = explanation_cache.get_many(X, serving.fingerprint, X.shape[1])
+    if not found.all():
+        missing = ~found
+        missing_probabilities, missing_contributions = predictor.explain(X[missing])
+        probabilities[missing] = missing_probabilities
+        contributions[missing] = missing_contributions
+        missing_keys = [key for key, hit in zip(keys, found) if not hit]
+        explanation_cache.put_many(missing_keys, missing_probabilities, missing_contributions)
+    return probabilities, contributions
+
+def render_explanations(serving: ServingModel, student_ids, probabilities: np.ndarray, contributions: np.ndarray,
+                        features: Dict[str, np.ndarray]) -> JSONResponse:
+    """Band, recommend and encode a cohort's explanations like ExplanationResponse"""
+    start = instrumentation.clock()
+    feature_names = serving.predictor.feature_names
+    assessment = RISK_ENGINE.assess(probabilities, features)
+    explainer = serving.predictor.explainer()
+    drivers, driver_recommendations = RISK_ENGINE.explain(contributions, feature_names, assessment.band_codes,
+                                                          explainer.output)
+    start = instrumentation.record('recommendations', start)
+
+    rows = zip(student_ids, probabilities.tolist(), assessment.band_names.tolist(), contributions.tolist(),
+               drivers, assessment.recommendations, driver_recommendations)
+    explanations = [
+        {
+            "student_id": student_id,
+            "dropout_probability": probability,
+            "risk_level": risk_level,
+            "contributions": dict(zip(feature_names, row)),
+            "risk_drivers": student_drivers,
+            "recommendations": band_recommendations + extra_recommendations
+        }
+        for student_id, probability, risk_level, row, student_drivers, band_recommendations, extra_recommendations
+        in rows
+    ]
+    response = JSONResponse(content={
+        "base_value": explainer.expected_value,
+        "output": explainer.output,
+        "feature_names": feature_names,
+        "explanations": explanations,
+        "summary": assessment.summary(),
+    })
+    instrumentation.record('serialization', start)
+    return response
+
+def check_model_ready() -> ServingModel:
+    """
+    Return the active model version. Requests keep using it even if another
+    version is swapped in while they run
+    """
+    serving = manager.active if manager is not None else None
+    if serving is None:
         raise HTTPException(status_code=503, detail="ML model not ready")
-    return True
+    return serving
+
+def check_admin_token(token: Optional[str]):
+    """Reject admin calls without the configured token"""
+    if ADMIN_TOKEN and token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+class RequestStreamingResponse(StreamingResponse):
+    """
+    A StreamingResponse whose body generator consumes the request body.
+    Starlette's version listens for client disconnects on the same receive
+    channel, which would swallow the request chunks; here a disconnect
+    surfaces through request.stream() instead
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+def encode_stream_batch(student_ids, predictions, probabilities, assessment) -> bytes:
+    """NDJSON prediction lines of one streamed batch"""
+    start = instrumentation.clock()
+    content = columnar.encode_ndjson(student_ids, predictions, probabilities, assessment, False)
+    instrumentation.record('serialization', start)
+    return content
+
+async def stream_predictions(serving: ServingModel, content_type: str, chunks):
+    """
+    Score NDJSON or CSV chunks batch by batch as they arrive, yielding NDJSON
+    prediction lines and finally a {"summary": ...} line. Invalid input ends
+    the stream with a {"detail": ...} line, since the status is already sent.
+    """
+    counts = dict.fromkeys(RISK_ENGINE.band_names, 0)
+    header = None
+    offset = 0
+
+    def parse(lines):
+        start = instrumentation.clock()
+        if content_type == columnar.CSV:
+            columns = columnar.parse_csv_lines(lines, header, STUDENT_SCHEMA, offset)
+        else:
+            columns = columnar.parse_ndjson_lines(lines, STUDENT_SCHEMA, offset)
+        start = instrumentation.record('validation', start)
+        X = serving.predictor.transform.assemble_columns(columns.values, len(columns))
+        instrumentation.record('feature_assembly', start)
+        return columns, X
+
+    async for lines in columnar.iter_line_batches(chunks, STREAM_BATCH_ROWS, STREAM_MAX_WAIT_MS / 1000):
+        try:
+            if content_type == columnar.CSV and header is None:
+                header = columnar.parse_csv_header(lines[0])
+                lines = lines[1:]
+                if not lines:
+                    continue
+            columns, X = await asyncio.to_thread(parse, lines)
+            predictions, probabilities = await predict_cached(serving, X, serving.run_inference)
+        except columnar.ColumnValidationError as e:
+            yield json.dumps({"detail": e.located("body")}).encode() + b"\n"
+            return
+        except Exception as e:
+            yield json.dumps({"detail": f"Prediction failed: {str(e)}"}).encode() + b"\n"
+            return
+
+        start = instrumentation.clock()
+        assessment = RISK_ENGINE.assess(probabilities, columns.values)
+        for band, count in assessment.counts.items():
+            counts[band] += count
+        instrumentation.record('recommendations', start)
+        yield await asyncio.to_thread(encode_stream_batch, columns.ids, predictions, probabilities, assessment)
+        offset += len(columns)
+
+    yield json.dumps({"summary": summarize(counts)}).encode() + b"\n"
 
 # API Endpoints
 @app.get("/")
@@ -182,45 +485,378 @@ async def root():
     return {
         "message": "Student Dropout Prediction API",
         "status": "running",
-        "model_loaded": model_loaded,
+        "model_loaded": manager is not None and manager.ready,
         "version": "1.0.0"
     }
 
 @app.post("/predict", response_model=PredictionResponse)
-async def predict_single_student(student: StudentData):
+async def predict_single_student(student: StudentData, request: Request):
     """Predict dropout risk for a single student"""
+    serving = check_model_ready()
+    # Reading and validating the body happened before the handler was called
+    start = instrumentation.record('validation', request.state.request_start) if instrumentation.ENABLED else 0.0
+
     try:
-        student_df = pd.DataFrame([student.dict()])
-        X, _ = predictor.preprocess_data(student_df)
-        predictions, probabilities = predictor.generate_predictions(X)
+        X = serving.predictor.transform.assemble([student])
+        instrumentation.record('feature_assembly', start)
+        predictions, probabilities = await predict_cached(serving, X, serving.batcher.submit)
 
         probability = probabilities[0]
         predicted_dropout = predictions[0]
-        risk_level = get_risk_level(probability)
+        start = instrumentation.clock()
+        assessment = RISK_ENGINE.assess(probabilities, rule_features([student]))
+        start = instrumentation.record('recommendations', start)
         confidence = max(probability, 1 - probability)
-        recommendations = get_recommendations(probability, student.dict())
 
-        return PredictionResponse(
+        response = PredictionResponse(
             student_id=student.student_id,
             dropout_probability=probability,
-            risk_level=risk_level,
+            risk_level=assessment.band_names[0],
             predicted_dropout=predicted_dropout,
             confidence=confidence,
-            recommendations=recommendations
+            recommendations=assessment.recommendations[0]
         )
+        instrumentation.record('serialization', start)
+        return response
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
+BULK_REQUEST_DOCS = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            columnar.JSON: {"schema": {
+                "title": "BulkStudentData",
+                "type": "object",
+                "required": ["students"],
+                "properties": {
+                    "students": {"type": "array", "items": {"$ref": "#/components/schemas/StudentData"}},
+                },
+            }},
+            columnar.NDJSON: {"schema": {"$ref": "#/components/schemas/StudentData"}},
+            columnar.CSV: {"schema": {"type": "string"}},
+            columnar.ARROW: {"schema": {"type": "string", "format": "binary"}},
+        },
+    },
+}
+
+BULK_RESPONSE_DOCS = {
+    200: {"content": {columnar.NDJSON: {}, columnar.ARROW: {}}},
+    406: {"description": "Requested response format is not available"},
+    415: {"description": "Unsupported request format"},
+}
+
+@app.post("/predict/bulk", response_model=BulkPredictionResponse, openapi_extra=BULK_REQUEST_DOCS,
+          responses=BULK_RESPONSE_DOCS)
+async def predict_bulk_students(request: Request):
+    """
+    Predict dropout risk for a whole cohort with a single model call. The
+    body may be JSON ({"students": [...]}), NDJSON or an Arrow stream, per
+    Content-Type; the response format follows the Accept header
+    """
+    serving = check_model_ready()
+
+    content_type = columnar.media_type(request.headers.get("content-type"))
+    if not content_type or content_type.endswith("+json"):
+        content_type = columnar.JSON
+    response_type = columnar.negotiate(request.headers.get("accept"))
+    if response_type is None:
+        raise HTTPException(status_code=406, detail=f"Responses are available as {', '.join(columnar.MEDIA_TYPES)}")
+    try:
+        if response_type == columnar.ARROW:
+            columnar.require_pyarrow()
+    except columnar.UnsupportedFormatError as e:
+        raise HTTPException(status_code=406, detail=str(e))
+
+    body = await request.body()
+    try:
+        columns = await asyncio.to_thread(columnar.parse_columns, content_type, body, STUDENT_SCHEMA)
+    except columnar.ColumnValidationError as e:
+        raise RequestValidationError(e.located("body"))
+    except columnar.UnsupportedFormatError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    if instrumentation.ENABLED:
+        instrumentation.record('validation', request.state.request_start)
+
+    try:
+        if len(columns):
+            X = await asyncio.to_thread(assemble_timed, serving.predictor.transform, columns)
+            predictions, probabilities = await predict_cached(serving, X, serving.run_inference)
+        else:
+            predictions = np.zeros(0, dtype=bool)
+            probabilities = np.zeros(0)
+
+        return await asyncio.to_thread(render_bulk_response, response_type, columns.ids, predictions,
+                                       probabilities, columns.values)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Bulk prediction failed: {str(e)}")
+
+@app.post("/predict/explain", response_model=ExplanationResponse, openapi_extra=BULK_REQUEST_DOCS, responses={
+    415: {"description": "Unsupported request format"},
+    501: {"description": "The serving model is not a tree ensemble"},
+})
+async def explain_students(request: Request):
+    """
+    Predict dropout risk for a cohort with each student's per-feature
+    contributions (exact TreeSHAP, see tree_shap). base_value plus a
+    student's contributions is the model output, a probability or log-odds
+    as named by output. For MEDIUM and HIGH risk students, the largest
+    contributions above a minimum are named as risk drivers and add their
+    recommendations (see risk_rules.RiskEngine.explain). The body is read like
+    /predict/bulk; the response is JSON
+    """
+    serving = check_model_ready()
+
+    content_type = columnar.media_type(request.headers.get("content-type"))
+    if not content_type or content_type.endswith("+json"):
+        content_type = columnar.JSON
+    body = await request.body()
+    try:
+        columns = await asyncio.to_thread(columnar.parse_columns, content_type, body, STUDENT_SCHEMA)
+    except columnar.ColumnValidationError as e:
+        raise RequestValidationError(e.located("body"))
+    except columnar.UnsupportedFormatError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    if instrumentation.ENABLED:
+        instrumentation.record('validation', request.state.request_start)
+
+    try:
+        # Built once per model version, on first use
+        await asyncio.to_thread(serving.predictor.explainer)
+    except ValueError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+    try:
+        X = await asyncio.to_thread(assemble_timed, serving.predictor.transform, columns)
+        probabilities, contributions = await asyncio.to_thread(explain_rows, serving, X)
+        return await asyncio.to_thread(render_explanations, serving, columns.ids, probabilities, contributions,
+                                       columns.values)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Explanation failed: {str(e)}")
+
+STREAM_REQUEST_DOCS = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            columnar.NDJSON: {"schema": {"$ref": "#/components/schemas/StudentData"}},
+            columnar.CSV: {"schema": {"type": "string"}},
+        },
+    },
+}
+
+@app.post("/predict/stream", openapi_extra=STREAM_REQUEST_DOCS, responses={
+    200: {"content": {columnar.NDJSON: {}}, "description": "One prediction per line, then a summary line"},
+    415: {"description": "Unsupported request format"},
+})
+async def predict_stream(request: Request):
+    """
+    Score a cohort of any size: the NDJSON or CSV body is read and scored in
+    batches of STREAM_BATCH_ROWS students, and NDJSON results are streamed
+    back as each batch completes. A smaller batch is scored at the end of the
+    body, or once its first student has waited STREAM_MAX_WAIT_MS for the
+    rest. The whole stream uses the model version active when it started
+    """
+    serving = check_model_ready()
+
+    content_type = columnar.media_type(request.headers.get("content-type")) or columnar.NDJSON
+    if content_type not in (columnar.NDJSON, columnar.CSV):
+        raise HTTPException(status_code=415, detail=f"Unsupported content type: {content_type}")
+
+    return RequestStreamingResponse(stream_predictions(serving, content_type, request.stream()),
+                                    media_type=columnar.NDJSON)
+
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy", "model_loaded": model_loaded}
+    """Liveness: the process is up, whether or not a model is loaded yet"""
+    return {"status": "healthy", "model_loaded": manager is not None and manager.ready}
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness: 200 once a model version is serving, 503 until then"""
+    if manager is None:
+        return JSONResponse(status_code=503, content={"ready": False, "state": "failed"})
+    status = manager.status()
+    return JSONResponse(status_code=200 if manager.ready else 503, content={"ready": manager.ready, **status})
+
+@app.get("/metrics/inference")
+async def inference_metrics():
+    """Inference pool and micro-batcher queue/batch statistics"""
+    serving = check_model_ready()
+    return {
+        "model_version": serving.version,
+        "executor": EXECUTOR_KIND,
+        "workers": INFERENCE_WORKERS,
+        "queue_depth": serving.batcher.queue_depth,
+        "max_queue_depth": MAX_QUEUE_DEPTH,
+        **serving.batcher.stats.to_dict(),
+        "cache": {"size": len(cache), "max_size": CACHE_SIZE, **cache.stats.to_dict()} if cache else None,
+        "explanation_cache": {
+            "size": len(explanation_cache), "max_size": EXPLAIN_CACHE_SIZE, **explanation_cache.stats.to_dict()
+        } if explanation_cache is not None else None
+    }
+
+def collect_metrics() -> List[List[str]]:
+    """Scrape-time model, queue and cache metrics, as metric_family line lists"""
+    family = instrumentation.metric_family
+    serving = manager.active if manager is not None else None
+    families = [family("ml_model_ready", "gauge", "Whether a model version is serving.",
+                       [({}, int(serving is not None))])]
+    if serving is not None:
+        batcher = serving.batcher.stats
+        families += [
+            family("ml_model_info", "gauge", "The serving model version.",
+                   [({"version": serving.version, "fingerprint": serving.fingerprint}, 1)]),
+            family("ml_queue_depth", "gauge", "Requests waiting in the micro-batcher.",
+                   [({}, serving.batcher.queue_depth)]),
+            family("ml_batcher_requests_total", "counter", "Requests submitted to the micro-batcher.",
+                   [({}, batcher.requests)]),
+            family("ml_batcher_rejected_total", "counter", "Requests rejected with the queue full.",
+                   [({}, batcher.rejected)]),
+            family("ml_batcher_batches_total", "counter", "Micro-batches dispatched.", [({}, batcher.batches)]),
+            family("ml_batcher_rows_total", "counter", "Rows in dispatched micro-batches.", [({}, batcher.rows)]),
+            family("ml_batcher_queue_wait_seconds_total", "counter", "Total time requests waited to be batched.",
+                   [({}, batcher.queue_wait_total)]),
+        ]
+    if cache is not None:
+        stats = cache.stats
+        families += [
+            family("ml_cache_entries", "gauge", "Entries in the in-process prediction cache.", [({}, len(cache))]),
+            family("ml_cache_lookups_total", "counter", "Prediction cache lookups, by result.", [
+                ({"result": "hit"}, stats.hits - stats.shared_hits),
+                ({"result": "shared_hit"}, stats.shared_hits),
+                ({"result": "miss"}, stats.misses),
+            ]),
+            family("ml_cache_removals_total", "counter", "Prediction cache entries dropped, by reason.", [
+                ({"reason": "eviction"}, stats.evictions),
+                ({"reason": "expiration"}, stats.expirations),
+            ]),
+        ]
+    return families
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Stage latency and batch size histograms, model, queue and cache metrics in Prometheus text format"""
+    return PlainTextResponse(instrumentation.exposition(*collect_metrics()),
+                             media_type=instrumentation.CONTENT_TYPE)
+
+def check_risk_table():
+    """The current risk table, opened from RISK_INDEX_DIR"""
+    global risk_reader
+    if risk_reader is None or risk_reader.root != RISK_INDEX_DIR:
+        risk_reader = RiskIndexReader(RISK_INDEX_DIR, RISK_INDEX_CHECK_S)
+    table = risk_reader.table()
+    if table is None:
+        raise HTTPException(status_code=503, detail="Risk index not built; run risk_index.py")
+    return table
+
+def risk_index_info(table):
+    """
+    The model that built the risk table, and whether it is stale: built by
+    another model than the one now serving predictions
+    """
+    serving = manager.active if manager is not None else None
+    return {
+        "model_fingerprint": table.model_fingerprint,
+        "built_at": table.meta["built_at"],
+        "stale": serving is not None and serving.fingerprint != table.model_fingerprint,
+    }
+
+def check_course(table, course: Optional[str]):
+    if course is not None and course not in table.courses:
+        raise HTTPException(status_code=404, detail=f"Unknown course: {course}")
+
+@app.get("/risk/top", response_model=RiskTop)
+async def riskiest_students(k: int = Query(100, ge=1, le=10000), course: Optional[str] = None):
+    """The k students with the highest dropout probability, optionally within a course"""
+    table = check_risk_table()
+    check_course(table, course)
+    students = await asyncio.to_thread(table.top_k, k, course)
+    return {"index": risk_index_info(table), "students": students}
+
+@app.get("/risk/band/{band}", response_model=RiskPage)
+async def students_in_band(band: str, course: Optional[str] = None, limit: int = Query(100, ge=1, le=10000),
+                           offset: int = Query(0, ge=0)):
+    """Students in a risk band (LOW, MEDIUM, HIGH), riskiest first"""
+    table = check_risk_table()
+    check_course(table, course)
+    band = band.upper()
+    if band not in RISK_ENGINE.band_names:
+        raise HTTPException(status_code=404, detail=f"Unknown risk band: {band}")
+    total, students = await asyncio.to_thread(table.in_band, band, course, limit, offset)
+    return {"index": risk_index_info(table), "total": total, "students": students}
+
+@app.get("/risk/percentiles", response_model=RiskPercentiles)
+async def risk_percentiles(q: List[float] = Query([50.0, 90.0, 99.0]), course: Optional[str] = None):
+    """Dropout probability at each percentile q (0-100) of the roster or a course"""
+    table = check_risk_table()
+    check_course(table, course)
+    if not all(0 <= value <= 100 for value in q):
+        raise HTTPException(status_code=422, detail="Percentiles must be between 0 and 100")
+    values = await asyncio.to_thread(table.percentiles, q, course)
+    students = len(table) if course is None else len(table.rows(course))
+    return {
+        "index": risk_index_info(table),
+        "students": students,
+        "percentiles": {f"{key:g}": value for key, value in values.items()},
+    }
+
+@app.get("/risk/student/{student_id}", response_model=StudentRisk)
+async def student_risk(student_id: str):
+    """A student's current risk from the risk table"""
+    table = check_risk_table()
+    record = table.get(student_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Student not in the risk index: {student_id}")
+    return {**record, "index": risk_index_info(table)}
+
+@app.get("/admin/models")
+async def list_models(x_admin_token: Optional[str] = Header(None)):
+    """Registry versions and the serving state"""
+    check_admin_token(x_admin_token)
+    if manager is None:
+        raise HTTPException(status_code=503, detail="Model registry not available")
+    registry = manager.registry
+    return {
+        **manager.status(),
+        "history": registry.history(),
+        "versions": [registry.metadata(version) for version in registry.versions()]
+    }
+
+@app.post("/admin/models/{version}/promote")
+async def promote_model(version: str, x_admin_token: Optional[str] = Header(None)):
+    """Load and warm up a version, then switch live traffic to it"""
+    check_admin_token(x_admin_token)
+    if manager is None:
+        raise HTTPException(status_code=503, detail="Model registry not available")
+    try:
+        await manager.activate(version)
+    except ModelNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Unknown model version: {version}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load model version {version}: {str(e)}")
+    return manager.status()
+
+@app.post("/admin/models/rollback")
+async def rollback_model(x_admin_token: Optional[str] = Header(None)):
+    """Switch back to the previously current version"""
+    check_admin_token(x_admin_token)
+    if manager is None:
+        raise HTTPException(status_code=503, detail="Model registry not available")
+    try:
+        await manager.rollback()
+    except ModelNotFoundError as e:
+        raise HTTPException(status_code=409, detail=str(e.args[0]))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Rollback failed: {str(e)}")
+    return manager.status()
 
 # API Endpoint for testing with sample data
 @app.get("/test-sample", response_model=BulkPredictionResponse)
 async def test_sample_data():
     """Test the model with predefined sample data"""
-    check_model_ready()
+    serving = check_model_ready()
 
     # Sample data with all expected features
     sample_data = [
@@ -244,35 +880,12 @@ async def test_sample_data():
         }
     ]
 
-    sample_df = pd.DataFrame(sample_data)
-    X, _ = predictor.preprocess_data(sample_df)
-    predictions, probabilities = predictor.generate_predictions(X)
-
-    response_data = []
-    for i, student in enumerate(sample_data):
-        probability = probabilities[i]
-        predicted_dropout = predictions[i]
-        risk_level = get_risk_level(probability)
-        confidence = max(probability, 1 - probability)
-        recommendations = get_recommendations(probability, student)
-
-        response_data.append(PredictionResponse(
-            student_id=student["student_id"],
-            dropout_probability=probability,
-            risk_level=risk_level,
-            predicted_dropout=predicted_dropout,
-            confidence=confidence,
-            recommendations=recommendations
-        ))
-
-    summary = {
-        "total_students": len(sample_data),
-        "high_risk": sum(1 for r in response_data if r.risk_level == "HIGH"),
-        "medium_risk": sum(1 for r in response_data if r.risk_level == "MEDIUM"),
-        "low_risk": sum(1 for r in response_data if r.risk_level == "LOW")
-    }
-
-    return BulkPredictionResponse(predictions=response_data, summary=summary)
+    students = [StudentData(**student) for student in sample_data]
+    predictions, probabilities = await serving.run_inference(serving.predictor.transform.assemble(students))
+    return build_bulk_response([s.student_id for s in students], predictions, probabilities,
+                               RISK_ENGINE.assess(probabilities, rule_features(students)))
 
 if __name__ == "__main__":
+    # Development server; use serve.py for multi-worker production serving
+    import uvicorn
     uvicorn.run("main:app", host="localhost", port=8000, reload=True)
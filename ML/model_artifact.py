@@ -0,0 +1,180 @@
+"""
+Pickle-free, memory-mapped model artifact.
+
+An artifact holds a compiled tree ensemble, the frozen feature transform and
+the decision threshold in one file:
+
+    bytes 0-7      magic b'SDMODEL1'
+    bytes 8-15     manifest length, little-endian uint64
+    manifest       UTF-8 JSON: schema, array table and checksum
+    padding        to ALIGNMENT
+    data region    raw little-endian arrays, each starting on ALIGNMENT
+
+Loading parses the JSON manifest and memory-maps the data region read-only,
+so nothing is unpickled and every worker process on a host shares the same
+physical pages.
+
+Usage: python model_artifact.py MODEL.pkl ARTIFACT.mmap [--publish]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+MAGIC = b'SDMODEL1'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+ARTIFACT_SUFFIX = '.mmap'
+
+_HEADER = struct.Struct('<8sQ')
+
+
+class ArtifactError(ValueError):
+    """Raised for a file that is not a valid model artifact."""
+
+
+def is_artifact(path):
+    """True if path starts with the artifact magic bytes."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_artifact(path, ensemble, transform, decision_threshold, source_model=None):
+    """
+    Write a compiled ensemble, its feature transform and the decision
+    threshold as an artifact. The file is replaced atomically.
+    """
+    arrays = {f'ensemble/{name}': array for name, array in ensemble.to_arrays().items()}
+    arrays['ensemble/child_slots'] = ensemble._child_slots.astype(np.intp)
+    transform_data = transform.to_dict()
+    for name in ('mean', 'scale', 'medians'):
+        arrays[f'transform/{name}'] = np.asarray(transform_data[name], dtype=np.float64)
+
+    # Lay out the data region, every array starting on an aligned offset
+    table = {}
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        dtype = array.dtype.newbyteorder('<')
+        arrays[name] = array.astype(dtype, copy=False)
+        offset = _aligned(offset)
+        table[name] = {'dtype': dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes
+    data_size = _aligned(offset)
+
+    data = bytearray(data_size)
+    for name, array in arrays.items():
+        start = table[name]['offset']
+        data[start:start + array.nbytes] = array.tobytes()
+
+    manifest = {
+        'format': 'student-dropout-model',
+        'format_version': FORMAT_VERSION,
+        'schema': {
+            'feature_names': transform_data['feature_names'],
+            'decision_threshold': float(decision_threshold),
+            'ensemble': ensemble.metadata(),
+            'source_model': source_model,
+        },
+        'arrays': table,
+        'data_size': data_size,
+        'checksum': {'algorithm': 'sha256', 'digest': hashlib.sha256(data).hexdigest()},
+    }
+    manifest_bytes = json.dumps(manifest, sort_keys=True).encode()
+    header = _HEADER.pack(MAGIC, len(manifest_bytes)) + manifest_bytes
+    padding = b'\0' * (_aligned(len(header)) - len(header))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.artifact-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            f.write(padding)
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return manifest
+
+
+def read_manifest(path):
+    """Return (manifest, data offset) of an artifact."""
+    with open(path, 'rb') as f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ArtifactError(f"{path} is not a model artifact")
+        magic, length = _HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ArtifactError(f"{path} is not a model artifact")
+        manifest = json.loads(f.read(length))
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ArtifactError(f"Unsupported artifact version: {manifest.get('format_version')}")
+    return manifest, _aligned(_HEADER.size + length)
+
+
+def load_artifact(path, verify=True):
+    """
+    Memory-map an artifact. Returns (ensemble, transform, decision_threshold,
+    manifest); every array is a read-only view of the shared mapping. With
+    verify, the data region is checked against the manifest checksum.
+    """
+    from feature_transform import FeatureTransform
+    from tree_ensemble import CompiledEnsemble
+
+    manifest, data_offset = read_manifest(path)
+    data = np.memmap(path, dtype=np.uint8, mode='r', offset=data_offset, shape=(manifest['data_size'],))
+    if verify and hashlib.sha256(data).hexdigest() != manifest['checksum']['digest']:
+        raise ArtifactError(f"Checksum mismatch in {path}")
+
+    arrays = {}
+    for name, spec in manifest['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'], dtype=np.int64))
+        if spec['offset'] + count * dtype.itemsize > manifest['data_size']:
+            raise ArtifactError(f"Array {name} lies outside the data region")
+        arrays[name] = np.frombuffer(data, dtype=dtype, count=count, offset=spec['offset']).reshape(spec['shape'])
+
+    schema = manifest['schema']
+    ensemble_arrays = {name.split('/', 1)[1]: array for name, array in arrays.items()
+                       if name.startswith('ensemble/')}
+    ensemble = CompiledEnsemble(**ensemble_arrays, **schema['ensemble'])
+    transform = FeatureTransform(schema['feature_names'], arrays['transform/mean'],
+                                 arrays['transform/scale'], arrays['transform/medians'])
+    return ensemble, transform, schema['decision_threshold'], manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('model', help="joblib model saved by StudentDropoutPredictor.save_model")
+    parser.add_argument('artifact')
+    parser.add_argument('--publish', action='store_true',
+                        help="publish the artifact to the model registry as the current version")
+    args = parser.parse_args()
+
+    from student_dropout_predictor import StudentDropoutPredictor
+    predictor = StudentDropoutPredictor()
+    predictor.load_model(args.model)
+    predictor.save_artifact(args.artifact)
+
+    if args.publish:
+        from model_registry import DEFAULT_REGISTRY_DIR, ModelRegistry
+        version = ModelRegistry(DEFAULT_REGISTRY_DIR).publish(args.artifact, {'converted_from': args.model},
+                                                             set_current=True)
+        print(f"Published to model registry as {version}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+Versioned model registry and zero-downtime model switching for the ML API.
+
+The registry is a local directory:
+
+    <root>/versions/<version>/model.*      saved model (joblib .pkl or .mmap artifact)
+    <root>/versions/<version>/meta.json    creation time, source and metrics
+    <root>/CURRENT                         version serving processes should run
+    <root>/history.json                    previously current versions
+
+Versions are written to a temporary directory and renamed into place, and
+CURRENT is replaced atomically, so readers never see a partial version.
+Training only ever publishes here; serving processes load from here.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+# Registry location shared by the API and train_model.py
+DEFAULT_REGISTRY_DIR = os.environ.get('ML_MODEL_REGISTRY', 'model_registry')
+MODEL_FILENAME = 'model.pkl'
+META_FILENAME = 'meta.json'
+
+logger = logging.getLogger(__name__)
+
+
+class ModelNotFoundError(KeyError):
+    """Raised for a version that is not in the registry."""
+
+
+class ModelRegistry:
+    """
+    Versioned model files in a local directory.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.versions_dir = os.path.join(root, 'versions')
+        os.makedirs(self.versions_dir, exist_ok=True)
+
+    def versions(self):
+        """Version names, oldest first. Unfinished publishes (.publish-*) are skipped."""
+        return sorted(
+            name for name in os.listdir(self.versions_dir)
+            if not name.startswith('.') and os.path.exists(os.path.join(self.versions_dir, name, META_FILENAME))
+        )
+
+    def metadata(self, version):
+        with open(os.path.join(self._version_dir(version), META_FILENAME)) as f:
+            return json.load(f)
+
+    def model_path(self, version):
+        return os.path.join(self._version_dir(version), self.metadata(version).get('model_file', MODEL_FILENAME))
+
+    def _version_dir(self, version):
+        path = os.path.join(self.versions_dir, version)
+        if not version or version.startswith('.') or os.path.basename(version) != version \
+                or not os.path.isdir(path):
+            raise ModelNotFoundError(version)
+        return path
+
+    def publish(self, model_path, metadata=None, set_current=False):
+        """
+        Copy a saved model file into the registry as a new version and return
+        the version name. With set_current, serving processes switch to it.
+        """
+        # Keep the source suffix so pickles and artifacts stay recognisable
+        model_file = 'model' + (os.path.splitext(model_path)[1] or '.pkl')
+        tmp_dir = tempfile.mkdtemp(prefix='.publish-', dir=self.versions_dir)
+        try:
+            shutil.copyfile(model_path, os.path.join(tmp_dir, model_file))
+            meta = {'created_at': time.time(), 'source': os.path.abspath(model_path), 'model_file': model_file,
+                    **(metadata or {})}
+
+            # Version numbers are claimed by the rename, so concurrent
+            # publishers never overwrite each other
+            while True:
+                existing = [int(name[1:]) for name in self.versions() if name[1:].isdigit()]
+                version = f"v{max(existing, default=0) + 1:04d}"
+                with open(os.path.join(tmp_dir, META_FILENAME), 'w') as f:
+                    json.dump({'version': version, **meta}, f, indent=2)
+                try:
+                    os.rename(tmp_dir, os.path.join(self.versions_dir, version))
+                    break
+                except OSError:
+                    if not os.path.exists(os.path.join(self.versions_dir, version)):
+                        raise
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        if set_current:
+            self.set_current(version)
+        return version
+
+    def current(self):
+        """The version serving processes should run, or None."""
+        try:
+            with open(os.path.join(self.root, 'CURRENT')) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def history(self):
+        try:
+            with open(os.path.join(self.root, 'history.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def set_current(self, version):
+        """Point CURRENT at version, remembering the previous one for rollback."""
+        self._version_dir(version)
+        previous = self.current()
+        if previous == version:
+            return
+        if previous is not None:
+            self._write_atomic('history.json', json.dumps(self.history() + [previous]))
+        self._write_atomic('CURRENT', version)
+
+    def rollback(self):
+        """
+        Make the previously current version current again and return it.
+        """
+        history = self.history()
+        if not history:
+            raise ModelNotFoundError("No previous version to roll back to")
+        version = history.pop()
+        self._version_dir(version)
+        self._write_atomic('CURRENT', version)
+        self._write_atomic('history.json', json.dumps(history))
+        return version
+
+    def _write_atomic(self, name, text):
+        fd, tmp_path = tempfile.mkstemp(prefix=f'.{name}-', dir=self.root)
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        os.replace(tmp_path, os.path.join(self.root, name))
+
+
+class ServingModel:
+    """
+    One loaded model version with its own inference pool and micro-batcher.
+    Requests take a reference to the active ServingModel when they start, so
+    a swap never changes the model under a request.
+    """
+
+    def __init__(self, version, predictor, executor, predict_fn, batcher):
+        self.version = version
+        self.predictor = predictor
+        self.executor = executor
+        self.predict_fn = predict_fn
+        self.batcher = batcher
+        self.fingerprint = predictor.model_fingerprint()
+        self.loaded_at = time.time()
+
+    async def run_inference(self, X):
+        """Run predict_fn on this version's pool, off the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.predict_fn, X)
+
+    async def warm_up(self, n_rows=8):
+        """
+        Score a few median-valued students through both the batcher and the
+        pool, so first requests do not pay for lazy initialisation.
+        """
+        transform = self.predictor.transform
+        X = np.tile(transform.medians, (n_rows, 1))
+        X += np.linspace(-1, 1, n_rows)[:, None] * transform.scale
+        await asyncio.gather(*(self.batcher.submit(X[i:i + 1]) for i in range(n_rows)))
+        await self.run_inference(X)
+
+    async def close(self):
+        """Finish queued requests, then release the pool."""
+        await self.batcher.stop(drain=True)
+        await asyncio.to_thread(self.executor.shutdown, True)
+
+
+class ModelManager:
+    """
+    Loads registry versions in the background and swaps the active model.
+
+    build(version, model_path) loads a model and returns a ServingModel
+    whose batcher is not started yet; it runs on a worker thread. The new
+    version is warmed up before it replaces the active one, and the old one
+    is drained afterwards. State is 'starting', 'ready', 'loading' (a new
+    version is being prepared while the old one serves), 'no_model' or
+    'failed'.
+    """
+
+    def __init__(self, registry, build, poll_interval=None):
+        self.registry = registry
+        self.build = build
+        self.poll_interval = poll_interval
+        self.active = None
+        self.state = 'starting'
+        self.last_error = None
+        self._lock = asyncio.Lock()
+        self._closing = set()
+        self._poller = None
+        self._failed_version = None
+
+    @property
+    def ready(self):
+        return self.active is not None
+
+    async def start(self):
+        """
+        Load the registry's current version, if any, and start following
+        CURRENT when a poll interval is set.
+        """
+        version = self.registry.current()
+        if version is None:
+            self.state = 'no_model'
+        else:
+            try:
+                await self.activate(version, set_current=False)
+            except Exception:
+                pass  # Logged by activate; the service stays not ready
+        if self.poll_interval:
+            self._poller = asyncio.get_running_loop().create_task(self._poll())
+
+    async def stop(self):
+        if self._poller is not None:
+            self._poller.cancel()
+            try:
+                await self._poller
+            except asyncio.CancelledError:
+                pass
+        if self.active is not None:
+            await self.active.close()
+            self.active = None
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+
+    async def activate(self, version, set_current=True):
+        """
+        Load, warm up and switch to version. The current model keeps serving
+        until the switch; on failure it stays active.
+        """
+        async with self._lock:
+            if self.active is not None and self.active.version == version:
+                if set_current:
+                    self.registry.set_current(version)
+                return self.active
+
+            path = self.registry.model_path(version)
+            self.state = 'loading'
+            serving = None
+            try:
+                serving = await asyncio.to_thread(self.build, version, path)
+                serving.batcher.start()
+                await serving.warm_up()
+            except Exception as e:
+                logger.error(f"Failed to load model version {version}: {e}")
+                self.last_error = f"{version}: {e}"
+                self._failed_version = version
+                self.state = 'ready' if self.active is not None else 'failed'
+                if serving is not None:
+                    await serving.close()
+                raise
+
+            if set_current:
+                self.registry.set_current(version)
+            old, self.active = self.active, serving
+            self.state = 'ready'
+            self.last_error = None
+            self._failed_version = None
+        logger.info(f"Serving model version {version}")
+
+        if old is not None:
+            closing = asyncio.get_running_loop().create_task(old.close())
+            self._closing.add(closing)
+            closing.add_done_callback(self._closing.discard)
+        return serving
+
+    async def rollback(self):
+        """Switch back to the previously current version."""
+        history = self.registry.history()
+        if not history:
+            raise ModelNotFoundError("No previous version to roll back to")
+        await self.activate(history[-1], set_current=False)
+        return self.registry.rollback()
+
+    async def _poll(self):
+        # Follow CURRENT so every worker picks up a promotion made elsewhere
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            version = self.registry.current()
+            active = self.active.version if self.active is not None else None
+            if version not in (None, active, self._failed_version) and not self._lock.locked():
+                try:
+                    await self.activate(version, set_current=False)
+                except Exception:
+                    pass  # Logged by activate; the old version keeps serving
+
+    def status(self):
+        return {
+            'state': self.state,
+            'active_version': self.active.version if self.active is not None else None,
+            'fingerprint': self.active.fingerprint if self.active is not None else None,
+            'current_version': self.registry.current(),
+            'last_error': self.last_error,
+        }
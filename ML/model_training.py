@@ -0,0 +1,446 @@
+"""
+Model training and hyperparameter tuning for StudentDropoutPredictor.
+
+Kept out of student_dropout_predictor so the serving process never imports
+the training libraries; the predictor imports this module on first use.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split, StratifiedKFold
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.metrics import roc_auc_score
+import xgboost as xgb
+import lightgbm as lgb
+
+from imbalance import DEFAULT_STRATEGY, balanced_weights, fit_weighted, get_strategy
+
+
+def build_candidates(random_state=None, n_jobs=None):
+    """
+    The candidate models compared by train_models. n_jobs is the thread count
+    given to each library that parallelises a single fit.
+    """
+    return {
+        'Random Forest': RandomForestClassifier(n_estimators=100, random_state=random_state, bootstrap=True,
+                                                n_jobs=n_jobs),
+        'Gradient Boosting': GradientBoostingClassifier(random_state=random_state, subsample=0.8),
+        'XGBoost': xgb.XGBClassifier(random_state=random_state, eval_metric='logloss', subsample=0.8,
+                                     n_jobs=n_jobs),
+        'LightGBM': lgb.LGBMClassifier(random_state=random_state, verbose=-1, bagging_fraction=0.8,
+                                       n_jobs=n_jobs)
+    }
+
+
+# Training data shared by every fit task of one train_models run; filled in
+# each pool worker by _init_fit_worker (or in-process for serial runs)
+_fit_data = {}
+
+
+def _init_fit_worker(data):
+    _fit_data.clear()
+    _fit_data.update(data)
+
+
+def _run_fit(model, fold):
+    """
+    Fit one candidate on one CV fold (or on the full training split when fold
+    is None) and score it. Runs in a pool worker.
+    """
+    start = time.perf_counter()
+    if fold is None:
+        fit_weighted(model, _fit_data['X'], _fit_data['y'], _fit_data['w'])
+        y_pred_proba = model.predict_proba(_fit_data['X_test'])[:, 1]
+        auc_score = roc_auc_score(_fit_data['y_test'], y_pred_proba)
+        return model, y_pred_proba, auc_score, time.perf_counter() - start
+
+    X_train, y_train, w_train, X_eval, y_eval = _fit_data['folds'][fold]
+    fit_weighted(model, X_train, y_train, w_train)
+    auc_score = roc_auc_score(y_eval, model.predict_proba(X_eval)[:, 1])
+    return None, None, auc_score, time.perf_counter() - start
+
+
+def train_models(predictor, X, y, n_jobs=None, threads_per_fit=1, time_budget=None,
+                 abandon_margin=None, seed=None, cv=5, imbalance=DEFAULT_STRATEGY):
+    """
+    Train multiple ML models and compare their performance.
+
+    Every candidate's full fit and its cv fold fits are scheduled together on
+    a process pool of n_jobs // threads_per_fit workers, where each fit uses
+    threads_per_fit library threads (n_jobs defaults to all cores). With an
+    abandon_margin, a candidate that has two folds scored is abandoned once
+    its mean fold AUC trails the leader's by more than that margin. No new fits start after
+    time_budget seconds; fits already running finish. With a seed, the split,
+    resampling, folds and every estimator are seeded, so runs are reproducible.
+
+    imbalance names a strategy in imbalance.STRATEGIES (or is a strategy
+    object). It is applied to the training split for the full fits and to
+    each fold's training part separately, once per fold, so CV scores are
+    measured on real rows only.
+    """
+    wall_start = time.perf_counter()
+    split_seed = 42 if seed is None else seed
+
+    # Split data
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=split_seed, stratify=y)
+
+    # Handle class imbalance on the training split and inside every fold
+    strategy = get_strategy(imbalance, split_seed)
+    resample_start = time.perf_counter()
+    X_train_arr, y_train_arr = np.asarray(X_train), np.asarray(y_train)
+    X_balanced, y_balanced, w_balanced = strategy.resample(X_train_arr, y_train_arr)
+    folds = [
+        (*strategy.resample(X_train_arr[train_idx], y_train_arr[train_idx]),
+         X_train_arr[eval_idx], y_train_arr[eval_idx])
+        for train_idx, eval_idx in StratifiedKFold(n_splits=cv).split(X_train_arr, y_train_arr)
+    ]
+    print(f"Imbalance strategy {strategy.name}: {len(y_balanced)} training rows, "
+          f"resampled in {time.perf_counter() - resample_start:.2f}s")
+
+    # Define models with stochastic elements
+    models = build_candidates(random_state=seed, n_jobs=threads_per_fit)
+
+    fit_data = {
+        'X': X_balanced,
+        'y': y_balanced,
+        'w': w_balanced,
+        'X_test': np.asarray(X_test),
+        'y_test': np.asarray(y_test),
+        'folds': folds,
+    }
+
+    # Full fits first so a budget cut still leaves every candidate scored,
+    # then folds round-robin so abandonment can act early
+    tasks = [(name, None) for name in models]
+    tasks += [(name, fold) for fold in range(cv) for name in models]
+
+    state = {
+        name: {'status': 'completed', 'fit': None, 'fold_scores': [], 'fit_seconds': 0.0}
+        for name in models
+    }
+    deadline = None if time_budget is None else wall_start + time_budget
+
+    def record(name, fold, result):
+        model, y_pred_proba, auc_score, seconds = result
+        entry = state[name]
+        entry['fit_seconds'] += seconds
+        if fold is None:
+            entry['fit'] = (model, y_pred_proba, auc_score)
+        else:
+            entry['fold_scores'].append(auc_score)
+
+    def newly_abandoned():
+        if abandon_margin is None:
+            return []
+        means = {
+            name: np.mean(entry['fold_scores'])
+            for name, entry in state.items()
+            if entry['status'] == 'completed' and len(entry['fold_scores']) >= 2
+        }
+        if len(means) < 2:
+            return []
+        leader = max(means.values())
+        losing = [name for name, mean in means.items() if mean < leader - abandon_margin]
+        for name in losing:
+            state[name]['status'] = 'abandoned'
+        return losing
+
+    workers = max(1, (n_jobs or os.cpu_count() or 1) // threads_per_fit)
+    print(f"\nTraining {len(models)} candidates x {cv} folds on {workers} worker(s)...")
+
+    if workers == 1:
+        _init_fit_worker(fit_data)
+        for name, fold in tasks:
+            if state[name]['status'] != 'completed':
+                continue
+            over_budget = deadline is not None and time.perf_counter() > deadline
+            if over_budget and any(entry['fit'] for entry in state.values()):
+                break
+            record(name, fold, _run_fit(clone(models[name]), fold))
+            newly_abandoned()
+    else:
+        pool = ProcessPoolExecutor(workers, initializer=_init_fit_worker, initargs=(fit_data,))
+        recorded = set()
+        try:
+            futures = {pool.submit(_run_fit, clone(models[name]), fold): (name, fold) for name, fold in tasks}
+            timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            try:
+                for future in as_completed(futures, timeout=timeout):
+                    if future.cancelled():
+                        continue
+                    name, fold = futures[future]
+                    record(name, fold, future.result())
+                    recorded.add(future)
+                    for losing in newly_abandoned():
+                        for pending, (pending_name, _) in futures.items():
+                            if pending_name == losing:
+                                pending.cancel()
+            except FuturesTimeout:
+                pass
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        # Fits that were already running when the budget expired still count
+        for future, (name, fold) in futures.items():
+            if future not in recorded and future.done() and not future.cancelled():
+                record(name, fold, future.result())
+
+    if deadline is not None and time.perf_counter() > deadline:
+        for entry in state.values():
+            if entry['status'] == 'completed' and len(entry['fold_scores']) < cv:
+                entry['status'] = 'budget'
+
+    # Train and evaluate models
+    results = {}
+    report = []
+
+    for name, entry in state.items():
+        fold_scores = np.array(entry['fold_scores'])
+        report.append({
+            'model': name,
+            'status': entry['status'] if entry['fit'] is not None else 'not run',
+            'folds_completed': len(fold_scores),
+            'fit_seconds': entry['fit_seconds'],
+        })
+        if entry['fit'] is None:
+            continue
+
+        model, y_pred_proba, auc_score = entry['fit']
+        results[name] = {
+            'model': model,
+            'auc_score': auc_score,
+            'cv_mean': fold_scores.mean() if len(fold_scores) else np.nan,
+            'cv_std': fold_scores.std() if len(fold_scores) else np.nan,
+            'y_test': y_test,
+            'y_pred': (y_pred_proba > 0.5).astype(int),
+            'y_pred_proba': y_pred_proba,
+            'status': entry['status'],
+            'fit_seconds': entry['fit_seconds']
+        }
+
+    print(f"\n{'Model':<20}{'Status':<12}{'Folds':>6}{'Fit s':>9}{'AUC':>8}{'CV AUC':>8}")
+    for row in report:
+        name = row['model']
+        auc = f"{results[name]['auc_score']:.4f}" if name in results else '-'
+        cv_auc = f"{results[name]['cv_mean']:.4f}" if name in results and row['folds_completed'] else '-'
+        print(f"{name:<20}{row['status']:<12}{row['folds_completed']:>6}{row['fit_seconds']:>9.2f}{auc:>8}{cv_auc:>8}")
+    print(f"Wall time: {time.perf_counter() - wall_start:.2f}s")
+
+    # Select best model among candidates that were not abandoned
+    contenders = [name for name in results if results[name]['status'] != 'abandoned'] or list(results)
+    if not contenders:
+        raise RuntimeError("Time budget expired before any candidate was trained.")
+    best_model_name = max(contenders, key=lambda x: results[x]['auc_score'])
+    predictor.best_model = results[best_model_name]['model']
+    predictor.compiled_model = None
+    predictor.models = results
+    predictor.training_report = report
+
+    print(f"\nBest Model: {best_model_name} (AUC: {results[best_model_name]['auc_score']:.4f})")
+
+    return results, X_test, y_test
+
+
+def hyperparameter_tuning(predictor, X, y, model_name='Random Forest', sampler='tpe',
+                          resource='n_estimators', n_configs=27, max_resource=None, cv=5,
+                          seed=None, checkpoint=None, n_jobs=None, imbalance=DEFAULT_STRATEGY):
+    """
+    Tune the hyperparameters of one train_models candidate with successive
+    halving (see hyperparameter_search). Any of the four families can be
+    tuned; the best configuration is refit on the training split balanced
+    with the imbalance strategy, scored on the held-out test split and
+    becomes the best model.
+    """
+    from hyperparameter_search import SEARCH_SPACES, FIXED_PARAMS, SuccessiveHalvingSearch
+
+    candidates = build_candidates(random_state=seed if seed is not None else 42, n_jobs=n_jobs)
+    if model_name not in candidates:
+        print(f"Hyperparameter tuning not implemented for {model_name}")
+        return None
+
+    split_seed = 42 if seed is None else seed
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=split_seed, stratify=y)
+
+    print(f"Performing hyperparameter tuning for {model_name}...")
+    search = SuccessiveHalvingSearch(
+        candidates[model_name], SEARCH_SPACES[model_name], sampler=sampler, resource=resource,
+        n_configs=n_configs, max_resource=max_resource, cv=cv, seed=split_seed,
+        resampler=get_strategy(imbalance, split_seed), fixed_params=FIXED_PARAMS.get(model_name),
+        checkpoint=checkpoint,
+    )
+    result = search.fit(X_train, y_train)
+    result.test_auc_ = roc_auc_score(y_test, result.best_estimator_.predict_proba(np.asarray(X_test))[:, 1])
+
+    print(f"Best parameters: {result.best_params_}")
+    print(f"Best CV score: {result.best_score_:.4f}")
+    print(f"Test AUC: {result.test_auc_:.4f} ({result.n_fits_} fits in {result.elapsed_:.1f}s)")
+
+    # Update best model
+    predictor.best_model = result.best_estimator_
+    predictor.compiled_model = None
+
+    return result
+
+
+def _binned_auc(positive_counts, negative_counts):
+    """ROC AUC from per-bin score histograms of each class; ties count half."""
+    negatives_below = np.cumsum(negative_counts) - negative_counts
+    pairs = positive_counts.sum() * negative_counts.sum()
+    if pairs == 0:
+        return np.nan
+    return float((positive_counts * (negatives_below + 0.5 * negative_counts)).sum() / pairs)
+
+
+def train_streaming(predictor, file_path, estimator=None, chunk_size=None, epochs=1, seed=None, n_bins=1024):
+    """
+    Train an estimator that supports partial_fit on a CSV or Parquet file
+    without loading it whole.
+
+    A first chunked pass fits the feature transform and counts the classes;
+    each later pass scales one chunk at a time and calls partial_fit with
+    balanced sample weights (SMOTE needs the whole training set in memory).
+    Each chunk is scored before it is trained on, and those progressive
+    validation scores give the reported AUC. The default estimator is a
+    logistic-loss SGDClassifier.
+    """
+    from sklearn.linear_model import SGDClassifier
+    from ingestion import DEFAULT_CHUNK_SIZE, TARGET_COLUMN, fit_transform_streaming, iter_batches
+
+    chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+    if estimator is None:
+        estimator = SGDClassifier(loss='log_loss', alpha=1e-4, random_state=seed)
+    if not hasattr(estimator, 'partial_fit'):
+        raise TypeError(f"{type(estimator).__name__} does not support partial_fit")
+
+    start = time.perf_counter()
+    transform, n_rows, positives = fit_transform_streaming(file_path, chunk_size=chunk_size)
+    if positives in (0, n_rows):
+        raise ValueError("Training data must contain both classes.")
+    class_weight = np.array([n_rows / (2 * (n_rows - positives)), n_rows / (2 * positives)])
+    classes = np.array([0, 1])
+
+    positive_counts = np.zeros(n_bins)
+    negative_counts = np.zeros(n_bins)
+    X = np.empty((chunk_size, transform.n_features))
+    fitted = False
+    for epoch in range(epochs):
+        for df in iter_batches(file_path, transform.feature_names, chunk_size):
+            X_chunk = transform.assemble_frame(df, out=X[:len(df)])
+            transform.transform(X_chunk, out=X_chunk)
+            y_chunk = df[TARGET_COLUMN].to_numpy()
+
+            if fitted and epoch == 0:
+                bins = np.minimum((estimator.predict_proba(X_chunk)[:, 1] * n_bins).astype(int), n_bins - 1)
+                positive_counts += np.bincount(bins[y_chunk == 1], minlength=n_bins)
+                negative_counts += np.bincount(bins[y_chunk == 0], minlength=n_bins)
+
+            estimator.partial_fit(X_chunk, y_chunk, classes=classes, sample_weight=class_weight[y_chunk])
+            fitted = True
+
+    auc_score = _binned_auc(positive_counts, negative_counts)
+    print(f"Streamed {n_rows} rows x {epochs} epoch(s) in {time.perf_counter() - start:.2f}s, "
+          f"progressive AUC: {auc_score:.4f}")
+
+    predictor.transform = transform
+    predictor.feature_names = transform.feature_names
+    predictor.best_model = estimator
+    predictor.compiled_model = None
+    predictor.models = {type(estimator).__name__: {'model': estimator, 'auc_score': auc_score}}
+
+    return estimator, auc_score
+
+
+def warm_start_fit(model, X, y, n_estimators=50, sample_weight=None):
+    """
+    Return a copy of a fitted model extended with X, y only: XGBoost and
+    LightGBM keep boosting from the current booster, Random Forest and
+    Gradient Boosting grow n_estimators more trees or stages with
+    warm_start, and partial_fit estimators take one more pass. The model
+    passed in is not modified.
+    """
+    import copy
+
+    if isinstance(model, xgb.XGBClassifier):
+        extended = xgb.XGBClassifier(**{**model.get_params(), 'n_estimators': n_estimators})
+        extended.fit(X, y, sample_weight=sample_weight, xgb_model=model.get_booster())
+    elif isinstance(model, lgb.LGBMClassifier):
+        extended = lgb.LGBMClassifier(**{**model.get_params(), 'n_estimators': n_estimators})
+        extended.fit(X, y, sample_weight=sample_weight, init_model=model.booster_)
+    elif isinstance(model, (RandomForestClassifier, GradientBoostingClassifier)):
+        extended = copy.deepcopy(model)
+        extended.set_params(warm_start=True, n_estimators=model.n_estimators + n_estimators)
+        extended.fit(X, y, sample_weight=sample_weight)
+    elif hasattr(model, 'partial_fit'):
+        extended = copy.deepcopy(model)
+        extended.partial_fit(X, y, sample_weight=sample_weight)
+    else:
+        raise TypeError(f"{type(model).__name__} cannot be trained incrementally")
+    return extended
+
+
+def retrain_incremental(predictor, X_new, y_new, X_valid, y_valid, n_estimators=50, tolerance=0.0,
+                        prior_rows=1000):
+    """
+    Extend the current model with new rows only and keep it if AUC on the
+    held-out recent window (X_valid, y_valid) does not drop by more than
+    tolerance. X_new and X_valid are raw feature DataFrames.
+
+    The delta's raw values are merged into the persisted streaming
+    statistics, but the scoring transform stays frozen: the existing trees
+    split on values scaled by it. The report's 'drift' (mean shift in
+    training standard deviations per feature) shows when a full retrain
+    with a refitted transform is due. Models saved without statistics are
+    seeded from their transform as if trained on prior_rows rows.
+    Returns a report dict; predictor is updated only when 'promoted'.
+    """
+    from feature_transform import FEATURE_ALIASES
+    from ingestion import StreamingStats
+
+    if predictor.best_model is None:
+        raise ValueError("Incremental retraining needs the library model; load a pickled model, not an artifact.")
+    start = time.perf_counter()
+    transform = predictor.transform
+
+    columns = [name if name in X_new.columns else FEATURE_ALIASES.get(name, name)
+               for name in transform.feature_names]
+    raw = X_new[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+    X = transform.transform(transform.assemble_columns(dict(zip(transform.feature_names, raw.T)), len(raw)))
+    y = np.asarray(y_new, dtype=np.int64)
+    X_check = transform.transform(transform.assemble_frame(X_valid))
+    y_check = np.asarray(y_valid)
+
+    baseline_auc = roc_auc_score(y_check, predictor.best_model.predict_proba(X_check)[:, 1])
+    candidate = warm_start_fit(predictor.best_model, X, y, n_estimators, balanced_weights(y))
+    candidate_auc = roc_auc_score(y_check, candidate.predict_proba(X_check)[:, 1])
+    promoted = candidate_auc >= baseline_auc - tolerance
+
+    stats = predictor.transform_stats
+    stats = (StreamingStats.from_dict(stats.to_dict()) if stats is not None
+             else StreamingStats.from_transform(transform, prior_rows))
+    stats.update(raw)
+    drift = np.abs(stats.mean - transform.mean) / transform.scale
+
+    if promoted:
+        was_compiled = predictor.compiled_model is not None
+        predictor.best_model = candidate
+        predictor.compiled_model = None
+        predictor.transform_stats = stats
+        if was_compiled:
+            predictor.compile_model()
+
+    report = {
+        'model': type(candidate).__name__,
+        'rows': len(y),
+        'baseline_auc': float(baseline_auc),
+        'candidate_auc': float(candidate_auc),
+        'promoted': bool(promoted),
+        'drift': dict(zip(transform.feature_names, drift.tolist())),
+        'seconds': time.perf_counter() - start,
+    }
+    print(f"Incremental retrain of {report['model']} on {report['rows']} rows in {report['seconds']:.2f}s: "
+          f"AUC {baseline_auc:.4f} -> {candidate_auc:.4f}, {'promoted' if promoted else 'kept previous model'}")
+    return report
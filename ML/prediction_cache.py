@@ -0,0 +1,281 @@
+"""
+Prediction result cache for the ML API.
+
+Results are keyed by the normalized raw feature vector (aliases resolved,
+missing values filled with the training medians, as assembled by
+FeatureTransform) together with the model fingerprint, so a model swap
+never serves stale results. Entries of a replaced model are not dropped
+at once but age out through the LRU and TTL, so requests on the old and
+new model can interleave during a swap or rollback without emptying the
+cache for each other. PredictionCache's in-process LRU can be backed by
+a SQLite file shared by every worker on the host. ExplanationCache keeps
+per-feature contributions in its own LRU, in process only.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class CacheStats:
+    """
+    Hit/miss counters of an LRUStore.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def to_dict(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+
+class SQLiteBackend:
+    """
+    Cache entries in a SQLite file that several worker processes can share.
+    Expired rows are ignored on read and purged on write.
+    """
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS predictions "
+                "(key BLOB PRIMARY KEY, prediction INTEGER, probability REAL, expires REAL)"
+            )
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, keys):
+        """Return {key: (prediction, probability)} for the live keys found."""
+        found = {}
+        conn = self._connection()
+        now = time.time()
+        # Stay under SQLite's default bound parameter limit
+        for start in range(0, len(keys), 900):
+            batch = keys[start:start + 900]
+            rows = conn.execute(
+                f"SELECT key, prediction, probability FROM predictions "
+                f"WHERE expires > ? AND key IN ({','.join('?' * len(batch))})",
+                [now, *batch]
+            )
+            for key, prediction, probability in rows:
+                found[key] = (bool(prediction), probability)
+        return found
+
+    def put_many(self, items):
+        conn = self._connection()
+        now = time.time()
+        with conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?)",
+                [(key, int(prediction), probability, now + self.ttl) for key, (prediction, probability) in items]
+            )
+            conn.execute("DELETE FROM predictions WHERE expires <= ?", (now,))
+
+    def clear(self):
+        self._connection().execute("DELETE FROM predictions")
+
+
+def feature_keys(X, version):
+    """
+    Cache key of every row of X under a model version.
+    """
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    # -0.0 and 0.0 describe the same student
+    X = X + 0.0
+    prefix = version.encode()
+    return [hashlib.blake2b(prefix + row.tobytes(), digest_size=16).digest() for row in X]
+
+
+class LRUStore:
+    """
+    Thread-safe size- and TTL-bounded LRU of values per key.
+    """
+
+    def __init__(self, max_size=10000, ttl=300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_many(self, keys):
+        """(index, value) of the keys with a live entry"""
+        now = time.monotonic()
+        hits = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                value, expires = entry
+                if expires <= now:
+                    del self._entries[key]
+                    self.stats.expirations += 1
+                    continue
+                self._entries.move_to_end(key)
+                hits.append((i, value))
+        return hits
+
+    def put_many(self, items):
+        """Store (key, value) pairs, evicting the least recently used"""
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            for key, value in items:
+                self._entries[key] = (value, expires)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def record(self, hits, misses, shared_hits=0):
+        """Count the outcome of one lookup"""
+        with self._lock:
+            self.stats.hits += hits
+            self.stats.misses += misses
+            self.stats.shared_hits += shared_hits
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class PredictionCache:
+    """
+    Size- and TTL-bounded LRU of (prediction, probability) per feature vector.
+
+    Lookups take the assembled raw feature array of a request and the model
+    fingerprint, which is part of every key.
+    With a shared backend, local misses fall through to it and new results
+    are written to both.
+    """
+
+    def __init__(self, max_size=10000, ttl=300.0, backend=None):
+        self.backend = backend
+        self.store = LRUStore(max_size, ttl)
+
+    def __len__(self):
+        return len(self.store)
+
+    @property
+    def stats(self):
+        return self.store.stats
+
+    def get_many(self, X, version):
+        """
+        Look up every row of X. Returns (keys, found, predictions,
+        probabilities), where found marks the rows served from the cache.
+        """
+        keys = feature_keys(X, version)
+        n = len(keys)
+        found = np.zeros(n, dtype=bool)
+        predictions = np.zeros(n, dtype=bool)
+        probabilities = np.zeros(n)
+
+        for i, (prediction, probability) in self.store.get_many(keys):
+            found[i] = True
+            predictions[i], probabilities[i] = prediction, probability
+
+        shared_hits = []
+        if self.backend is not None and not found.all():
+            missing = [key for key, hit in zip(keys, found) if not hit]
+            shared = self.backend.get_many(missing)
+            for i, key in enumerate(keys):
+                if not found[i] and key in shared:
+                    found[i] = True
+                    predictions[i], probabilities[i] = shared[key]
+                    shared_hits.append((key, shared[key]))
+            self.store.put_many(shared_hits)
+
+        hits = int(found.sum())
+        self.store.record(hits, n - hits, len(shared_hits))
+        return keys, found, predictions, probabilities
+
+    def put_many(self, keys, predictions, probabilities):
+        """
+        Store results for keys returned by get_many.
+        """
+        items = [(key, (bool(prediction), float(probability)))
+                 for key, prediction, probability in zip(keys, predictions, probabilities)]
+        self.store.put_many(items)
+        if self.backend is not None and items:
+            self.backend.put_many(items)
+
+    def clear(self):
+        self.store.clear()
+        if self.backend is not None:
+            self.backend.clear()
+
+
+class ExplanationCache:
+    """
+    In-process LRU of (probability, contributions) per feature vector, for
+    /predict/explain. Keys and TTL work as in PredictionCache; there is no shared backend.
+    """
+
+    def __init__(self, max_size=10000, ttl=300.0):
+        self.store = LRUStore(max_size, ttl)
+
+    def __len__(self):
+        return len(self.store)
+
+    @property
+    def stats(self):
+        return self.store.stats
+
+    def get_many(self, X, version, n_features):
+        """
+        Look up every row of X. Returns (keys, found, probabilities,
+        contributions), where found marks the rows served from the cache.
+        """
+        keys = feature_keys(X, version)
+        n = len(keys)
+        found = np.zeros(n, dtype=bool)
+        probabilities = np.zeros(n)
+        contributions = np.zeros((n, n_features))
+        for i, (probability, row) in self.store.get_many(keys):
+            found[i] = True
+            probabilities[i], contributions[i] = probability, row
+
+        hits = int(found.sum())
+        self.store.record(hits, n - hits)
+        return keys, found, probabilities, contributions
+
+    def put_many(self, keys, probabilities, contributions):
+        """
+        Store results for keys returned by get_many.
+        """
+        self.store.put_many([(key, (probability, row.copy()))
+                             for key, probability, row in zip(keys, probabilities.tolist(), contributions)])
+
+    def clear(self):
+        self.store.clear()
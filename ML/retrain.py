@@ -0,0 +1,97 @@
+"""
+Incremental retraining from a file of new or changed student records.
+
+Loads the model registry's current version (or --model), extends it with
+the delta's rows only (see model_training.retrain_incremental), and
+validates on the most recent --valid-fraction of the delta, which is held
+out of training. Rows are taken to be in arrival order. The retrained
+model is published as the registry's new current version only if its AUC
+did not regress.
+
+Usage: python retrain.py DELTA.csv [--model PATH] [--valid-fraction 0.2]
+       [--n-estimators 50] [--tolerance 0.0] [--no-publish]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+
+from ingestion import ID_COLUMN, TARGET_COLUMN
+from model_registry import DEFAULT_REGISTRY_DIR, ModelRegistry
+from student_dropout_predictor import StudentDropoutPredictor
+
+
+def read_delta(path):
+    import pandas as pd
+    if path.lower().endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def split_recent(df, valid_fraction=0.2):
+    """(older rows, most recent valid_fraction of rows)"""
+    n_valid = max(1, int(round(len(df) * valid_fraction)))
+    if n_valid >= len(df):
+        raise ValueError("Delta is too small to hold out a validation window.")
+    return df.iloc[:-n_valid], df.iloc[-n_valid:]
+
+
+def retrain(delta_path, model_path=None, registry_dir=DEFAULT_REGISTRY_DIR, valid_fraction=0.2,
+            n_estimators=50, tolerance=0.0, publish=True):
+    """
+    Retrain on delta_path and publish if promoted. Returns the report of
+    retrain_incremental plus 'base_version' and 'version' (the new one, if
+    published).
+    """
+    registry = ModelRegistry(registry_dir)
+    base_version = None
+    if model_path is None:
+        base_version = registry.current()
+        if base_version is None:
+            raise ValueError("Model registry is empty; run train_model.py first.")
+        model_path = registry.model_path(base_version)
+
+    predictor = StudentDropoutPredictor()
+    predictor.load_model(model_path)
+
+    train, valid = split_recent(read_delta(delta_path), valid_fraction)
+    features = [col for col in train.columns if col not in (ID_COLUMN, TARGET_COLUMN)]
+    report = predictor.retrain_incremental(train[features], train[TARGET_COLUMN],
+                                           valid[features], valid[TARGET_COLUMN],
+                                           n_estimators=n_estimators, tolerance=tolerance)
+    report['base_version'] = base_version
+    report['version'] = None
+
+    if report['promoted'] and publish:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'student_dropout_model.pkl')
+            predictor.save_model(path)
+            report['version'] = registry.publish(path, {
+                'model': report['model'],
+                'auc_score': report['candidate_auc'],
+                'retrained_from': base_version or os.path.abspath(model_path),
+                'delta_rows': report['rows'],
+            }, set_current=True)
+        print(f"Published to model registry as {report['version']}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('delta', help="CSV/Parquet file of new or changed records, oldest first")
+    parser.add_argument('--model', help="model file (default: the registry's current version)")
+    parser.add_argument('--registry', default=DEFAULT_REGISTRY_DIR)
+    parser.add_argument('--valid-fraction', type=float, default=0.2)
+    parser.add_argument('--n-estimators', type=int, default=50, help="trees or boosting rounds to add")
+    parser.add_argument('--tolerance', type=float, default=0.0, help="AUC drop still accepted")
+    parser.add_argument('--no-publish', action='store_true')
+    args = parser.parse_args()
+
+    report = retrain(args.delta, args.model, args.registry, args.valid_fraction, args.n_estimators,
+                     args.tolerance, publish=not args.no_publish)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
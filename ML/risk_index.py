@@ -0,0 +1,417 @@
+"""
+Materialized risk table: every rostered student's dropout probability,
+risk band and course, for per-student lookups and top-K, band and
+percentile queries without re-running the model.
+
+The table is columnar (one NumPy array per field) with an open-addressing
+hash index on student_id stored alongside it, so a reopened table is
+memory-mapped and serves lookups immediately, without rebuilding anything.
+Rows are also grouped by course, so course queries only touch that
+course's rows. Generations are written next to each other:
+
+    <root>/CURRENT                  generation readers should open
+    <root>/<generation>/<column>.npy
+    <root>/<generation>/meta.json
+
+refresh() rescores only the students whose raw features (or the model)
+changed since the previous table.
+
+Usage: python risk_index.py ROSTER.csv|ROSTER.parquet|FEATURES.npz [--index risk_index]
+       [--model PATH] [--course-column course]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from risk_rules import DEFAULT_ENGINE
+
+DEFAULT_INDEX_DIR = 'risk_index'
+ID_COLUMN = 'student_id'
+COURSE_COLUMN = 'course'
+COLUMNS = ('ids', 'probability', 'band', 'course', 'feature_hash', 'slots', 'sorted_probability',
+           'course_rows', 'course_offsets')
+FORMAT_VERSION = 1
+
+# 64-bit FNV-1a, used for the student_id index and feature change detection
+FNV_OFFSET = 0xcbf29ce484222325
+FNV_PRIME = 0x100000001b3
+MASK64 = (1 << 64) - 1
+
+
+def encode_ids(student_ids):
+    """Student IDs as a fixed-width bytes array"""
+    return np.array([str(student_id).encode() for student_id in student_ids], dtype=bytes)
+
+
+def hash_ids(ids):
+    """FNV-1a of each ID in a bytes array, matching hash_id"""
+    ids = np.asarray(ids)
+    hashes = np.full(len(ids), FNV_OFFSET, dtype=np.uint64)
+    if not len(ids):
+        return hashes
+    chars = ids.view(np.uint8).reshape(len(ids), ids.dtype.itemsize)
+    for j in range(chars.shape[1]):
+        # Shorter IDs are NUL-padded; padding is not part of the ID
+        byte = chars[:, j].astype(np.uint64)
+        hashes = np.where(byte != 0, (hashes ^ byte) * np.uint64(FNV_PRIME), hashes)
+    return hashes
+
+
+def hash_id(key):
+    """FNV-1a of one encoded ID"""
+    h = FNV_OFFSET
+    for byte in key:
+        h = ((h ^ byte) * FNV_PRIME) & MASK64
+    return h
+
+
+def hash_rows(X):
+    """FNV-style hash of each row's raw float64 values, for change detection"""
+    words = np.ascontiguousarray(X, dtype=np.float64).view(np.uint64)
+    hashes = np.full(len(words), FNV_OFFSET, dtype=np.uint64)
+    for j in range(words.shape[1]):
+        hashes = (hashes ^ words[:, j]) * np.uint64(FNV_PRIME)
+    return hashes
+
+
+def _home(hashes, mask):
+    """Home slot of hashes; the upper half is folded in since FNV's low bits mix poorly"""
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    return ((hashes ^ (hashes >> np.uint64(32))) & np.uint64(mask)).astype(np.int64)
+
+
+def build_slots(hashes):
+    """
+    Linear-probing table of row numbers for the given ID hashes, at most
+    half full. Built in rounds: every key still unplaced claims its current
+    slot if free (one winner per slot), the rest move one slot on.
+    """
+    capacity = 1 << max(4, (2 * len(hashes) - 1).bit_length())
+    slots = np.full(capacity, -1, dtype=np.int64)
+    pending = np.arange(len(hashes), dtype=np.int64)
+    position = _home(hashes, capacity - 1)
+    while len(pending):
+        free = np.flatnonzero(slots[position] < 0)
+        _, first = np.unique(position[free], return_index=True)
+        winners = free[first]
+        slots[position[winners]] = pending[winners]
+        placed = np.zeros(len(pending), dtype=bool)
+        placed[winners] = True
+        pending = pending[~placed]
+        position = (position[~placed] + 1) & (capacity - 1)
+    return slots
+
+
+def _quantiles(sorted_values, qs):
+    """Linear-interpolated percentiles qs (0-100) of an ascending array"""
+    if not len(sorted_values):
+        return [None for _ in qs]
+    positions = np.clip(np.asarray(qs, dtype=np.float64), 0, 100) / 100 * (len(sorted_values) - 1)
+    low = np.floor(positions).astype(np.int64)
+    high = np.minimum(low + 1, len(sorted_values) - 1)
+    fraction = positions - low
+    values = sorted_values[low] * (1 - fraction) + sorted_values[high] * fraction
+    return values.tolist()
+
+
+class RiskTable:
+    """
+    One generation of the risk table. Columns may be memory-mapped.
+    """
+
+    def __init__(self, columns, meta):
+        self.ids = columns['ids']
+        self.probability = columns['probability']
+        self.band = columns['band']
+        self.course = columns['course']
+        self.feature_hash = columns['feature_hash']
+        self.slots = columns['slots']
+        self.sorted_probability = columns['sorted_probability']
+        self.course_rows = columns['course_rows']
+        self.course_offsets = columns['course_offsets']
+        self.meta = meta
+        self.courses = meta['courses']
+        self._course_codes = {name: code for code, name in enumerate(self.courses)}
+        self._mask = len(self.slots) - 1
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def model_fingerprint(self):
+        return self.meta['model_fingerprint']
+
+    @classmethod
+    def build(cls, ids, probabilities, feature_hashes, model_fingerprint, course_codes=None, courses=()):
+        """
+        A table from encoded IDs (see encode_ids), probabilities, feature
+        hashes and optional course codes (-1 for none) into courses.
+        """
+        ids = np.asarray(ids)
+        if len(np.unique(ids)) != len(ids):
+            raise ValueError("Duplicate student IDs in the roster.")
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        course_codes = (np.full(len(ids), -1, dtype=np.int32) if course_codes is None
+                        else np.asarray(course_codes, dtype=np.int32))
+        course_rows = np.argsort(course_codes, kind='stable')
+        # Rows of course c are course_rows[course_offsets[c]:course_offsets[c + 1]]
+        course_offsets = np.searchsorted(course_codes[course_rows], np.arange(len(courses) + 1))
+        columns = {
+            'ids': ids,
+            'probability': probabilities,
+            'band': DEFAULT_ENGINE.band_codes(probabilities),
+            'course': course_codes,
+            'feature_hash': np.asarray(feature_hashes, dtype=np.uint64),
+            'slots': build_slots(hash_ids(ids)),
+            'sorted_probability': np.sort(probabilities),
+            'course_rows': course_rows,
+            'course_offsets': course_offsets.astype(np.int64),
+        }
+        meta = {
+            'format_version': FORMAT_VERSION,
+            'model_fingerprint': model_fingerprint,
+            'courses': list(courses),
+            'students': len(ids),
+            'built_at': time.time(),
+        }
+        return cls(columns, meta)
+
+    def lookup(self, student_id):
+        """Row of student_id, or -1"""
+        key = student_id.encode()
+        h = hash_id(key)
+        i = (h ^ (h >> 32)) & self._mask
+        slots, ids = self.slots, self.ids
+        while True:
+            row = int(slots[i])
+            if row < 0 or ids[row] == key:
+                return row
+            i = (i + 1) & self._mask
+
+    def lookup_many(self, ids):
+        """Rows of encoded IDs, -1 for unknown ones"""
+        ids = np.asarray(ids)
+        rows = np.full(len(ids), -1, dtype=np.int64)
+        pending = np.arange(len(ids))
+        position = _home(hash_ids(ids), self._mask)
+        while len(pending):
+            found = self.slots[position]
+            occupied = found >= 0
+            match = occupied.copy()
+            match[occupied] = self.ids[found[occupied]] == ids[pending[occupied]]
+            rows[pending[match]] = found[match]
+            probe = occupied & ~match
+            pending = pending[probe]
+            position = (position[probe] + 1) & self._mask
+        return rows
+
+    def record(self, row):
+        """A row as the API's risk record"""
+        probability = float(self.probability[row])
+        course = int(self.course[row])
+        return {
+            'student_id': self.ids[row].decode(),
+            'dropout_probability': probability,
+            'risk_level': DEFAULT_ENGINE.band_names[self.band[row]],
+            'course': self.courses[course] if course >= 0 else None,
+            'percentile': 100 * int(np.searchsorted(self.sorted_probability, probability, side='right')) / len(self),
+        }
+
+    def get(self, student_id):
+        """student_id's risk record, or None"""
+        row = self.lookup(student_id)
+        return self.record(row) if row >= 0 else None
+
+    def rows(self, course=None):
+        """Rows of course, or None for the whole roster; KeyError for unknown courses"""
+        if course is None:
+            return None
+        code = self._course_codes[course]
+        return self.course_rows[self.course_offsets[code]:self.course_offsets[code + 1]]
+
+    def _riskiest(self, rows, k):
+        """The k riskiest of rows (None: all), highest first, by partial selection"""
+        values = self.probability if rows is None else self.probability[rows]
+        k = min(k, len(values))
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64)
+        if k < len(values):
+            top = np.argpartition(-values, k - 1)[:k]
+        else:
+            top = np.arange(len(values))
+        top = top[np.argsort(-values[top], kind='stable')]
+        return top if rows is None else rows[top]
+
+    def top_k(self, k, course=None):
+        """Risk records of the k riskiest students, optionally within a course"""
+        return [self.record(row) for row in self._riskiest(self.rows(course), k)]
+
+    def in_band(self, band, course=None, limit=100, offset=0):
+        """
+        (total, risk records) of the students in a risk band, riskiest first,
+        paged by offset and limit.
+        """
+        code = DEFAULT_ENGINE.band_names.index(band)
+        rows = self.rows(course)
+        rows = np.flatnonzero(self.band == code) if rows is None else rows[self.band[rows] == code]
+        page = self._riskiest(rows, offset + limit)[offset:]
+        return len(rows), [self.record(row) for row in page]
+
+    def percentiles(self, qs, course=None):
+        """{q: dropout probability at percentile q}, optionally within a course"""
+        rows = self.rows(course)
+        values = self.sorted_probability if rows is None else np.sort(self.probability[rows])
+        return dict(zip(qs, _quantiles(values, qs)))
+
+    def save(self, root):
+        """Write this table as a new generation under root and make it current"""
+        os.makedirs(root, exist_ok=True)
+        generations = sorted(name for name in os.listdir(root) if name.startswith('g'))
+        generation = f"g{int(generations[-1][1:]) + 1 if generations else 1:06d}"
+        directory = os.path.join(root, generation)
+        os.makedirs(directory)
+        for name in COLUMNS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump(self.meta, f)
+        tmp_path = os.path.join(root, 'CURRENT.tmp')
+        with open(tmp_path, 'w') as f:
+            f.write(generation)
+        os.replace(tmp_path, os.path.join(root, 'CURRENT'))
+        # Keep the previous generation for readers still mapping it
+        for old in generations[:-1]:
+            shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+        return generation
+
+    @classmethod
+    def open(cls, root, generation=None):
+        """Memory-map the current (or given) generation, or None if root has none"""
+        if generation is None:
+            generation = current_generation(root)
+            if generation is None:
+                return None
+        directory = os.path.join(root, generation)
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"{directory} is not a compatible risk table")
+        # Plain ndarray views of the maps: np.memmap's item access is several times slower
+        columns = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r').view(np.ndarray)
+                   for name in COLUMNS}
+        return cls(columns, meta)
+
+
+def current_generation(root):
+    try:
+        with open(os.path.join(root, 'CURRENT')) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+class RiskIndexReader:
+    """
+    The current RiskTable under root, reopened when CURRENT moves to a new
+    generation. CURRENT is checked at most every check_interval seconds.
+    """
+
+    def __init__(self, root, check_interval=1.0):
+        self.root = root
+        self.check_interval = check_interval
+        self._generation = None
+        self._table = None
+        self._checked = float('-inf')
+
+    def table(self):
+        now = time.monotonic()
+        if now - self._checked >= self.check_interval:
+            self._checked = now
+            generation = current_generation(self.root)
+            if generation != self._generation:
+                self._table = RiskTable.open(self.root, generation) if generation else None
+                self._generation = generation
+        return self._table
+
+
+def refresh(predictor, student_ids, X, courses=None, previous=None):
+    """
+    A new table for the roster (student IDs, raw feature array X as
+    assembled by predictor.transform, optional course per student).
+    Students found in previous with the same features and model keep their
+    probability; only the rest are scored. Returns (table, stats).
+    """
+    import pandas as pd
+
+    ids = encode_ids(student_ids)
+    hashes = hash_rows(X)
+    fingerprint = predictor.model_fingerprint()
+    probabilities = np.empty(len(ids), dtype=np.float64)
+
+    rescore = np.ones(len(ids), dtype=bool)
+    if previous is not None and previous.model_fingerprint == fingerprint and len(ids):
+        rows = previous.lookup_many(ids)
+        known = np.flatnonzero(rows >= 0)
+        unchanged = known[previous.feature_hash[rows[known]] == hashes[known]]
+        probabilities[unchanged] = previous.probability[rows[unchanged]]
+        rescore[unchanged] = False
+    if rescore.any():
+        _, probabilities[rescore] = predictor.generate_predictions(X[rescore])
+
+    course_codes, course_names = None, ()
+    if courses is not None:
+        course_codes, course_names = pd.factorize(pd.Series(courses, dtype=object).astype('string'))
+        course_names = [str(name) for name in course_names]
+
+    table = RiskTable.build(ids, probabilities, hashes, fingerprint, course_codes, course_names)
+    return table, {'students': len(ids), 'rescored': int(rescore.sum()), 'reused': int((~rescore).sum())}
+
+
+def read_roster(path, transform, course_column=COURSE_COLUMN):
+    """(student IDs, raw feature array, courses or None) of a roster file or feature store snapshot"""
+    if path.lower().endswith('.npz'):
+        from feature_store import FeatureStore
+        ids, X = FeatureStore.load(path).assemble(transform)
+        return ids, X, None
+
+    import pandas as pd
+    from ingestion import feature_columns
+    from score import chunk_columns, scoring_columns
+    # Only the ID, course and model/rule columns: names or emails stay unread
+    available = feature_columns(path)
+    features = scoring_columns(available, transform)
+    columns = [ID_COLUMN, *([course_column] if course_column in available else []), *features]
+    if path.lower().endswith('.parquet'):
+        df = pd.read_parquet(path, columns=columns)
+    else:
+        df = pd.read_csv(path, usecols=columns, dtype={ID_COLUMN: str, course_column: object})
+    courses = df[course_column].to_numpy(dtype=object) if course_column in df else None
+    ids = df[ID_COLUMN].astype(str).tolist()
+    return ids, transform.assemble_columns(chunk_columns(df[features]), len(df)), courses
+
+
+def main():
+    from score import load_predictor
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('roster', help="CSV/Parquet roster with student_id and features, or a feature store .npz")
+    parser.add_argument('--index', default=DEFAULT_INDEX_DIR)
+    parser.add_argument('--model', help="model file (default: the registry's current version)")
+    parser.add_argument('--course-column', default=COURSE_COLUMN)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    predictor = load_predictor(args.model)
+    ids, X, courses = read_roster(args.roster, predictor.transform, args.course_column)
+    table, stats = refresh(predictor, ids, X, courses, RiskTable.open(args.index))
+    generation = table.save(args.index)
+    print(f"Risk table {generation}: {stats['students']} students, {stats['rescored']} rescored, "
+          f"{stats['reused']} unchanged, in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
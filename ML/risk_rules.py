@@ -0,0 +1,244 @@
+"""
+Declarative risk banding and recommendation rules, evaluated for a whole
+batch of students with NumPy masks.
+
+RISK_BANDS maps dropout probability to a band; RULES lists, per band, the
+recommendations every student in that band gets plus the extra ones
+triggered by feature thresholds. RiskEngine compiles the table once into
+arrays. Students triggering the same set of rules share one interned
+recommendation list, so a cohort costs one list per distinct rule set rather
+than one per student. Given per-feature contributions (see tree_shap),
+RiskEngine.explain names each student's risk drivers and adds the
+DRIVER_RECOMMENDATIONS for them.
+"""
+
+import operator
+
+import numpy as np
+
+from feature_transform import FEATURE_ALIASES
+from student_dropout_predictor import MEDIUM_RISK_THRESHOLD, HIGH_RISK_THRESHOLD
+
+# Bands in increasing order of risk with the probability each one starts at
+RISK_BANDS = [
+    ('LOW', 0.0),
+    ('MEDIUM', MEDIUM_RISK_THRESHOLD),
+    ('HIGH', HIGH_RISK_THRESHOLD),
+]
+
+# (band, condition or None, recommendations); a condition is
+# (feature, operator, value). Students missing the feature never match it.
+RULES = [
+    ('HIGH', None, [
+        "Immediate intervention required",
+        "Schedule emergency counseling session",
+        "Implement daily attendance monitoring",
+        "Provide intensive academic support",
+    ]),
+    ('HIGH', ('avg_attendance', '<', 70), ["Critical attendance issue - contact family"]),
+    ('HIGH', ('avg_assignment_grade', '<', 60), ["Severe academic performance concern - consider tutoring"]),
+    ('MEDIUM', None, [
+        "Enhanced monitoring recommended",
+        "Weekly check-ins with advisor",
+        "Additional tutoring support",
+        "Monitor for declining trends",
+    ]),
+    ('MEDIUM', ('avg_attendance', '<', 80), ["Improve attendance tracking"]),
+    ('LOW', None, [
+        "Continue regular monitoring",
+        "Maintain current support level",
+        "Consider as peer mentor candidate",
+    ]),
+]
+
+# Recommendation for a student whose risk is driven by the feature, i.e. for
+# whom it is among the largest positive contributions to dropout risk. Model
+# features stored under another name match through FEATURE_ALIASES
+DRIVER_RECOMMENDATIONS = {
+    'avg_attendance': "Attendance is a main risk factor - agree on an attendance plan",
+    'attendance_trend': "Attendance is declining - follow up on recent absences",
+    'avg_assignment_grade': "Grades are a main risk factor - arrange subject tutoring",
+    'assignment_trend': "Grades are declining - review recent coursework with the student",
+    'low_attendance_months': "Repeated low-attendance months - review attendance history with family",
+    'failing_assignments': "Failing assignments - set up a catch-up plan",
+    'missed_consecutive_days': "Extended absences - check in on student wellbeing",
+    'late_submissions': "Frequent late submissions - support time management",
+    'participation_score': "Low participation - encourage class engagement",
+    'previous_gpa': "Weak prior record - consider a study skills program",
+}
+
+# Most risk drivers named per student
+DRIVER_LIMIT = 2
+# Bands whose students get risk drivers; LOW-risk students get none
+DRIVER_BANDS = ('MEDIUM', 'HIGH')
+# Smallest contribution that makes a feature a risk driver, per output scale
+# of the contributions (see tree_shap): 2 points of probability for forests,
+# about the same near the decision boundary in log-odds for boosted models
+DRIVER_MIN_CONTRIBUTION = {
+    'probability': 0.02,
+    'log_odds': 0.1,
+}
+
+OPERATORS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+
+def summarize(counts):
+    """
+    The API's bulk summary for {band name: student count}, listed from the
+    highest risk band down.
+    """
+    return {
+        'total_students': sum(counts.values()),
+        **{f"{band.lower()}_risk": count for band, count in reversed(counts.items())},
+    }
+
+
+class RiskAssessment:
+    """
+    Result of RiskEngine.assess for a batch: band codes and names, per-student
+    recommendation lists (shared between students with the same rule set),
+    counts per band and each student's rule-set key.
+    """
+
+    def __init__(self, band_codes, band_names, recommendations, counts, keys=None):
+        self.band_codes = band_codes
+        self.band_names = band_names
+        self.recommendations = recommendations
+        self.counts = counts
+        self.keys = keys
+
+    def summary(self):
+        """Counts shaped like the API's bulk summary"""
+        return summarize(self.counts)
+
+
+class RiskEngine:
+    """
+    A rule table compiled into threshold arrays and rule masks.
+    """
+
+    def __init__(self, bands=RISK_BANDS, rules=RULES, drivers=DRIVER_RECOMMENDATIONS, driver_bands=DRIVER_BANDS,
+                 driver_min_contribution=DRIVER_MIN_CONTRIBUTION):
+        self.driver_recommendations = dict(drivers)
+        self.driver_min_contribution = dict(driver_min_contribution)
+        self.band_names = [name for name, _ in bands]
+        self.band_starts = np.array([start for _, start in bands[1:]])
+        band_index = {name: i for i, name in enumerate(self.band_names)}
+
+        # Intern every recommendation string once
+        self.recommendations = []
+        ids = {}
+        self.rule_bands = np.empty(len(rules), dtype=np.int8)
+        self.rule_conditions = []
+        self.rule_recommendations = []
+        for i, (band, condition, texts) in enumerate(rules):
+            self.rule_bands[i] = band_index[band]
+            if condition is not None:
+                feature, op, value = condition
+                condition = (feature, OPERATORS[op], value)
+            self.rule_conditions.append(condition)
+            rule_ids = []
+            for text in texts:
+                if text not in ids:
+                    ids[text] = len(self.recommendations)
+                    self.recommendations.append(text)
+                rule_ids.append(ids[text])
+            self.rule_recommendations.append(rule_ids)
+
+        self.features = sorted({c[0] for c in self.rule_conditions if c is not None})
+        # Driver bands missing from a custom band table never match
+        self.driver_bands = np.array([band_index[band] for band in driver_bands if band in band_index],
+                                     dtype=np.int8)
+        # Bit weight of each rule in a student's rule-set key
+        self._weights = np.left_shift(1, np.arange(len(rules), dtype=np.int64))
+        self._lists = {}
+
+    def band_codes(self, probabilities):
+        """Band index of each probability (0 = lowest risk)"""
+        return np.searchsorted(self.band_starts, probabilities, side='right').astype(np.int8)
+
+    def recommendation_ids(self, key):
+        """Indices into self.recommendations of the rule set with this key"""
+        return [r for i, ids in enumerate(self.rule_recommendations) if key >> i & 1 for r in ids]
+
+    def _recommendation_list(self, key):
+        # One shared list per distinct rule set
+        lists = self._lists.get(key)
+        if lists is None:
+            lists = [self.recommendations[r] for r in self.recommendation_ids(key)]
+            self._lists[key] = lists
+        return lists
+
+    def assess(self, probabilities, features=None):
+        """
+        Band and recommend for a batch. features maps feature names to arrays
+        aligned with probabilities; missing names or NaN values never match
+        a condition.
+        """
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        features = features or {}
+        codes = self.band_codes(probabilities)
+
+        keys = np.zeros(len(probabilities), dtype=np.int64)
+        for i, condition in enumerate(self.rule_conditions):
+            mask = codes == self.rule_bands[i]
+            if condition is not None:
+                feature, op, value = condition
+                if feature not in features:
+                    continue
+                mask &= op(np.asarray(features[feature], dtype=np.float64), value)
+            keys += mask * self._weights[i]
+
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        groups = [self._recommendation_list(int(key)) for key in unique_keys]
+        recommendations = [groups[i] for i in inverse.tolist()]
+
+        counts = np.bincount(codes, minlength=len(self.band_names))
+        band_names = np.array(self.band_names, dtype=object)[codes]
+        return RiskAssessment(codes, band_names, recommendations,
+                              dict(zip(self.band_names, counts.tolist())), keys)
+
+    def explain(self, contributions, feature_names, band_codes, output='probability', limit=DRIVER_LIMIT):
+        """
+        Risk drivers of a batch from its (n_students, n_features)
+        contributions, columns named by feature_names and on the output
+        scale named by output: for students whose band (band_codes, see
+        RiskAssessment) is in driver_bands, the features with the largest
+        contributions of at least driver_min_contribution[output], at most
+        limit. Returns (drivers, recommendations) per student; students with
+        the same drivers share both lists.
+        """
+        contributions = np.asarray(contributions, dtype=np.float64)
+        n_features = contributions.shape[1]
+        limit = min(limit, n_features)
+        top = np.argsort(-contributions, axis=1, kind='stable')[:, :limit]
+        positive = np.take_along_axis(contributions, top, axis=1) >= self.driver_min_contribution[output]
+        positive &= np.isin(np.asarray(band_codes), self.driver_bands)[:, None]
+
+        # Driver-set key: feature index + 1 per slot (0 when empty), in base n_features + 1
+        codes = np.where(positive, top + 1, 0).astype(np.int64)
+        keys = codes @ (n_features + 1) ** np.arange(limit, dtype=np.int64)
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+
+        driver_lists, recommendation_lists = [], []
+        for row in first.tolist():
+            names = [feature_names[j] for j in top[row, positive[row]].tolist()]
+            driver_lists.append(names)
+            recommendation_lists.append([text for text in map(self.driver_recommendation, names) if text])
+        inverse = inverse.tolist()
+        return [driver_lists[i] for i in inverse], [recommendation_lists[i] for i in inverse]
+
+    def driver_recommendation(self, feature):
+        """The recommendation for a risk driver, or None"""
+        text = self.driver_recommendations.get(feature)
+        if text is None and feature in FEATURE_ALIASES:
+            text = self.driver_recommendations.get(FEATURE_ALIASES[feature])
+        return text
+
+
+DEFAULT_ENGINE = RiskEngine()
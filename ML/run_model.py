@@ -1,5 +1,4 @@
 import pandas as pd
-import numpy as np
 from student_dropout_predictor import StudentDropoutPredictor
 
 if __name__ == "__main__":
@@ -17,12 +16,7 @@ if __name__ == "__main__":
     }
 
     student_df = pd.DataFrame([student_data])
-    X, _ = predictor.preprocess_data(student_df)
-    predictions, probabilities = predictor.generate_predictions(X)
-
-    # Add random noise to probabilities
-    noise = np.random.uniform(-0.05, 0.05, size=len(probabilities))
-    probabilities = np.clip(probabilities + noise, 0, 1)
+    predictions, probabilities = predictor.generate_predictions(student_df)
 
     probability = probabilities[0]
     predicted_dropout = predictions[0]
@@ -0,0 +1,296 @@
+"""
+Offline batch scoring of student rosters.
+
+Reads a CSV or Parquet file, or a directory of such shards, in chunks; the
+chunks are scored across a process pool with the model's frozen transform,
+and each shard's predictions, risk bands and recommendation IDs are written
+to OUTPUT_DIR/<shard>.scored.<format>. The model is loaded once in the
+parent; forked workers share it. A shard's output is written to a temporary
+file and renamed when complete, so an interrupted run resumes at the first
+unfinished shard. Output is deterministic for a given model and input.
+
+recommendations.json in the output directory maps recommendation IDs to
+their text.
+
+Usage: python score.py INPUT OUTPUT_DIR [--model PATH] [--workers 4]
+       [--chunk-size 100000] [--format csv|parquet] [--no-resume]
+"""
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from feature_transform import FEATURE_ALIASES
+from ingestion import DEFAULT_CHUNK_SIZE, ID_COLUMN, feature_columns, iter_batches
+from risk_rules import DEFAULT_ENGINE
+
+OUTPUT_COLUMNS = [ID_COLUMN, 'dropout_probability', 'predicted_dropout', 'risk_level', 'recommendation_ids']
+# Chunks in flight per worker; bounds the parent's memory
+CHUNKS_PER_WORKER = 2
+
+# Predictor used by score_chunk; set in the parent before forking, or
+# loaded by _init_worker where workers are spawned
+_predictor = None
+
+
+def _init_worker(model_path):
+    global _predictor
+    if _predictor is None:
+        _predictor = load_predictor(model_path)
+
+
+def load_predictor(model_path=None):
+    """
+    Load model_path, or the model registry's current version when it is
+    None, with the compiled ensemble for scoring.
+    """
+    from student_dropout_predictor import StudentDropoutPredictor
+
+    if model_path is None:
+        from model_registry import DEFAULT_REGISTRY_DIR, ModelRegistry
+        registry = ModelRegistry(DEFAULT_REGISTRY_DIR)
+        version = registry.current()
+        model_path = registry.model_path(version) if version else 'student_dropout_model.pkl'
+    predictor = StudentDropoutPredictor()
+    predictor.load_model(model_path, compile=True)
+    return predictor
+
+
+def input_shards(path):
+    """The CSV/Parquet files to score: path itself, or the files in it"""
+    if os.path.isdir(path):
+        shards = sorted(glob.glob(os.path.join(path, '*.csv')) + glob.glob(os.path.join(path, '*.parquet')))
+        if not shards:
+            raise ValueError(f"No .csv or .parquet files in {path}")
+        return shards
+    return [path]
+
+
+def output_path(output_dir, shard, fmt):
+    name = os.path.splitext(os.path.basename(shard))[0]
+    return os.path.join(output_dir, f"{name}.scored.{fmt}")
+
+
+def scoring_columns(available, transform, engine=DEFAULT_ENGINE):
+    """
+    The columns of available that the model's transform or the risk rules
+    read, under either name of an aliased feature. Other roster columns,
+    text ones included, are never loaded.
+    """
+    aliases = {**FEATURE_ALIASES, **{alias: feature for feature, alias in FEATURE_ALIASES.items()}}
+    wanted = set()
+    for name in [*transform.feature_names, *engine.features]:
+        wanted.update((name, aliases.get(name, name)))
+    return [name for name in available if name in wanted]
+
+
+def chunk_columns(df):
+    """
+    Float64 columns of a chunk keyed by field name, with each aliased
+    feature also available under its other name.
+    """
+    columns = {name: df[name].to_numpy(dtype=np.float64, na_value=np.nan)
+               for name in df.columns if name != ID_COLUMN}
+    for feature, alias in FEATURE_ALIASES.items():
+        if feature in columns and alias not in columns:
+            columns[alias] = columns[feature]
+        elif alias in columns and feature not in columns:
+            columns[feature] = columns[alias]
+    return columns
+
+
+def score_chunk(columns, n_rows):
+    """
+    Score one chunk on the worker's predictor. Returns (probabilities,
+    predictions, band codes, rule-set keys).
+    """
+    X = _predictor.transform.assemble_columns(columns, n_rows)
+    predictions, probabilities = _predictor.generate_predictions(X)
+    assessment = DEFAULT_ENGINE.assess(probabilities, columns)
+    return probabilities, predictions, assessment.band_codes, assessment.keys
+
+
+class RecommendationIds:
+    """Rule-set keys mapped to 'id;id;...' strings, each built once"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._strings = {}
+
+    def __call__(self, keys):
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        strings = []
+        for key in unique_keys.tolist():
+            if key not in self._strings:
+                self._strings[key] = ';'.join(map(str, self.engine.recommendation_ids(key)))
+            strings.append(self._strings[key])
+        return np.array(strings, dtype=object)[inverse]
+
+
+class ShardWriter:
+    """Appends scored chunks to a CSV or Parquet file"""
+
+    def __init__(self, path, fmt):
+        self.path = path
+        self.fmt = fmt
+        self._writer = None
+        self._header = True
+
+    def write(self, df):
+        if self.fmt == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode='w' if self._header else 'a', header=self._header, index=False)
+            self._header = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def iter_chunks(shard, chunk_size, transform):
+    """Yield (student IDs or None, columns, n_rows) for each chunk of a shard"""
+    features = scoring_columns(feature_columns(shard), transform)
+    for df in iter_batches(shard, features, chunk_size, include_ids=True, dtype=np.float64):
+        ids = df[ID_COLUMN].astype(str).to_numpy() if ID_COLUMN in df.columns else None
+        yield ids, chunk_columns(df[features]), len(df)
+
+
+def score_shard(shard, path, fmt, chunk_size, executor=None, workers=1):
+    """
+    Score one shard into path (via a temporary file). Chunks are scored on
+    executor when given, with at most workers * CHUNKS_PER_WORKER in
+    flight, and written in input order. Returns the row count.
+    """
+    import pandas as pd
+
+    band_names = np.array(DEFAULT_ENGINE.band_names, dtype=object)
+    recommendation_ids = RecommendationIds(DEFAULT_ENGINE)
+    tmp_path = f"{path}.tmp"
+    writer = ShardWriter(tmp_path, fmt)
+    rows = 0
+
+    def write(ids, n_rows, result):
+        probabilities, predictions, codes, keys = result
+        start = rows
+        if ids is None:
+            ids = np.arange(start, start + n_rows).astype(str)
+        writer.write(pd.DataFrame({
+            ID_COLUMN: ids,
+            'dropout_probability': probabilities,
+            'predicted_dropout': predictions,
+            'risk_level': band_names[codes],
+            'recommendation_ids': recommendation_ids(keys),
+        }, columns=OUTPUT_COLUMNS))
+
+    try:
+        pending = deque()
+        for ids, columns, n_rows in iter_chunks(shard, chunk_size, _predictor.transform):
+            if executor is None:
+                write(ids, n_rows, score_chunk(columns, n_rows))
+                rows += n_rows
+                continue
+            pending.append((ids, n_rows, executor.submit(score_chunk, columns, n_rows)))
+            if len(pending) >= workers * CHUNKS_PER_WORKER:
+                ids, n_rows, future = pending.popleft()
+                write(ids, n_rows, future.result())
+                rows += n_rows
+        while pending:
+            ids, n_rows, future = pending.popleft()
+            write(ids, n_rows, future.result())
+            rows += n_rows
+        if rows == 0:
+            writer.write(pd.DataFrame(columns=OUTPUT_COLUMNS))
+    finally:
+        writer.close()
+
+    os.replace(tmp_path, path)
+    return rows
+
+
+def score(input_path, output_dir, model_path=None, workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+          fmt='csv', resume=True, verbose=True):
+    """
+    Score every shard of input_path into output_dir. Returns
+    {'rows', 'seconds', 'rows_per_s', 'shards', 'skipped'}.
+    """
+    global _predictor
+
+    workers = workers or os.cpu_count() or 1
+    shards = input_shards(input_path)
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, 'recommendations.json'), 'w') as f:
+        json.dump(dict(enumerate(DEFAULT_ENGINE.recommendations)), f, indent=2)
+
+    todo = [s for s in shards if not (resume and os.path.exists(output_path(output_dir, s, fmt)))]
+    skipped = len(shards) - len(todo)
+    if verbose and skipped:
+        print(f"Skipping {skipped} already scored shard(s)")
+
+    if todo:
+        _predictor = load_predictor(model_path)
+    executor = None
+    if workers > 1 and todo:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        executor = ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                       initargs=(model_path,))
+
+    total_rows = 0
+    start = time.perf_counter()
+    try:
+        for shard in todo:
+            shard_start = time.perf_counter()
+            rows = score_shard(shard, output_path(output_dir, shard, fmt), fmt, chunk_size, executor, workers)
+            total_rows += rows
+            if verbose:
+                seconds = time.perf_counter() - shard_start
+                print(f"{os.path.basename(shard)}: {rows} rows in {seconds:.2f}s "
+                      f"({rows / max(seconds, 1e-9):,.0f} rows/s)")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    seconds = time.perf_counter() - start
+    summary = {
+        'rows': total_rows,
+        'seconds': seconds,
+        'rows_per_s': total_rows / max(seconds, 1e-9),
+        'shards': len(todo),
+        'skipped': skipped,
+    }
+    if verbose:
+        print(f"Scored {total_rows} rows from {len(todo)} shard(s) in {seconds:.2f}s "
+              f"({summary['rows_per_s']:,.0f} rows/s)")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('input', help="CSV/Parquet file or directory of shards")
+    parser.add_argument('output_dir')
+    parser.add_argument('--model', help="model file (default: the registry's current version)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--no-resume', action='store_true', help="rescore shards that already have output")
+    args = parser.parse_args()
+
+    score(args.input, args.output_dir, args.model, args.workers, args.chunk_size, args.format,
+          resume=not args.no_resume)
+
+
+if __name__ == "__main__":
+    main()
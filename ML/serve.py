@@ -0,0 +1,245 @@
+"""
+Production entry point for the ML API: a preforking multi-worker server.
+
+The parent process loads the registry's current model once, freezes the
+garbage collector's view of it, binds the listening socket and forks the
+workers. Workers inherit the model copy-on-write, so its pages stay shared:
+gc.freeze keeps collections from writing to the preloaded objects, and the
+model's bulk lives in NumPy buffers that reference counting never touches.
+Each worker pins its native thread pools to --threads threads so N workers
+do not oversubscribe the cores. On SIGTERM or SIGINT the parent stops the
+workers, which finish in-flight requests and drain their batchers, waiting
+up to --graceful-timeout seconds before killing stragglers.
+
+Workers that die are replaced. A worker exiting within FAST_EXIT_S of its
+start counts as a startup failure: replacements after consecutive failures
+wait with exponential backoff, and after MAX_FAST_FAILURES in a row the
+server stops with a non-zero exit status instead of forking in a loop.
+
+Usage: python serve.py [--workers 4] [--host 0.0.0.0] [--port 8000] [--threads 1]
+"""
+
+import argparse
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+# Native thread pools read these when the libraries are first imported
+THREAD_ENV_VARS = [
+    'OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'VECLIB_MAXIMUM_THREADS',
+    'NUMEXPR_NUM_THREADS',
+]
+
+# A worker exiting sooner than this after it was forked failed at startup
+FAST_EXIT_S = 10.0
+# Respawn delay after the first consecutive startup failure, doubling up to the maximum
+RESPAWN_BACKOFF_S = 0.5
+RESPAWN_BACKOFF_MAX_S = 30.0
+# Consecutive startup failures after which the server gives up
+MAX_FAST_FAILURES = 5
+
+
+class RespawnPolicy:
+    """
+    Delay before replacing a dead worker, from how long it ran. Startup
+    failures in a row, of any workers, back the delay off exponentially; a
+    worker that ran for at least fast_exit seconds resets the count.
+    """
+
+    def __init__(self, fast_exit=FAST_EXIT_S, backoff=RESPAWN_BACKOFF_S, backoff_max=RESPAWN_BACKOFF_MAX_S,
+                 max_fast_failures=MAX_FAST_FAILURES):
+        self.fast_exit = fast_exit
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.max_fast_failures = max_fast_failures
+        self.fast_failures = 0
+
+    def exited(self, lifetime):
+        """
+        Record a worker exit after lifetime seconds. Returns the seconds to
+        wait before replacing it, or None to stop the server.
+        """
+        if lifetime >= self.fast_exit:
+            self.fast_failures = 0
+            return 0.0
+        self.fast_failures += 1
+        if self.fast_failures >= self.max_fast_failures:
+            return None
+        return min(self.backoff * 2 ** (self.fast_failures - 1), self.backoff_max)
+
+
+def pin_threads(predictor, threads):
+    """
+    Limit the native thread pools, and the estimator's own n_jobs, to
+    threads threads.
+    """
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(threads)
+    except ImportError:
+        pass
+    model = predictor.best_model
+    if model is not None and 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=threads)
+
+
+def preload(threads):
+    """
+    Import the app and load the current registry version in this process.
+    Returns the main module.
+    """
+    import main
+    from student_dropout_predictor import StudentDropoutPredictor
+
+    registry = main.open_registry()
+    version = registry.current()
+    if version is None:
+        print("Model registry is empty; workers will start not ready. Run train_model.py to publish a model.")
+        return main
+
+    predictor = StudentDropoutPredictor()
+    predictor.load_model(registry.model_path(version), compile=main.USE_COMPILED_MODEL)
+    pin_threads(predictor, threads)
+    # Warm the lazily computed state so workers do not each write it
+    predictor.model_fingerprint()
+    predictor.generate_predictions(predictor.transform.assemble([{}]))
+    main.PRELOADED_MODELS[version] = predictor
+    print(f"Preloaded model version {version}")
+    return main
+
+
+def run_worker(main, sock, threads, graceful_timeout):
+    import gc
+    import uvicorn
+
+    gc.enable()
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(threads)
+    except ImportError:
+        pass
+
+    config = uvicorn.Config(main.app, log_level='info', timeout_graceful_shutdown=graceful_timeout)
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+
+
+def serve(host='0.0.0.0', port=8000, workers=2, threads=1, graceful_timeout=30.0, respawn=None):
+    """
+    Run the server until it is signalled to stop. Returns the exit status:
+    1 if it gave up on workers failing at startup, else 0.
+    """
+    import gc
+
+    # Collections before the fork would only move objects around; after
+    # preloading, freeze everything into the permanent generation
+    gc.disable()
+    main = preload(threads)
+    gc.collect()
+    gc.freeze()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    print(f"Listening on http://{host}:{sock.getsockname()[1]} with {workers} workers")
+
+    respawn = respawn or RespawnPolicy()
+    # Worker pid -> when it was forked; times at which to fork replacements
+    children = {}
+    pending = []
+    stopping = False
+    status = 0
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(main, sock, threads, graceful_timeout)
+            except BaseException:
+                traceback.print_exc()
+                os._exit(1)
+            os._exit(0)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        pending.clear()
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for _ in range(workers):
+        spawn()
+
+    deadline = None
+    while children or pending:
+        if stopping and deadline is None:
+            deadline = time.monotonic() + graceful_timeout + 5
+        while pending and pending[0] <= time.monotonic():
+            pending.pop(0)
+            spawn()
+        try:
+            pid, exit_status = os.waitpid(-1, os.WNOHANG) if children else (0, 0)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            if deadline is not None and time.monotonic() > deadline:
+                for straggler in children:
+                    os.kill(straggler, signal.SIGKILL)
+                deadline = float('inf')
+            time.sleep(0.1)
+            continue
+        started = children.pop(pid)
+        if stopping:
+            continue
+        exit_status = os.waitstatus_to_exitcode(exit_status)
+        # Replace workers that die, backing off while they fail at startup
+        delay = respawn.exited(time.monotonic() - started)
+        if delay is None:
+            print(f"Worker {pid} exited with status {exit_status}; {respawn.fast_failures} workers in a row "
+                  f"failed at startup, stopping")
+            status = 1
+            stop(None, None)
+        else:
+            print(f"Worker {pid} exited with status {exit_status}; restarting in {delay:.1f}s")
+            pending.append(time.monotonic() + delay)
+            pending.sort()
+
+    sock.close()
+    print("All workers stopped")
+    return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--threads', type=int, default=1, help="native threads per worker")
+    parser.add_argument('--graceful-timeout', type=float, default=30.0)
+    args = parser.parse_args()
+
+    for name in THREAD_ENV_VARS:
+        os.environ.setdefault(name, str(args.threads))
+    # One inference thread per worker unless configured otherwise
+    os.environ.setdefault('ML_INFERENCE_WORKERS', str(args.threads))
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    sys.exit(serve(args.host, args.port, args.workers, args.threads, args.graceful_timeout))
+
+
+if __name__ == "__main__":
+    main()
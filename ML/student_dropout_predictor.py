@@ -1,25 +1,34 @@
-import pandas as pd
+"""
+Serving core of the student dropout model.
+
+Only NumPy, joblib, the feature transform and instrumentation are imported
+here, plus whatever library the persisted model itself needs when it is
+unpickled. Training (model_training), plotting (visualization) and
+explanations (tree_shap) are imported on first use.
+"""
+
+import logging
 import numpy as np
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.linear_model import LogisticRegression
-from sklearn.svm import SVC
-from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score, roc_curve
-from sklearn.tree import DecisionTreeClassifier
-import xgboost as xgb
-import lightgbm as lgb
-from imblearn.over_sampling import SMOTE
-from imblearn.under_sampling import RandomUnderSampler
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import joblib
 import warnings
+import instrumentation
+from feature_transform import FeatureTransform
 warnings.filterwarnings('ignore')
 
+logger = logging.getLogger(__name__)
+
+# Risk level cut-offs on dropout probability
+MEDIUM_RISK_THRESHOLD = 0.3
+HIGH_RISK_THRESHOLD = 0.7
+
+# Largest batch scored by the compiled NumPy evaluator when the library
+# estimator is also loaded; bigger batches are faster in the library's own loops
+COMPILED_MAX_ROWS = 32
+
+# Probability above which a student is predicted to drop out; 0.5 matches
+# the estimators' own predict()
+DEFAULT_DECISION_THRESHOLD = 0.5
+
 class StudentDropoutPredictor:
     """
     A comprehensive ML model to predict student dropout risk based on 
@@ -28,220 +37,272 @@ class StudentDropoutPredictor:
     
     def __init__(self):
         self.models = {}
-        self.scaler = StandardScaler()
+        self.transform = None
         self.best_model = None
+        # NumPy evaluator compiled from best_model (see tree_ensemble)
+        self.compiled_model = None
+        # tree_shap.TreeExplainer of compiled_model, see explainer()
+        self._explainer = None
         self.feature_names = []
+        self.decision_threshold = DEFAULT_DECISION_THRESHOLD
+        self.training_report = []
+        # ingestion.StreamingStats of the raw training features, updated by
+        # incremental retraining
+        self.transform_stats = None
+        self._fingerprint = None
+        # (model object, digest of the file it was loaded from)
+        self._model_digest = (None, None)
         
-    def load_data(self, file_path=None):
+    def load_data(self, file_path=None, chunk_size=None):
         """
         Load student data. If no file provided, generate synthetic data for demonstration.
+        With a chunk_size, return an iterator of compact-dtype chunks instead
+        (see ingestion.iter_batches).
         """
+        import pandas as pd
         if file_path and pd.io.common.file_exists(file_path):
+            if chunk_size:
+                from ingestion import iter_batches
+                return iter_batches(file_path, chunk_size=chunk_size, include_ids=True)
             return pd.read_csv(file_path)
         else:
             # Generate synthetic data for demonstration
-            print("No data file found. Generating synthetic dataset...")
+            logger.info("No data file found. Generating synthetic dataset...")
             return self._generate_synthetic_data()
     
-    def _generate_synthetic_data(self, n_students=1000):
+    def _generate_synthetic_data(self, n_students=1000, seed=42):
         """
         Generate simplified synthetic student data.
         """
-        np.random.seed(42)
-
-        data = []
-
-        for i in range(n_students):
-            student_id = f"STU_{i+1:04d}"
-
-            # Generate base attendance for the student (randomized initial value)
-            avg_attendance = np.random.uniform(50, 100)  # Between 50% and 100%
-
-            # Generate assignment scores (10 assignments, range 0-100)
-            assignment_scores = np.random.randint(0, 101, size=10)
-            avg_assignment_score = np.mean(assignment_scores)  # Calculate average assignment score
-
-            # Generate attendance trend (random slope between -1 and 1)
-            attendance_trend = np.random.uniform(-1, 1)
-
-            # Determine dropout (target variable)
-            dropout_risk_score = (
-                (100 - avg_assignment_score) * 0.5 +
-                max(0, -attendance_trend) * 0.5
-            )
-
-            # Convert to binary with some randomness
-            dropout_probability = 1 / (1 + np.exp(-(dropout_risk_score - 50) / 10))
-            dropped_out = np.random.random() < dropout_probability
-
-            student_data = {
-                'student_id': student_id,
-                'avg_assignment_score': avg_assignment_score,
-                'attendance_trend': attendance_trend,
-                'avg_attendance': avg_attendance,  # Replace monthly attendance with average attendance
-                'dropped_out': int(dropped_out)
-            }
-
-            data.append(student_data)
-
-        return pd.DataFrame(data)
+        from synthetic_data import generate_synthetic_data
+        return generate_synthetic_data(n_students, seed)
     
     def preprocess_data(self, df):
         """
-        Preprocess the data for training or prediction.
+        Fit the feature transform on training data and return scaled features.
+        Prediction requests must go through generate_predictions instead, which
+        reuses the frozen transform rather than refitting it.
         """
+        import pandas as pd
+
         # Separate features and target
         feature_cols = [col for col in df.columns if col not in ['student_id', 'dropped_out']]
-        X = df[feature_cols].copy()
+        X = df[feature_cols]
 
-        # Handle missing values
-        X = X.fillna(X.median())
+        # Fit median imputation and scaling once, then apply them
+        self.transform = FeatureTransform.fit(X)
+        self.feature_names = self.transform.feature_names
+        from ingestion import StreamingStats
+        self.transform_stats = StreamingStats(self.feature_names)
+        self.transform_stats.update(X.to_numpy(dtype=np.float64, na_value=np.nan))
 
-        # Debugging: Check the structure of the dataframe before preprocessing
-        print("Dataframe before preprocessing:")
-        print(df.head())
-
-        # Store feature names
-        self.feature_names = X.columns.tolist()
-
-        # Scale features
-        X_scaled = self.scaler.fit_transform(X)
+        X_scaled = self.transform.assemble_frame(X)
+        self.transform.transform(X_scaled, out=X_scaled)
         X_scaled = pd.DataFrame(X_scaled, columns=self.feature_names)
 
-        # Debugging: Check the structure of the features after scaling
-        print("Features after scaling:")
-        print(X_scaled.head())
-
         # If 'dropped_out' exists, separate it as the target variable
         y = df['dropped_out'].copy() if 'dropped_out' in df.columns else None
 
         return X_scaled, y
     
-    def train_models(self, X, y):
+    def train_models(self, X, y, **options):
         """
-        Train multiple ML models and compare their performance.
+        Train multiple ML models and compare their performance. See
+        model_training.train_models for the parallelism, budget and seed
+        options.
         """
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
-
-        # Handle class imbalance using SMOTE
-        smote = SMOTE(random_state=42)
-        X_train_balanced, y_train_balanced = smote.fit_resample(X_train, y_train)
-
-        # Define models with stochastic elements
-        models = {
-            'Random Forest': RandomForestClassifier(n_estimators=100, random_state=None, bootstrap=True),
-            'Gradient Boosting': GradientBoostingClassifier(random_state=None, subsample=0.8),
-            'XGBoost': xgb.XGBClassifier(random_state=None, eval_metric='logloss', subsample=0.8),
-            'LightGBM': lgb.LGBMClassifier(random_state=None, verbose=-1, bagging_fraction=0.8)
-        }
-
-        # Train and evaluate models
-        results = {}
-
-        for name, model in models.items():
-            print(f"\nTraining {name}...")
-
-            # Train model
-            model.fit(X_train_balanced, y_train_balanced)
-
-            # Predictions
-            y_pred = model.predict(X_test)
-            y_pred_proba = model.predict_proba(X_test)[:, 1]
-
-            # Metrics
-            auc_score = roc_auc_score(y_test, y_pred_proba)
-            cv_scores = cross_val_score(model, X_train_balanced, y_train_balanced, cv=5, scoring='roc_auc')
-
-            results[name] = {
-                'model': model,
-                'auc_score': auc_score,
-                'cv_mean': cv_scores.mean(),
-                'cv_std': cv_scores.std(),
-                'y_test': y_test,
-                'y_pred': y_pred,
-                'y_pred_proba': y_pred_proba
-            }
-
-            print(f"AUC Score: {auc_score:.4f}")
-            print(f"CV AUC: {cv_scores.mean():.4f} (+/- {cv_scores.std() * 2:.4f})")
-
-        # Select best model
-        best_model_name = max(results.keys(), key=lambda x: results[x]['auc_score'])
-        self.best_model = results[best_model_name]['model']
-        self.models = results
-
-        print(f"\nBest Model: {best_model_name} (AUC: {results[best_model_name]['auc_score']:.4f})")
-
-        return results, X_test, y_test
+        from model_training import train_models
+        return train_models(self, X, y, **options)
     
-    def hyperparameter_tuning(self, X, y, model_name='Random Forest'):
+    def train_streaming(self, file_path, **options):
         """
-        Perform hyperparameter tuning for the specified model.
+        Train on a data file too large for memory, chunk by chunk. See
+        model_training.train_streaming for the options.
         """
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
-        
-        # Apply SMOTE
-        smote = SMOTE(random_state=42)
-        X_train_balanced, y_train_balanced = smote.fit_resample(X_train, y_train)
-        
-        if model_name == 'Random Forest':
-            param_grid = {
-                'n_estimators': [100, 200, 300],
-                'max_depth': [10, 20, None],
-                'min_samples_split': [2, 5, 10],
-                'min_samples_leaf': [1, 2, 4]
-            }
-            model = RandomForestClassifier(random_state=42)
-        
-        elif model_name == 'XGBoost':
-            param_grid = {
-                'n_estimators': [100, 200, 300],
-                'max_depth': [3, 6, 9],
-                'learning_rate': [0.01, 0.1, 0.2],
-                'subsample': [0.8, 0.9, 1.0]
-            }
-            model = xgb.XGBClassifier(random_state=42, eval_metric='logloss')
-        
-        else:
-            print(f"Hyperparameter tuning not implemented for {model_name}")
-            return None
-        
-        print(f"Performing hyperparameter tuning for {model_name}...")
-        grid_search = GridSearchCV(model, param_grid, cv=5, scoring='roc_auc', n_jobs=-1, verbose=1)
-        grid_search.fit(X_train_balanced, y_train_balanced)
-        
-        print(f"Best parameters: {grid_search.best_params_}")
-        print(f"Best CV score: {grid_search.best_score_:.4f}")
-        
-        # Update best model
-        self.best_model = grid_search.best_estimator_
-        
-        return grid_search
+        from model_training import train_streaming
+        return train_streaming(self, file_path, **options)
+    
+    def retrain_incremental(self, X_new, y_new, X_valid, y_valid, **options):
+        """
+        Extend the current model with new rows only, keeping it if validation
+        AUC does not regress. See model_training.retrain_incremental.
+        """
+        from model_training import retrain_incremental
+        return retrain_incremental(self, X_new, y_new, X_valid, y_valid, **options)
+    
+    def hyperparameter_tuning(self, X, y, model_name='Random Forest', **options):
+        """
+        Perform hyperparameter tuning for the specified model. See
+        model_training.hyperparameter_tuning for the search options.
+        """
+        from model_training import hyperparameter_tuning
+        return hyperparameter_tuning(self, X, y, model_name, **options)
     
     def generate_predictions(self, X):
         """
         Generate predictions and probabilities for new data.
+
+        X holds raw (unscaled) features: either a DataFrame with the feature
+        columns, or an array already assembled in feature_names order by
+        self.transform.assemble.
         """
-        if self.best_model is None:
+        if self.best_model is None and self.compiled_model is None:
             raise ValueError("No model trained yet. Please train a model first.")
 
-        # Ensure input data matches the feature names used during training
-        if not all(feature in X.columns for feature in self.feature_names):
+        if hasattr(X, 'columns'):
+            X = self.transform.assemble_frame(X)
+        elif X.shape[1] != self.transform.n_features:
             raise ValueError("Input data is missing required features.")
 
-        # Reorder columns to match the training feature order
-        X = X[self.feature_names]
+        # Scale input data using the frozen training transform
+        start = instrumentation.clock()
+        X_scaled = self.transform.transform(X)
+        start = instrumentation.record('scaling', start)
 
-        # Scale input data using the trained scaler
-        X_scaled = self.scaler.transform(X)
-
-        # Generate predictions and probabilities
-        predictions = self.best_model.predict(X_scaled)
-        probabilities = self.best_model.predict_proba(X_scaled)[:, 1]
+        # One predict_proba pass; labels come from the decision threshold
+        if self.compiled_model is not None and (
+                self.best_model is None or len(X_scaled) <= COMPILED_MAX_ROWS):
+            probabilities = self.compiled_model.predict_proba(X_scaled)
+        else:
+            probabilities = self.best_model.predict_proba(X_scaled)[:, 1]
+        predictions = probabilities > self.decision_threshold
+        instrumentation.record('inference', start)
+        instrumentation.record_batch(len(X_scaled))
 
         return predictions, probabilities
     
+    def predict_records(self, records):
+        """
+        Generate predictions for raw records (dicts or request objects).
+        """
+        return self.generate_predictions(self.transform.assemble(records))
+
+    def explainer(self):
+        """
+        The tree_shap.TreeExplainer of the compiled model, built on first use
+        and rebuilt when the model is replaced. Raises ValueError if the
+        model cannot be compiled.
+        """
+        if self.compiled_model is None and (self.best_model is None or not self.compile_model()):
+            raise ValueError("Explanations need a tree ensemble model.")
+        explainer = self._explainer
+        if explainer is None or explainer.ensemble is not self.compiled_model:
+            from tree_shap import TreeExplainer
+            explainer = TreeExplainer(self.compiled_model, self.transform.n_features)
+            self._explainer = explainer
+        return explainer
+
+    def explain(self, X):
+        """
+        Per-feature contributions for raw rows X assembled in feature_names
+        order. Returns (probabilities, contributions); each row's
+        contributions plus explainer().expected_value give its model output,
+        a probability for forests and log-odds for boosted models.
+        """
+        explainer = self.explainer()
+        start = instrumentation.clock()
+        X_scaled = self.transform.transform(X)
+        start = instrumentation.record('scaling', start)
+
+        contributions = explainer.shap_values(X_scaled)
+        probabilities = explainer.probabilities(contributions)
+        instrumentation.record('explanation', start)
+        return probabilities, contributions
+
+    def compile_model(self):
+        """
+        Compile best_model into a NumPy tree evaluator used by
+        generate_predictions. Returns False if the model type is unsupported.
+        """
+        from tree_ensemble import compile_ensemble, UnsupportedModelError
+        try:
+            self.compiled_model = compile_ensemble(self.best_model)
+        except UnsupportedModelError as e:
+            logger.warning(f"Model not compiled: {e}")
+            self.compiled_model = None
+        return self.compiled_model is not None
+    
+    def export_compiled(self, filepath):
+        """
+        Export the compiled tree arrays together with the frozen transform.
+        """
+        if self.compiled_model is None and not self.compile_model():
+            raise ValueError("Model cannot be compiled.")
+        self.compiled_model.save(filepath, self.transform)
+        logger.info(f"Compiled model exported to {filepath}")
+    
+    def load_compiled(self, filepath):
+        """
+        Load an exported compiled model; no estimator library is imported.
+        """
+        from tree_ensemble import CompiledEnsemble
+        self.compiled_model, self.transform = CompiledEnsemble.load(filepath)
+        self.feature_names = self.transform.feature_names
+        self.best_model = None
+        self.transform_stats = None
+        logger.info(f"Compiled model loaded from {filepath}")
+    
+    def save_artifact(self, filepath):
+        """
+        Save the compiled model, transform and decision threshold as a
+        pickle-free artifact that workers memory-map (see model_artifact).
+        """
+        from model_artifact import write_artifact
+        if self.compiled_model is None and not self.compile_model():
+            raise ValueError("Model cannot be compiled.")
+        source_model = type(self.best_model).__name__ if self.best_model is not None else None
+        write_artifact(filepath, self.compiled_model, self.transform, self.decision_threshold, source_model)
+        logger.info(f"Model artifact saved to {filepath}")
+    
+    def load_artifact(self, filepath, verify=True):
+        """
+        Memory-map a model artifact; nothing is unpickled and no estimator
+        library is imported.
+        """
+        from model_artifact import load_artifact
+        self.compiled_model, self.transform, self.decision_threshold, manifest = load_artifact(filepath, verify)
+        self.feature_names = self.transform.feature_names
+        self.best_model = None
+        self.transform_stats = None
+        self._model_digest = (self.compiled_model, manifest['checksum']['digest'])
+        logger.info(f"Model artifact loaded from {filepath}")
+    
+    def model_fingerprint(self):
+        """
+        Short content hash of the model, transform and decision threshold,
+        recomputed whenever one of them is replaced. The same model file
+        loaded in different processes gets the same fingerprint.
+        """
+        state = (id(self.best_model), id(self.compiled_model), id(self.transform), self.decision_threshold)
+        if self._fingerprint is None or self._fingerprint[0] != state:
+            import hashlib
+            import pickle
+            # Pickled trees contain struct padding bytes, so a loaded model
+            # is identified by its file digest and others by compiled arrays
+            loaded = self.best_model if self.best_model is not None else self.compiled_model
+            if loaded is not None and self._model_digest[0] is loaded:
+                model = self._model_digest[1]
+            elif self.compiled_model is not None:
+                model = (self.compiled_model.to_arrays(), self.compiled_model.metadata())
+            else:
+                model = self.best_model
+            transform = self.transform.to_dict() if self.transform is not None else None
+            payload = pickle.dumps((model, transform, self.decision_threshold), protocol=4)
+            self._fingerprint = (state, hashlib.sha256(payload).hexdigest()[:16])
+        return self._fingerprint[1]
+    
+    def set_decision_threshold(self, threshold):
+        """
+        Set the probability above which a student is predicted to drop out.
+        It must lie within the MEDIUM risk band so HIGH risk students are
+        always predicted to drop out and LOW risk students never are.
+        """
+        if not MEDIUM_RISK_THRESHOLD <= threshold <= HIGH_RISK_THRESHOLD:
+            raise ValueError(
+                f"Decision threshold must be between {MEDIUM_RISK_THRESHOLD} and {HIGH_RISK_THRESHOLD}"
+            )
+        self.decision_threshold = float(threshold)
+    
     def feature_importance_analysis(self):
         """
         Analyze feature importance from the best model.
@@ -250,6 +311,7 @@ class StudentDropoutPredictor:
             raise ValueError("No model trained yet. Please train a model first.")
         
         if hasattr(self.best_model, 'feature_importances_'):
+            import pandas as pd
             importance_df = pd.DataFrame({
                 'feature': self.feature_names,
                 'importance': self.best_model.feature_importances_
@@ -257,150 +319,63 @@ class StudentDropoutPredictor:
             
             return importance_df
         else:
-            print("Feature importance not available for this model type.")
+            logger.warning("Feature importance not available for this model type.")
             return None
     
     def save_model(self, filepath):
         """
-        Save the trained model and scaler.
+        Save the trained model and feature transform.
         """
         model_data = {
             'best_model': self.best_model,
-            'scaler': self.scaler,
-            'feature_names': self.feature_names
+            'transform': self.transform.to_dict(),
+            'feature_names': self.feature_names,
+            'decision_threshold': self.decision_threshold
         }
+        if self.transform_stats is not None:
+            model_data['transform_stats'] = self.transform_stats.to_dict()
         joblib.dump(model_data, filepath)
-        print(f"Model saved to {filepath}")
+        logger.info(f"Model saved to {filepath}")
     
-    def load_model(self, filepath):
+    def load_model(self, filepath, compile=False):
         """
-        Load a previously trained model.
+        Load a previously trained model, optionally compiling it for
+        library-free scoring. Model artifacts (see save_artifact) are
+        recognised and memory-mapped instead.
         """
-        model_data = joblib.load(filepath)
+        from model_artifact import is_artifact
+        if is_artifact(filepath):
+            self.load_artifact(filepath)
+            return
+
+        import hashlib
+        with open(filepath, 'rb') as f:
+            model_data = joblib.load(f)
+            f.seek(0)
+            digest = hashlib.sha256(f.read()).hexdigest()
         self.best_model = model_data['best_model']
-        self.scaler = model_data['scaler']
+        self._model_digest = (self.best_model, digest)
         self.feature_names = model_data['feature_names']
-        print(f"Model loaded from {filepath}")
-
-# Visualization functions
-def create_visualizations(predictor, results, X_test, y_test):
-    """
-    Create comprehensive visualizations for the ML model results.
-    """
-    
-    # 1. Model Comparison
-    model_names = list(results.keys())
-    auc_scores = [results[name]['auc_score'] for name in model_names]
-    cv_means = [results[name]['cv_mean'] for name in model_names]
-    
-    fig = make_subplots(
-        rows=2, cols=2,
-        subplot_titles=('Model AUC Comparison', 'ROC Curves', 'Feature Importance', 'Confusion Matrix'),
-        specs=[[{"secondary_y": False}, {"secondary_y": False}],
-               [{"secondary_y": False}, {"secondary_y": False}]]
-    )
-    
-    # Model comparison bar chart
-    fig.add_trace(
-        go.Bar(x=model_names, y=auc_scores, name='Test AUC', marker_color='lightblue'),
-        row=1, col=1
-    )
-    fig.add_trace(
-        go.Bar(x=model_names, y=cv_means, name='CV AUC', marker_color='lightgreen'),
-        row=1, col=1
-    )
-    
-    # ROC Curves
-    for name in model_names:
-        fpr, tpr, _ = roc_curve(results[name]['y_test'], results[name]['y_pred_proba'])
-        fig.add_trace(
-            go.Scatter(x=fpr, y=tpr, name=f'{name} (AUC: {results[name]["auc_score"]:.3f})', mode='lines'),
-            row=1, col=2
-        )
-    
-    # Diagonal line for random classifier
-    fig.add_trace(
-        go.Scatter(x=[0, 1], y=[0, 1], mode='lines', line=dict(dash='dash'), name='Random'),
-        row=1, col=2
-    )
-    
-    # Feature importance
-    importance_df = predictor.feature_importance_analysis()
-    if importance_df is not None:
-        top_features = importance_df.head(10)
-        fig.add_trace(
-            go.Bar(x=top_features['importance'], y=top_features['feature'], orientation='h'),
-            row=2, col=1
-        )
-    
-    # Confusion matrix for best model
-    best_model_name = max(results.keys(), key=lambda x: results[x]['auc_score'])
-    cm = confusion_matrix(results[best_model_name]['y_test'], results[best_model_name]['y_pred'])
-    
-    fig.add_trace(
-        go.Heatmap(z=cm, x=['Not Dropped', 'Dropped'], y=['Not Dropped', 'Dropped'], 
-                   colorscale='Blues', showscale=False),
-        row=2, col=2
-    )
-    
-    fig.update_layout(height=800, title_text="Student Dropout Prediction - Model Analysis")
-    fig.show()
-    
-    return fig
-
-def create_risk_analysis_dashboard(df, predictions, probabilities):
-    """
-    Create a dashboard for risk analysis.
-    """
-    # Add predictions to dataframe
-    df_viz = df.copy()
-    df_viz['predicted_dropout'] = predictions
-    df_viz['dropout_probability'] = probabilities
-    df_viz['risk_level'] = pd.cut(probabilities, bins=[0, 0.3, 0.7, 1.0], 
-                                  labels=['Low Risk', 'Medium Risk', 'High Risk'])
-    
-    fig = make_subplots(
-        rows=2, cols=2,
-        subplot_titles=('Risk Distribution', 'Attendance vs Assignment Grades', 
-                       'Risk by Attendance', 'Probability Distribution'),
-        specs=[[{"secondary_y": False}, {"secondary_y": False}],
-               [{"secondary_y": False}, {"secondary_y": False}]]
-    )
-    
-    # Risk distribution
-    risk_counts = df_viz['risk_level'].value_counts()
-    fig.add_trace(
-        go.Pie(labels=risk_counts.index, values=risk_counts.values, name="Risk Distribution"),
-        row=1, col=1
-    )
-    
-    # Attendance vs Assignment grades colored by risk
-    fig.add_trace(
-        go.Scatter(x=df_viz['avg_attendance'], y=df_viz['avg_assignment_grade'],
-                   mode='markers', marker=dict(color=df_viz['dropout_probability'], 
-                                             colorscale='Reds', size=8),
-                   text=df_viz['risk_level'], name="Students"),
-        row=1, col=2
-    )
-    
-    # Risk by attendance bins
-    attendance_bins = pd.cut(df_viz['avg_attendance'], bins=5)
-    risk_by_attendance = df_viz.groupby(attendance_bins)['dropout_probability'].mean()
-    fig.add_trace(
-        go.Bar(x=[str(x) for x in risk_by_attendance.index], y=risk_by_attendance.values),
-        row=2, col=1
-    )
-    
-    # Probability distribution
-    fig.add_trace(
-        go.Histogram(x=df_viz['dropout_probability'], nbinsx=20, name="Probability Distribution"),
-        row=2, col=2
-    )
-    
-    fig.update_layout(height=800, title_text="Student Dropout Risk Analysis Dashboard")
-    fig.show()
-    
-    return fig, df_viz
+        self.decision_threshold = model_data.get('decision_threshold', DEFAULT_DECISION_THRESHOLD)
+        if 'transform' in model_data:
+            self.transform = FeatureTransform.from_dict(model_data['transform'])
+        else:
+            self.transform = FeatureTransform.from_scaler(model_data['scaler'], self.feature_names)
+        self.transform_stats = None
+        if 'transform_stats' in model_data:
+            from ingestion import StreamingStats
+            self.transform_stats = StreamingStats.from_dict(model_data['transform_stats'])
+        self.compiled_model = None
+        if compile:
+            self.compile_model()
+        logger.info(f"Model loaded from {filepath}")
+
+# Visualization functions live in visualization.py; keep the old import path working
+def __getattr__(name):
+    if name in ('create_visualizations', 'create_risk_analysis_dashboard'):
+        import visualization
+        return getattr(visualization, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == "__main__":
     # Example usage
@@ -422,7 +397,7 @@ if __name__ == "__main__":
     results, X_test, y_test = predictor.train_models(X, y)
     
     # Generate predictions for all data
-    predictions, probabilities = predictor.generate_predictions(X)
+    predictions, probabilities = predictor.generate_predictions(df)
     
     # Feature importance analysis
     importance_df = predictor.feature_importance_analysis()
@@ -0,0 +1,151 @@
+"""
+Vectorized synthetic student cohort generator.
+
+Rows are produced in fixed blocks of BLOCK_SIZE students, each drawn from
+its own numpy Generator seeded with (seed, block index). A cohort therefore
+depends only on its seed: the chunk size used to build it, or to stream it to
+disk, does not change a single value.
+
+Usage: python synthetic_data.py OUTPUT.csv|OUTPUT.parquet [--students 10000000]
+       [--seed 42] [--chunk-size 1000000]
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+BLOCK_SIZE = 1 << 16
+DEFAULT_CHUNK_SIZE = 1 << 20
+COLUMNS = ['student_id', 'avg_assignment_score', 'attendance_trend', 'avg_attendance', 'dropped_out']
+
+
+def student_ids(start, stop):
+    """
+    IDs STU_0001, STU_0002, ... for 0-based rows start..stop-1, built as
+    byte arrays instead of one format call per student.
+    """
+    ids = np.arange(start + 1, stop + 1, dtype=np.int64)
+    width = max(4, len(str(stop)))
+    n_digits = np.full(len(ids), 4)
+    for k in range(4, width):
+        n_digits[ids >= 10 ** k] += 1
+
+    chars = np.zeros((len(ids), 4 + width), dtype=np.uint8)
+    chars[:, :4] = np.frombuffer(b'STU_', dtype=np.uint8)
+    rows = np.arange(len(ids))
+    for k in range(width):
+        has_digit = n_digits > k
+        digit = (ids[has_digit] // 10 ** k) % 10
+        chars[rows[has_digit], 3 + n_digits[has_digit] - k] = ord('0') + digit
+    # Shorter IDs are padded with NUL bytes, which the S dtype drops
+    return chars.view(f'S{4 + width}').ravel().astype(f'U{4 + width}')
+
+
+def _generate_block(seed, block, n):
+    """Columns for the n students of one block."""
+    rng = np.random.default_rng([seed, block])
+
+    avg_attendance = rng.uniform(50, 100, n)
+    # Average of 10 assignment scores in 0-100
+    avg_assignment_score = rng.integers(0, 101, size=(n, 10), dtype=np.uint8).sum(axis=1, dtype=np.uint16) / 10
+    attendance_trend = rng.uniform(-1, 1, n)
+
+    # Same target as the original per-student loop
+    dropout_risk_score = (100 - avg_assignment_score) * 0.5 + np.maximum(0, -attendance_trend) * 0.5
+    dropout_probability = 1 / (1 + np.exp(-(dropout_risk_score - 50) / 10))
+    dropped_out = (rng.random(n) < dropout_probability).astype(np.int64)
+
+    return avg_assignment_score, attendance_trend, avg_attendance, dropped_out
+
+
+def generate_columns(start, stop, seed=42, include_ids=True):
+    """
+    Return {column: array} for 0-based rows start..stop-1. start must be a
+    multiple of BLOCK_SIZE.
+    """
+    if start % BLOCK_SIZE:
+        raise ValueError(f"start must be a multiple of {BLOCK_SIZE}")
+
+    n = stop - start
+    columns = {name: np.empty(n, dtype=np.int64 if name == 'dropped_out' else np.float64)
+               for name in COLUMNS[1:]}
+    for offset in range(0, n, BLOCK_SIZE):
+        size = min(BLOCK_SIZE, n - offset)
+        block = _generate_block(seed, (start + offset) // BLOCK_SIZE, size)
+        for name, values in zip(COLUMNS[1:], block):
+            columns[name][offset:offset + size] = values
+
+    if include_ids:
+        return {'student_id': student_ids(start, stop), **columns}
+    return columns
+
+
+def iter_chunks(n_students, seed=42, chunk_size=DEFAULT_CHUNK_SIZE, include_ids=True):
+    """
+    Yield the cohort as DataFrames of about chunk_size rows (rounded up to a
+    whole number of blocks).
+    """
+    import pandas as pd
+
+    chunk_size = -(-chunk_size // BLOCK_SIZE) * BLOCK_SIZE
+    for start in range(0, n_students, chunk_size):
+        stop = min(start + chunk_size, n_students)
+        yield pd.DataFrame(generate_columns(start, stop, seed, include_ids))
+
+
+def generate_synthetic_data(n_students=1000, seed=42, include_ids=True):
+    """
+    Generate a synthetic cohort of n_students as one DataFrame.
+    """
+    import pandas as pd
+    return pd.DataFrame(generate_columns(0, n_students, seed, include_ids))
+
+
+def write_synthetic_data(path, n_students, seed=42, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream a synthetic cohort to a CSV or Parquet file (chosen by suffix) one
+    chunk at a time, so memory use is bounded by chunk_size. Parquet needs
+    pyarrow.
+    """
+    suffix = os.path.splitext(path)[1].lower()
+    chunks = iter_chunks(n_students, seed, chunk_size)
+
+    if suffix == '.parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Writing Parquet requires pyarrow") from e
+        writer = None
+        try:
+            for df in chunks:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+    elif suffix == '.csv':
+        with open(path, 'w', newline='') as f:
+            for i, df in enumerate(chunks):
+                df.to_csv(f, header=i == 0, index=False)
+    else:
+        raise ValueError(f"Unsupported output format: {suffix or path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('output')
+    parser.add_argument('--students', type=int, default=10_000_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    write_synthetic_data(args.output, args.students, args.seed, args.chunk_size)
+    print(f"Wrote {args.students} students to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+# Tests for the benchmark suite and its regression check
+import bench_suite
+
+
+def test_run_records_each_case(tmp_path):
+    history = str(tmp_path / 'history.json')
+    record = bench_suite.run(history, label='test', stages=['preprocess_data', 'generate_predictions', 'api_bulk'],
+                             sizes=[1, 50], models=['LightGBM'], repeat=1, verbose=False)
+    cases = {(r['stage'], r['model'], r['rows']) for r in record['results']}
+    assert cases == {('preprocess_data', '-', 1), ('preprocess_data', '-', 50),
+                     ('generate_predictions', 'LightGBM', 1), ('generate_predictions', 'LightGBM', 50),
+                     ('api_bulk', 'LightGBM', 1), ('api_bulk', 'LightGBM', 50)}
+    assert all(r['p50_ms'] > 0 and r['throughput_rows_s'] > 0 for r in record['results'])
+    assert bench_suite.load_history(history) == [record]
+
+
+def test_compare_flags_regressions_beyond_tolerance():
+    def result(stage, p50_ms, peak_mb):
+        return {'stage': stage, 'model': 'LightGBM', 'rows': 1000, 'p50_ms': p50_ms, 'peak_mb': peak_mb}
+
+    baseline = {'results': [result('a', 10.0, 5.0), result('b', 10.0, 5.0), result('c', 10.0, 5.0),
+                            result('d', 0.01, None)]}
+    candidate = {'results': [result('a', 10.5, 5.0), result('b', 12.0, 5.0), result('c', 10.0, 6.0),
+                             result('d', 0.05, None), result('new', 1.0, 1.0)]}
+    rows = bench_suite.compare(baseline, candidate, tolerance=0.1)
+    assert {row['stage']: row['regression'] for row in rows} == {'a': False, 'b': True, 'c': True, 'd': False}
@@ -0,0 +1,158 @@
+# Tests for the columnar bulk request parsing and response encoding
+import asyncio
+import json
+
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+import columnar
+from main import FIELD_RANGES, STUDENT_SCHEMA, StudentData
+from risk_rules import DEFAULT_ENGINE
+
+
+def ndjson(rows):
+    return b'\n'.join(json.dumps(row).encode() for row in rows) + b'\n'
+
+
+def test_columns_match_pydantic_parsing():
+    rows = [
+        {'student_id': 'A', 'avg_attendance': 80, 'avg_assignment_grade': 70.5},
+        {'student_id': 'B', 'avg_attendance': 55.0, 'avg_assignment_grade': 90, 'attendance_trend': None,
+         'late_submissions': 2.7, 'previous_gpa': '3.5'},
+    ]
+    columns = columnar.parse_ndjson(ndjson(rows), STUDENT_SCHEMA)
+    assert list(columns.ids) == ['A', 'B']
+
+    for i, row in enumerate(rows):
+        student = StudentData(**row)
+        for name, value in student.dict().items():
+            if name == 'student_id':
+                continue
+            expected = np.nan if value is None else float(value)
+            assert columns.values[name][i] == pytest.approx(expected, nan_ok=True), name
+
+
+def test_validation_errors_locate_rows_and_fields():
+    rows = [
+        {'student_id': 'A', 'avg_attendance': 80, 'avg_assignment_grade': 70},
+        {'student_id': 'B', 'avg_attendance': 150, 'avg_assignment_grade': 70},
+        {'student_id': 'C', 'avg_assignment_grade': 70},
+        {'student_id': 'D', 'avg_attendance': 'high', 'avg_assignment_grade': -1},
+    ]
+    with pytest.raises(columnar.ColumnValidationError) as excinfo:
+        columnar.parse_ndjson(ndjson(rows), STUDENT_SCHEMA)
+
+    errors = {tuple(e['loc']): e['msg'] for e in excinfo.value.errors}
+    assert errors[(1, 'avg_attendance')] == FIELD_RANGES['avg_attendance'][2]
+    assert (2, 'avg_attendance') in errors
+    assert errors[(3, 'avg_attendance')] == "value is not a valid float"
+    assert errors[(3, 'avg_assignment_grade')] == FIELD_RANGES['avg_assignment_grade'][2]
+    assert (0, 'avg_attendance') not in errors
+
+    # The pydantic model rejects the same rows
+    for row in rows[1:]:
+        with pytest.raises(ValidationError):
+            StudentData(**row)
+
+
+def test_student_ids_accept_numbers_but_not_other_types():
+    rows = [
+        {'student_id': 7, 'avg_attendance': 80, 'avg_assignment_grade': 70},
+        {'student_id': 7.5, 'avg_attendance': 80, 'avg_assignment_grade': 70},
+    ]
+    assert list(columnar.parse_ndjson(ndjson(rows), STUDENT_SCHEMA).ids) == ['7', '7.5']
+
+    rows += [{**rows[0], 'student_id': ['A']}, {**rows[0], 'student_id': {'id': 'A'}}, {**rows[0], 'student_id': None}]
+    with pytest.raises(columnar.ColumnValidationError) as excinfo:
+        columnar.parse_ndjson(ndjson(rows), STUDENT_SCHEMA)
+    errors = {tuple(e['loc']): e['msg'] for e in excinfo.value.errors}
+    assert errors == {(2, 'student_id'): "str type expected", (3, 'student_id'): "str type expected",
+                      (4, 'student_id'): "none is not an allowed value"}
+    for row in rows[2:]:
+        with pytest.raises(ValidationError):
+            StudentData(**row)
+
+
+def test_csv_missing_a_required_column_is_one_error():
+    body = b'student_id,avg_attendance\n' + b''.join(b'S%d,80\n' % i for i in range(50))
+    with pytest.raises(columnar.ColumnValidationError) as excinfo:
+        columnar.parse_csv(body, STUDENT_SCHEMA)
+    assert excinfo.value.errors == [{'loc': ['avg_assignment_grade'], 'msg': "field required",
+                                     'type': 'value_error.missing'}]
+
+
+def test_json_envelope_errors_are_located_under_students():
+    body = json.dumps({'students': [{'student_id': 'A', 'avg_attendance': 101, 'avg_assignment_grade': 5}]})
+    with pytest.raises(columnar.ColumnValidationError) as excinfo:
+        columnar.parse_json(body.encode(), STUDENT_SCHEMA)
+    assert excinfo.value.located('body')[0]['loc'] == ['body', 'students', 0, 'avg_attendance']
+
+    with pytest.raises(columnar.ColumnValidationError):
+        columnar.parse_json(b'{"students": ', STUDENT_SCHEMA)
+
+
+def test_negotiate():
+    assert columnar.negotiate(None) == columnar.JSON
+    assert columnar.negotiate('*/*') == columnar.JSON
+    assert columnar.negotiate('application/x-ndjson') == columnar.NDJSON
+    assert columnar.negotiate('application/json;q=0.5, application/x-ndjson') == columnar.NDJSON
+    assert columnar.negotiate('text/html') is None
+    assert columnar.negotiate('text/html, */*;q=0.1') == columnar.JSON
+
+
+def test_undecodable_csv_is_a_validation_error():
+    with pytest.raises(columnar.ColumnValidationError) as excinfo:
+        columnar.parse_csv(b'student_id,avg_attendance,avg_assignment_grade\nA,80,70\n\xffB,80,70\n', STUDENT_SCHEMA)
+    assert excinfo.value.errors[0]['loc'] == [1]
+    with pytest.raises(columnar.ColumnValidationError):
+        columnar.parse_csv_header(b'student_id,\xff')
+
+
+def test_invalid_arrow_stream_is_a_validation_error():
+    pytest.importorskip("pyarrow")
+    with pytest.raises(columnar.ColumnValidationError):
+        columnar.parse_arrow(b'not an arrow stream', STUDENT_SCHEMA)
+
+
+def test_encode_ndjson_round_trips():
+    ids = np.array(['A', 'B', 'C'], dtype=object)
+    probabilities = np.array([0.1, 0.5, 0.9])
+    predictions = probabilities > 0.5
+    features = {'avg_attendance': np.array([90.0, 75.0, 50.0])}
+    assessment = DEFAULT_ENGINE.assess(probabilities, features)
+
+    lines = [json.loads(line) for line in columnar.encode_ndjson(ids, predictions, probabilities,
+                                                                  assessment).splitlines()]
+    assert lines[-1] == {'summary': assessment.summary()}
+    for i, line in enumerate(lines[:-1]):
+        assert line['student_id'] == ids[i]
+        assert line['dropout_probability'] == probabilities[i]
+        assert line['risk_level'] == assessment.band_names[i]
+        assert line['predicted_dropout'] == bool(predictions[i])
+        assert line['recommendations'] == assessment.recommendations[i]
+
+
+async def collect_batches(chunks, max_rows, max_wait=None):
+    return [batch async for batch in columnar.iter_line_batches(chunks, max_rows, max_wait)]
+
+
+def test_line_batches_fill_up_across_chunks():
+    async def chunks():
+        # One line per chunk, the last without a trailing newline
+        for i in range(7):
+            yield b'line%d' % i + (b'\n\n' if i < 6 else b'')
+
+    batches = asyncio.run(collect_batches(chunks(), 3))
+    assert batches == [[b'line0', b'line1', b'line2'], [b'line3', b'line4', b'line5'], [b'line6']]
+
+
+def test_line_batches_flush_a_slow_stream_after_max_wait():
+    async def chunks():
+        yield b'a\nb\n'
+        await asyncio.sleep(0.2)
+        yield b'c\nd'
+
+    batches = asyncio.run(collect_batches(chunks(), 100, max_wait=0.05))
+    assert batches == [[b'a', b'b'], [b'c', b'd']]
+    assert asyncio.run(collect_batches(chunks(), 100)) == [[b'a', b'b', b'c', b'd']]
@@ -0,0 +1,131 @@
+# Tests for incremental per-student features from raw records
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_store import FeatureStore, recompute
+from model_training import build_candidates
+from student_dropout_predictor import StudentDropoutPredictor
+from test_predictor import make_frame
+
+
+def make_records(n_students=50, n_attendance=3000, n_assignments=800, seed=0):
+    """Interleaved raw records in arrival (day) order"""
+    rng = np.random.default_rng(seed)
+    ids = np.array([f"STU_{i:04d}" for i in range(n_students)], dtype=object)
+    attendance = pd.DataFrame({
+        'student_id': rng.choice(ids, n_attendance),
+        'day': np.sort(rng.integers(19700, 19900, n_attendance)),
+        'present': rng.random(n_attendance) < 0.8,
+    })
+    assignments = pd.DataFrame({
+        'student_id': rng.choice(ids, n_assignments),
+        'day': np.sort(rng.integers(19700, 19900, n_assignments)),
+        'score': rng.uniform(0, 100, n_assignments),
+        'late': rng.random(n_assignments) < 0.1,
+    })
+    return attendance, assignments
+
+
+def incremental(attendance, assignments):
+    store = FeatureStore(capacity=4)
+    store.add_attendance_records(attendance['student_id'].tolist(), attendance['day'], attendance['present'])
+    store.add_assignment_records(assignments['student_id'].tolist(), assignments['day'], assignments['score'],
+                                 assignments['late'])
+    return store
+
+
+def test_single_student_features():
+    store = FeatureStore()
+    # January: 2 of 4 sessions attended; February: all 3
+    for day, present in [('2024-01-02', True), ('2024-01-03', False), ('2024-01-04', False),
+                         ('2024-01-05', True), ('2024-02-01', True), ('2024-02-02', True), ('2024-02-03', True)]:
+        store.add_attendance('A', day, present)
+    store.add_assignment('A', '2024-01-01', 40, late=True)
+    store.add_assignment('A', '2024-01-31', 70)
+
+    values = store.features().values
+    assert values['avg_attendance'][0] == pytest.approx(100 * 5 / 7)
+    assert values['avg_assignment_grade'][0] == 55
+    assert values['low_attendance_months'][0] == 1
+    assert values['missed_consecutive_days'][0] == 2
+    assert values['failing_assignments'][0] == 1
+    assert values['late_submissions'][0] == 1
+    # +30 points over 30 days
+    assert values['assignment_trend'][0] == pytest.approx(0.3)
+    assert values['attendance_trend'][0] > 0
+
+
+def test_incremental_matches_batch_recompute():
+    attendance, assignments = make_records()
+    store = incremental(attendance, assignments)
+    batch = recompute(attendance, assignments)
+
+    assert sorted(batch.student_ids) == sorted(store.student_ids)
+    expected = batch.features(store.student_ids).values
+    for name, values in store.features().values.items():
+        np.testing.assert_array_equal(values, expected[name], err_msg=name)
+
+
+def test_snapshot_round_trip_then_continue(tmp_path):
+    attendance, assignments = make_records(seed=1)
+    half = len(attendance) // 2
+    path = str(tmp_path / 'features.npz')
+
+    incremental(attendance.iloc[:half], assignments.iloc[:0]).save(path)
+    store = FeatureStore.open(path)
+    store.add_attendance_records(attendance['student_id'].iloc[half:].tolist(), attendance['day'].iloc[half:],
+                                 attendance['present'].iloc[half:])
+
+    expected = recompute(attendance).features(store.student_ids).values
+    for name, values in store.features().values.items():
+        np.testing.assert_array_equal(values, expected[name], err_msg=name)
+    assert len(FeatureStore.open(str(tmp_path / 'missing.npz'))) == 0
+
+
+def test_integer_ids_survive_a_snapshot(tmp_path):
+    attendance, assignments = make_records(n_students=10, seed=2)
+    codes = {f"STU_{i:04d}": 100 + i for i in range(10)}
+    attendance['student_id'] = attendance['student_id'].map(codes)
+    assignments['student_id'] = assignments['student_id'].map(codes)
+    path = str(tmp_path / 'features.npz')
+
+    store = incremental(attendance, assignments)
+    store.save(path)
+    loaded = FeatureStore.load(path)
+    batch = recompute(attendance, assignments)
+
+    student = attendance['student_id'].iloc[0]
+    for each in (store, loaded, batch):
+        assert student in each and str(student) in each
+        assert each.features([student]).ids == [str(student)]
+    expected = store.features([student]).values
+    assert not np.isnan(expected['avg_attendance']).any()
+    for each in (loaded, batch):
+        for name, values in each.features([student]).values.items():
+            np.testing.assert_array_equal(values, expected[name], err_msg=name)
+
+
+def test_out_of_order_records_are_rejected():
+    store = FeatureStore()
+    store.add_attendance('A', 19800, True)
+    with pytest.raises(ValueError):
+        store.add_attendance('A', 19799, True)
+    store.add_attendance('B', 19700, True)
+
+
+def test_assembled_features_feed_generate_predictions():
+    predictor = StudentDropoutPredictor()
+    X, y = predictor.preprocess_data(make_frame(300))
+    predictor.best_model = build_candidates(random_state=0)['Random Forest'].fit(X.to_numpy(), y)
+
+    store = incremental(*make_records(n_students=20))
+    ids, X_raw = store.assemble(predictor.transform, ['STU_0003', 'UNKNOWN'])
+    assert ids == ['STU_0003', 'UNKNOWN']
+    column = predictor.feature_names.index('avg_assignment_score')
+    assert X_raw[0, column] == store.features(['STU_0003']).values['avg_assignment_grade'][0]
+    # An unknown student falls back to the training medians
+    assert X_raw[1, column] == predictor.transform.medians[column]
+
+    predictions, probabilities = predictor.generate_predictions(X_raw)
+    assert predictions.shape == probabilities.shape == (2,)
@@ -0,0 +1,75 @@
+# Tests for successive-halving hyperparameter search
+import pytest
+
+from hyperparameter_search import SEARCH_SPACES, TPESampler, SuccessiveHalvingSearch
+from model_training import build_candidates
+from test_training import prepared
+
+
+@pytest.mark.parametrize('model_name', list(SEARCH_SPACES))
+def test_every_family_can_be_tuned(model_name):
+    predictor, X, y = prepared()
+    result = predictor.hyperparameter_tuning(X, y, model_name, n_configs=4, max_resource=27, cv=3, seed=1)
+
+    assert predictor.best_model is result.best_estimator_
+    assert predictor.best_model.get_params()['n_estimators'] == 27
+    assert 0.0 <= result.best_score_ <= 1.0
+    assert set(result.best_params_) == set(SEARCH_SPACES[model_name])
+
+
+def test_halving_uses_fewer_fits_than_a_full_grid():
+    search = SuccessiveHalvingSearch(build_candidates(random_state=0)['Random Forest'], SEARCH_SPACES['Random Forest'],
+                                     n_configs=9, min_resource=10, max_resource=90, cv=3, seed=0, verbose=False)
+    assert search.rungs() == [10, 30, 90]
+
+    _, X, y = prepared()
+    result = search.fit(X, y)
+    # 9 + 3 + 1 configurations over 3 folds, plus the final refit
+    assert result.n_fits_ == (9 + 3 + 1) * 3 + 1
+    assert [trial['rung'] for trial in result.trials_].count(2) == 1
+
+
+def test_checkpoint_resumes_without_refitting(tmp_path):
+    _, X, y = prepared()
+    checkpoint = str(tmp_path / 'search.json')
+
+    def search():
+        return SuccessiveHalvingSearch(build_candidates(random_state=0)['XGBoost'], SEARCH_SPACES['XGBoost'],
+                                       n_configs=4, max_resource=30, cv=3, seed=5,
+                                       checkpoint=checkpoint, verbose=False)
+
+    first = search().fit(X, y)
+    resumed = search().fit(X, y)
+    assert resumed.n_fits_ == 1
+    assert resumed.best_params_ == first.best_params_
+    assert resumed.best_score_ == first.best_score_
+
+
+def test_checkpoint_of_another_search_is_not_reused(tmp_path):
+    _, X, y = prepared()
+    checkpoint = str(tmp_path / 'search.json')
+
+    def search(**options):
+        options = {'cv': 3, 'seed': 5, **options}
+        return SuccessiveHalvingSearch(build_candidates(random_state=0)['XGBoost'], SEARCH_SPACES['XGBoost'],
+                                       n_configs=4, max_resource=30, checkpoint=checkpoint, verbose=False,
+                                       **options)
+
+    first = search().fit(X, y)
+    for changed in (search(cv=2), search(seed=6), search(resampler='class_weight'),
+                    search(fixed_params={'max_bin': 64})):
+        assert changed.fit(X, y).n_fits_ > 1
+        search().fit(X, y)
+    # The same shape with other rows is other data
+    assert search().fit(X[::-1], y[::-1]).n_fits_ == first.n_fits_
+
+
+def test_tpe_sampler_concentrates_on_good_region():
+    space = {'x': ('float', 0.0, 1.0, False)}
+    sampler = TPESampler(space, seed=0, n_startup=8)
+    for _ in range(40):
+        params = sampler.ask()
+        sampler.tell(params, -abs(params['x'] - 0.8), rung=0)
+
+    late = [sampler.ask()['x'] for _ in range(20)]
+    assert sum(abs(x - 0.8) < 0.2 for x in late) >= 15
@@ -0,0 +1,66 @@
+# Tests for the class-imbalance strategies
+import numpy as np
+import pytest
+from sklearn.neighbors import NearestNeighbors
+
+from hyperparameter_search import FoldCache
+from imbalance import STRATEGIES, ApproxSMOTE, get_strategy
+from student_dropout_predictor import StudentDropoutPredictor
+from test_predictor import make_frame
+
+
+def imbalanced(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 3))
+    y = (rng.random(n) < 0.1).astype(np.int64)
+    return X, y
+
+
+@pytest.mark.parametrize('name', list(STRATEGIES))
+def test_strategies_balance_the_classes(name):
+    X, y = imbalanced()
+    X_out, y_out, weights = get_strategy(name, seed=0).resample(X, y)
+    totals = np.bincount(y_out, weights=weights, minlength=2)
+    if name == 'none':
+        np.testing.assert_array_equal(X_out, X)
+        assert weights is None
+    else:
+        assert totals[0] == pytest.approx(totals[1])
+    # Original rows come first and are unchanged
+    np.testing.assert_array_equal(X_out[:len(X)], X)
+
+
+def test_approx_neighbours_are_close_to_exact_ones():
+    X, y = imbalanced(4000)
+    X_min = X[y == 1]
+    approx = ApproxSMOTE(window=16).neighbours(X_min, np.random.default_rng(0))
+    exact = NearestNeighbors(n_neighbors=6).fit(X_min).kneighbors(X_min, return_distance=False)[:, 1:]
+
+    def mean_distance(neighbours):
+        return np.linalg.norm(X_min[neighbours] - X_min[:, None, :], axis=2).mean()
+
+    assert (approx != np.arange(len(X_min))[:, None]).all()
+    assert mean_distance(approx) < 2.0 * mean_distance(exact)
+
+
+def test_unknown_strategy_is_rejected():
+    with pytest.raises(ValueError):
+        get_strategy('undersample')
+
+
+def test_fold_validation_rows_are_real():
+    X, y = imbalanced()
+    folds = FoldCache(X, y, cv=3, seed=0, resampler='approx_smote')
+    rows = {tuple(row) for row in X}
+    for index in range(3):
+        X_train, y_train, w_train, X_valid, y_valid, _ = folds.fold(index)
+        assert len(X_train) > len(X) * 2 / 3 and w_train is None
+        assert all(tuple(row) in rows for row in X_valid)
+
+
+def test_train_models_accepts_a_strategy():
+    predictor = StudentDropoutPredictor()
+    X, y = predictor.preprocess_data(make_frame(300))
+    results, _, _ = predictor.train_models(X, y, seed=3, cv=3, n_jobs=1, imbalance='approx_smote')
+    assert predictor.best_model is not None
+    assert all(0.5 < result['cv_mean'] <= 1.0 for result in results.values())
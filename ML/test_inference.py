@@ -0,0 +1,106 @@
+# Tests for the inference pool and micro-batcher
+import asyncio
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from inference import MicroBatcher, QueueFullError, create_executor, predict_in_worker
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def echo_predict(X):
+    """Fake model: the probability is the first feature"""
+    return X[:, 0] >= 0.5, X[:, 0].copy()
+
+
+def test_concurrent_requests_are_merged_into_one_batch():
+    batch_sizes = []
+
+    def predict(X):
+        batch_sizes.append(len(X))
+        return echo_predict(X)
+
+    async def scenario():
+        batcher = MicroBatcher(predict, max_batch_size=64, max_wait_ms=50)
+        batcher.start()
+        try:
+            rows = [np.array([[i / 10, 0.0]]) for i in range(10)]
+            return await asyncio.gather(*(batcher.submit(X) for X in rows)), batcher.stats.to_dict()
+        finally:
+            await batcher.stop()
+
+    results, stats = asyncio.run(scenario())
+
+    assert batch_sizes == [10]
+    assert [probabilities[0] for _, probabilities in results] == pytest.approx([i / 10 for i in range(10)])
+    assert stats['batches'] == 1 and stats['max_batch_size'] == 10
+
+
+def test_batches_respect_max_batch_size():
+    batch_sizes = []
+
+    def predict(X):
+        batch_sizes.append(len(X))
+        return echo_predict(X)
+
+    async def scenario():
+        batcher = MicroBatcher(predict, max_batch_size=4, max_wait_ms=20)
+        batcher.start()
+        try:
+            await asyncio.gather(*(batcher.submit(np.zeros((1, 2))) for _ in range(10)))
+        finally:
+            await batcher.stop()
+
+    asyncio.run(scenario())
+    assert sum(batch_sizes) == 10
+    assert max(batch_sizes) <= 4
+
+
+def test_full_queue_is_rejected():
+    release = threading.Event()
+
+    def blocking_predict(X):
+        release.wait(5)
+        return echo_predict(X)
+
+    async def scenario():
+        batcher = MicroBatcher(blocking_predict, max_batch_size=1, max_wait_ms=0,
+                               max_queue_depth=2, max_in_flight=1)
+        batcher.start()
+        try:
+            # The first request occupies the only in-flight slot
+            first = asyncio.ensure_future(batcher.submit(np.zeros((1, 2))))
+            await asyncio.sleep(0.05)
+            queued = [asyncio.ensure_future(batcher.submit(np.zeros((1, 2)))) for _ in range(2)]
+            await asyncio.sleep(0)
+
+            with pytest.raises(QueueFullError):
+                await batcher.submit(np.zeros((1, 2)))
+
+            release.set()
+            await asyncio.gather(first, *queued)
+            return batcher.stats.to_dict()
+        finally:
+            release.set()
+            await batcher.stop()
+
+    stats = asyncio.run(scenario())
+    assert stats['rejected'] == 1
+    assert stats['rows'] == 3
+
+
+def test_process_pool_workers_load_their_own_model():
+    from student_dropout_predictor import StudentDropoutPredictor
+
+    model_path = os.path.join(ML_DIR, 'student_dropout_model.pkl')
+    predictor = StudentDropoutPredictor()
+    predictor.load_model(model_path)
+    X = predictor.transform.assemble([{'avg_assignment_grade': 55.0, 'attendance_trend': -0.4, 'avg_attendance': 62.0}])
+
+    with create_executor('process', 1, model_path) as executor:
+        _, probabilities = executor.submit(predict_in_worker, X).result(timeout=60)
+
+    np.testing.assert_allclose(probabilities, predictor.generate_predictions(X)[1])
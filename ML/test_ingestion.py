@@ -0,0 +1,66 @@
+# Tests for chunked training data ingestion
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from feature_transform import FeatureTransform
+from ingestion import StreamingStats, fit_transform_streaming, iter_batches
+from student_dropout_predictor import StudentDropoutPredictor
+from synthetic_data import generate_synthetic_data
+
+FEATURES = ['avg_assignment_score', 'attendance_trend', 'avg_attendance']
+
+
+@pytest.fixture
+def cohort_csv(tmp_path):
+    df = generate_synthetic_data(3000, seed=1)
+    df.loc[::7, 'avg_attendance'] = np.nan
+    path = str(tmp_path / 'cohort.csv')
+    df.to_csv(path, index=False)
+    return path, df
+
+
+def test_batches_are_pruned_and_compact(cohort_csv):
+    path, _ = cohort_csv
+    batches = list(iter_batches(path, chunk_size=1000))
+    assert [len(df) for df in batches] == [1000, 1000, 1000]
+    assert list(batches[0].columns) == FEATURES + ['dropped_out']
+    assert (batches[0][FEATURES].dtypes == np.float32).all()
+    assert batches[0]['dropped_out'].dtype == np.int8
+
+    with_ids = next(iter_batches(path, chunk_size=1000, include_ids=True))
+    assert with_ids['student_id'].dtype == 'category'
+
+
+def test_streaming_transform_matches_in_memory_fit(cohort_csv):
+    path, df = cohort_csv
+    transform, n_rows, positives = fit_transform_streaming(path, chunk_size=512)
+    expected = FeatureTransform.fit(df[FEATURES].astype(np.float32))
+
+    assert n_rows == 3000 and positives == df['dropped_out'].sum()
+    np.testing.assert_allclose(transform.medians, expected.medians, rtol=1e-6)
+    np.testing.assert_allclose(transform.mean, expected.mean, rtol=1e-6)
+    np.testing.assert_allclose(transform.scale, expected.scale, rtol=1e-6)
+
+
+def test_reservoir_median_is_close_beyond_capacity():
+    values = np.random.default_rng(0).normal(10, 2, size=(50_000, 1))
+    stats = StreamingStats(['x'], reservoir_size=5000)
+    for i in range(0, len(values), 4096):
+        stats.update(values[i:i + 4096])
+    assert abs(stats.medians()[0] - np.median(values)) < 0.1
+    assert stats.count[0] == 50_000
+
+
+def test_train_streaming_fits_partial_fit_estimator(cohort_csv):
+    path, df = cohort_csv
+    predictor = StudentDropoutPredictor()
+    model, auc_score = predictor.train_streaming(path, chunk_size=500, epochs=2, seed=0)
+
+    assert predictor.best_model is model
+    assert 0.0 <= auc_score <= 1.0
+    predictions, probabilities = predictor.generate_predictions(df[FEATURES].head(10))
+    assert probabilities.shape == (10,)
+
+    with pytest.raises(TypeError):
+        predictor.train_streaming(path, estimator=RandomForestClassifier())
@@ -0,0 +1,69 @@
+# Tests for stage histograms and the Prometheus exposition format
+import threading
+
+import pytest
+
+import instrumentation
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    instrumentation.reset()
+    yield
+    instrumentation.reset()
+
+
+def samples(text):
+    """{series: value} of the non-comment exposition lines"""
+    return {line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+            for line in text.splitlines() if line and not line.startswith("#")}
+
+
+def test_record_chains_stages_into_cumulative_buckets():
+    start = instrumentation.clock()
+    next_start = instrumentation.record('scaling', start)
+    assert next_start >= start
+    instrumentation.record('inference', next_start - 0.003)
+    instrumentation.record('inference', next_start - 20.0)
+
+    lines = samples(instrumentation.exposition())
+    assert lines['ml_stage_duration_seconds_count{stage="scaling"}'] == 1
+    assert lines['ml_stage_duration_seconds_bucket{stage="inference",le="0.0025"}'] == 0
+    assert lines['ml_stage_duration_seconds_bucket{stage="inference",le="0.005"}'] == 1
+    assert lines['ml_stage_duration_seconds_bucket{stage="inference",le="10.0"}'] == 1
+    assert lines['ml_stage_duration_seconds_bucket{stage="inference",le="+Inf"}'] == 2
+    assert lines['ml_stage_duration_seconds_sum{stage="inference"}'] == pytest.approx(20.003, abs=1e-3)
+
+
+def test_threads_record_into_their_own_shards():
+    def work():
+        for _ in range(1000):
+            instrumentation.record('inference', instrumentation.clock())
+            instrumentation.record_batch(3)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert instrumentation.STAGE_SECONDS.labels('inference').count == 4000
+    lines = samples(instrumentation.exposition())
+    assert lines['ml_inference_batch_rows_bucket{le="2.0"}'] == 0
+    assert lines['ml_inference_batch_rows_bucket{le="4.0"}'] == 4000
+    assert lines['ml_inference_batch_rows_sum'] == 12000
+
+
+def test_metric_family_labels_are_escaped():
+    text = instrumentation.exposition(
+        instrumentation.metric_family("ml_model_info", "gauge", "Model.", [({"version": 'v"1'}, 1)]))
+    assert "# TYPE ml_model_info gauge" in text
+    assert 'ml_model_info{version="v\\"1"} 1' in text
+
+
+def test_disabled_metrics_record_nothing(monkeypatch):
+    monkeypatch.setattr(instrumentation, 'ENABLED', False)
+    assert instrumentation.record('scaling', instrumentation.clock()) == 0.0
+    instrumentation.record_batch(10)
+    assert instrumentation.STAGE_SECONDS.labels('scaling').count == 0
+    assert instrumentation.BATCH_ROWS.labels().count == 0
@@ -0,0 +1,67 @@
+# Tests for the memory-mapped model artifact
+import numpy as np
+import pytest
+
+from model_artifact import ArtifactError, is_artifact, load_artifact, read_manifest
+from model_registry import ModelRegistry
+from student_dropout_predictor import StudentDropoutPredictor
+from test_tree_ensemble import fitted  # noqa: F401  (fixture)
+
+
+@pytest.fixture
+def artifact(fitted, tmp_path):
+    predictor, models, df = fitted
+    predictor.best_model = models['LightGBM']
+    predictor.compiled_model = None
+    predictor.set_decision_threshold(0.45)
+    path = str(tmp_path / 'model.mmap')
+    predictor.save_artifact(path)
+    return predictor, df, path
+
+
+def test_artifact_round_trip_matches_library(artifact):
+    predictor, df, path = artifact
+    expected = predictor.best_model.predict_proba(
+        predictor.transform.transform(predictor.transform.assemble_frame(df)))[:, 1]
+
+    loaded = StudentDropoutPredictor()
+    loaded.load_model(path)
+    assert loaded.best_model is None
+    assert loaded.decision_threshold == 0.45
+    assert loaded.feature_names == predictor.feature_names
+    predictions, probabilities = loaded.generate_predictions(df[predictor.feature_names])
+    np.testing.assert_allclose(probabilities, expected, atol=1e-12)
+    np.testing.assert_array_equal(predictions, probabilities > 0.45)
+
+
+def test_arrays_are_read_only_aligned_views(artifact):
+    _, _, path = artifact
+    assert is_artifact(path)
+    ensemble, transform, _, manifest = load_artifact(path)
+    for array in (ensemble.threshold, ensemble.children, transform.mean):
+        assert not array.flags.writeable
+        assert isinstance(array.base, np.memmap) or isinstance(array.base.base, np.memmap)
+    _, data_offset = read_manifest(path)
+    assert data_offset % 64 == 0
+    assert all(spec['offset'] % 64 == 0 for spec in manifest['arrays'].values())
+
+
+def test_corruption_is_detected(artifact):
+    _, _, path = artifact
+    with open(path, 'r+b') as f:
+        f.seek(-8, 2)
+        f.write(b'\xff' * 8)
+    with pytest.raises(ArtifactError):
+        load_artifact(path)
+
+
+def test_registry_serves_artifacts(artifact, tmp_path):
+    predictor, _, path = artifact
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    version = registry.publish(path)
+    assert registry.model_path(version).endswith('model.mmap')
+
+    first, second = StudentDropoutPredictor(), StudentDropoutPredictor()
+    first.load_model(registry.model_path(version))
+    second.load_model(path)
+    assert first.model_fingerprint() == second.model_fingerprint()
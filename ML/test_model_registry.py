@@ -0,0 +1,68 @@
+# Tests for the versioned model registry and model switching
+import asyncio
+import os
+
+import pytest
+
+import main
+from model_registry import ModelManager, ModelNotFoundError, ModelRegistry
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_FILE = os.path.join(ML_DIR, 'student_dropout_model.pkl')
+
+
+def test_publish_numbers_versions_and_tracks_history(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    assert registry.current() is None
+
+    first = registry.publish(MODEL_FILE, {'auc_score': 0.8}, set_current=True)
+    second = registry.publish(MODEL_FILE, set_current=True)
+    assert (first, second) == ('v0001', 'v0002')
+    assert registry.versions() == ['v0001', 'v0002']
+    assert registry.metadata(first)['auc_score'] == 0.8
+    assert registry.current() == second
+
+    assert registry.rollback() == first
+    assert registry.current() == first
+    with pytest.raises(ModelNotFoundError):
+        registry.rollback()
+    with pytest.raises(ModelNotFoundError):
+        registry.model_path('../v0001')
+
+
+def test_unfinished_publish_is_not_a_version(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    registry.publish(MODEL_FILE)
+    # A publish that crashed after writing its metadata
+    stale = tmp_path / 'versions' / '.publish-crashed'
+    stale.mkdir()
+    (stale / 'meta.json').write_text('{"version": "v0002"}')
+
+    assert registry.versions() == ['v0001']
+    with pytest.raises(ModelNotFoundError):
+        registry.set_current('.publish-crashed')
+    assert registry.publish(MODEL_FILE) == 'v0002'
+
+
+def test_failed_load_keeps_serving_the_old_version(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    good = registry.publish(MODEL_FILE, set_current=True)
+    broken_file = tmp_path / 'broken.pkl'
+    broken_file.write_bytes(b'not a model')
+    broken = registry.publish(str(broken_file))
+
+    async def scenario():
+        manager = ModelManager(registry, main.build_serving_model)
+        await manager.start()
+        try:
+            assert manager.active.version == good
+            with pytest.raises(Exception):
+                await manager.activate(broken)
+            assert manager.active.version == good
+            assert manager.state == 'ready'
+            assert registry.current() == good
+            assert broken in manager.status()['last_error']
+        finally:
+            await manager.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,94 @@
+# Tests for the prediction result cache
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from prediction_cache import ExplanationCache, PredictionCache, SQLiteBackend
+
+
+def lookup(cache, X, version='v1'):
+    keys, found, predictions, probabilities = cache.get_many(X, version)
+    if not found.all():
+        missing = ~found
+        cache.put_many([k for k, hit in zip(keys, found) if not hit],
+                       X[missing, 0] > 50, X[missing, 0] / 100)
+    return found
+
+
+def test_hits_after_first_lookup():
+    cache = PredictionCache(max_size=10)
+    X = np.array([[60.0, 0.1, 80.0], [40.0, -0.5, 70.0]])
+    assert not lookup(cache, X).any()
+
+    keys, found, predictions, probabilities = cache.get_many(X[::-1], 'v1')
+    assert found.all()
+    np.testing.assert_array_equal(predictions, [False, True])
+    np.testing.assert_allclose(probabilities, [0.4, 0.6])
+    assert cache.stats.to_dict()['hits'] == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache(max_size=2)
+    rows = np.arange(9, dtype=float).reshape(3, 3)
+    lookup(cache, rows[:2])
+    lookup(cache, rows[:1])
+    lookup(cache, rows[2:])
+
+    assert len(cache) == 2
+    assert cache.stats.evictions == 1
+    assert lookup(cache, rows[:1]).all()
+    assert not lookup(cache, rows[1:2]).any()
+
+
+def test_entries_expire_after_ttl():
+    cache = PredictionCache(ttl=0.0)
+    X = np.ones((1, 3))
+    lookup(cache, X)
+    assert not lookup(cache, X).any()
+    assert cache.stats.expirations == 1
+
+
+def test_models_keep_separate_entries_during_a_swap():
+    cache = PredictionCache()
+    X = np.arange(6.0).reshape(2, 3)
+    lookup(cache, X, 'v1')
+    assert not lookup(cache, X, 'v2').any()
+    # Requests on the old and new model interleave without evicting each other
+    assert lookup(cache, X, 'v1').all() and lookup(cache, X, 'v2').all()
+    assert len(cache) == 4
+
+
+def test_shared_backend_serves_other_workers(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    X = np.array([[55.0, 0.0, 90.0]])
+    lookup(PredictionCache(backend=SQLiteBackend(path, ttl=60)), X)
+
+    other_worker = PredictionCache(backend=SQLiteBackend(path, ttl=60))
+    keys, found, predictions, probabilities = other_worker.get_many(X, 'v1')
+    assert found.all() and predictions[0] and probabilities[0] == 0.55
+    assert other_worker.stats.shared_hits == 1
+
+
+def test_stats_count_every_lookup_across_threads():
+    cache = PredictionCache()
+    X = np.ones((4, 3))
+    lookup(cache, X)
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda _: cache.get_many(X, 'v1'), range(2000)))
+    stats = cache.stats.to_dict()
+    assert (stats['hits'], stats['misses']) == (4 * 2000, 4)
+
+
+def test_explanation_cache_keeps_contributions():
+    cache = ExplanationCache(max_size=10)
+    X = np.array([[60.0, 0.1, 80.0], [40.0, -0.5, 70.0]])
+    keys, found, probabilities, contributions = cache.get_many(X, 'v1', 3)
+    assert not found.any() and contributions.shape == (2, 3)
+    cache.put_many(keys, np.array([0.2, 0.7]), X / 100)
+
+    keys, found, probabilities, contributions = cache.get_many(X[::-1], 'v1', 3)
+    assert found.all()
+    np.testing.assert_allclose(probabilities, [0.7, 0.2])
+    np.testing.assert_allclose(contributions, X[::-1] / 100)
+    assert not cache.get_many(X, 'v2', 3)[1].any()
+    assert (cache.stats.hits, cache.stats.misses) == (2, 4)
@@ -0,0 +1,114 @@
+# Tests for the training/serving pipeline of StudentDropoutPredictor
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+from feature_transform import FeatureTransform
+from student_dropout_predictor import StudentDropoutPredictor
+
+
+def make_frame(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'student_id': [f"STU_{i:04d}" for i in range(n)],
+        'avg_assignment_score': rng.uniform(0, 100, n),
+        'attendance_trend': rng.uniform(-1, 1, n),
+        'avg_attendance': rng.uniform(50, 100, n),
+    })
+    df['dropped_out'] = (df['avg_assignment_score'] + rng.normal(0, 10, n) < 50).astype(int)
+    return df
+
+
+def test_transform_matches_standard_scaler():
+    df = make_frame()
+    X = df[['avg_assignment_score', 'attendance_trend', 'avg_attendance']]
+    transform = FeatureTransform.fit(X)
+
+    expected = StandardScaler().fit_transform(X)
+    actual = transform.transform(transform.assemble_frame(X))
+    np.testing.assert_allclose(actual, expected, atol=1e-12)
+
+
+def test_transform_fills_missing_with_training_medians():
+    df = make_frame()
+    X = df[['avg_assignment_score', 'attendance_trend', 'avg_attendance']]
+    transform = FeatureTransform.fit(X)
+
+    # Aliased request field, one missing feature and one explicit None
+    records = [{'avg_assignment_grade': 70.0, 'avg_attendance': None}]
+    assembled = transform.assemble(records)
+    np.testing.assert_allclose(assembled[0], [70.0, X['attendance_trend'].median(), X['avg_attendance'].median()])
+
+
+def test_prediction_does_not_refit_transform():
+    df = make_frame()
+    predictor = StudentDropoutPredictor()
+    X, y = predictor.preprocess_data(df)
+    predictor.best_model = LogisticRegression().fit(X, y)
+    mean = predictor.transform.mean.copy()
+
+    _, from_frame = predictor.generate_predictions(df.head(1))
+    _, from_records = predictor.predict_records(df.head(1).to_dict('records'))
+
+    np.testing.assert_array_equal(predictor.transform.mean, mean)
+    np.testing.assert_allclose(from_frame, from_records)
+    # A single row scored alone gets the same probability as inside the batch
+    _, batch = predictor.generate_predictions(df)
+    assert from_frame[0] == pytest.approx(batch[0])
+
+
+def test_save_and_load_round_trip(tmp_path):
+    df = make_frame()
+    predictor = StudentDropoutPredictor()
+    X, y = predictor.preprocess_data(df)
+    predictor.best_model = LogisticRegression().fit(X, y)
+    path = tmp_path / 'model.pkl'
+    predictor.save_model(path)
+
+    loaded = StudentDropoutPredictor()
+    loaded.load_model(path)
+    np.testing.assert_allclose(loaded.generate_predictions(df)[1], predictor.generate_predictions(df)[1])
+
+
+def test_labels_come_from_decision_threshold(tmp_path):
+    from sklearn.ensemble import RandomForestClassifier
+
+    df = make_frame()
+    predictor = StudentDropoutPredictor()
+    X, y = predictor.preprocess_data(df)
+    predictor.best_model = RandomForestClassifier(n_estimators=20, random_state=0).fit(X, y)
+
+    # The default threshold reproduces the estimator's own predict()
+    predictions, probabilities = predictor.generate_predictions(df)
+    np.testing.assert_array_equal(predictions, predictor.best_model.predict(X.to_numpy()) == 1)
+
+    predictor.set_decision_threshold(0.35)
+    predictions, _ = predictor.generate_predictions(df)
+    np.testing.assert_array_equal(predictions, probabilities > 0.35)
+
+    with pytest.raises(ValueError):
+        predictor.set_decision_threshold(0.9)
+
+    path = tmp_path / 'model.pkl'
+    predictor.save_model(path)
+    loaded = StudentDropoutPredictor()
+    loaded.load_model(path)
+    assert loaded.decision_threshold == 0.35
+
+
+def test_fingerprint_identifies_loaded_model(tmp_path):
+    predictor = StudentDropoutPredictor()
+    X, y = predictor.preprocess_data(make_frame())
+    predictor.best_model = LogisticRegression().fit(X, y)
+    path = tmp_path / 'model.pkl'
+    predictor.save_model(path)
+
+    first, second = StudentDropoutPredictor(), StudentDropoutPredictor()
+    first.load_model(path)
+    second.load_model(path)
+    assert first.model_fingerprint() == second.model_fingerprint()
+
+    second.set_decision_threshold(0.4)
+    assert first.model_fingerprint() != second.model_fingerprint()
@@ -0,0 +1,70 @@
+# Tests for incremental warm-start retraining
+import numpy as np
+import pytest
+
+import retrain
+from model_registry import ModelRegistry
+from model_training import build_candidates, warm_start_fit
+from student_dropout_predictor import StudentDropoutPredictor
+from test_predictor import make_frame
+
+FEATURES = ['avg_assignment_score', 'attendance_trend', 'avg_attendance']
+
+
+def trained(model_name='Random Forest', n=400):
+    predictor = StudentDropoutPredictor()
+    X, y = predictor.preprocess_data(make_frame(n))
+    predictor.best_model = build_candidates(random_state=0)[model_name].fit(X.to_numpy(), y)
+    return predictor, X.to_numpy(), y
+
+
+@pytest.mark.parametrize('model_name', ['Random Forest', 'Gradient Boosting', 'XGBoost', 'LightGBM'])
+def test_warm_start_extends_a_copy(model_name):
+    predictor, X, y = trained(model_name)
+    model = predictor.best_model
+    before = model.predict_proba(X)[:, 1]
+
+    extended = warm_start_fit(model, X[:100], y[:100], n_estimators=5)
+    np.testing.assert_array_equal(model.predict_proba(X)[:, 1], before)
+    assert not np.array_equal(extended.predict_proba(X)[:, 1], before)
+    if hasattr(extended, 'estimators_'):
+        assert len(extended.estimators_) == len(model.estimators_) + 5
+
+
+def test_promotion_depends_on_validation_auc(tmp_path):
+    predictor, _, _ = trained()
+    model = predictor.best_model
+    rows = predictor.transform_stats.count.copy()
+    delta = make_frame(300, seed=1)
+    train, valid = delta.iloc[:200], delta.iloc[200:]
+
+    # No candidate can gain a full point of AUC
+    report = predictor.retrain_incremental(train[FEATURES], train['dropped_out'], valid[FEATURES],
+                                           valid['dropped_out'], tolerance=-1.0)
+    assert not report['promoted'] and predictor.best_model is model
+    np.testing.assert_array_equal(predictor.transform_stats.count, rows)
+
+    report = predictor.retrain_incremental(train[FEATURES], train['dropped_out'], valid[FEATURES],
+                                           valid['dropped_out'], tolerance=1.0)
+    assert report['promoted'] and predictor.best_model is not model
+    np.testing.assert_array_equal(predictor.transform_stats.count, rows + 200)
+    assert set(report['drift']) == set(FEATURES)
+
+    path = str(tmp_path / 'model.pkl')
+    predictor.save_model(path)
+    loaded = StudentDropoutPredictor()
+    loaded.load_model(path)
+    np.testing.assert_array_equal(loaded.transform_stats.mean, predictor.transform_stats.mean)
+
+
+def test_retrain_publishes_to_registry(tmp_path):
+    predictor, _, _ = trained()
+    predictor.save_model(str(tmp_path / 'base.pkl'))
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    base = registry.publish(str(tmp_path / 'base.pkl'), set_current=True)
+    make_frame(300, seed=2).to_csv(tmp_path / 'delta.csv', index=False)
+
+    report = retrain.retrain(str(tmp_path / 'delta.csv'), registry_dir=registry.root, tolerance=1.0)
+    assert report['rows'] == 240 and report['base_version'] == base
+    assert registry.current() == report['version'] != base
+    assert registry.metadata(report['version'])['retrained_from'] == base
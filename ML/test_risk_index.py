@@ -0,0 +1,112 @@
+# Tests for the materialized risk table
+import numpy as np
+import pytest
+
+import risk_index
+from risk_index import RiskTable, encode_ids, refresh
+from model_training import build_candidates
+from student_dropout_predictor import StudentDropoutPredictor
+from test_predictor import make_frame
+
+
+def make_table(n=5000, seed=0, n_courses=7):
+    rng = np.random.default_rng(seed)
+    ids = encode_ids([f"STU_{i:05d}" for i in range(n)])
+    probabilities = rng.random(n)
+    courses = rng.integers(-1, n_courses, n)
+    table = RiskTable.build(ids, probabilities, np.zeros(n, dtype=np.uint64), 'model', courses,
+                            [f"C{i}" for i in range(n_courses)])
+    return table, probabilities, courses
+
+
+def test_scalar_and_vector_id_hashes_agree():
+    ids = encode_ids(['a', 'STU_00001', 'ünïcode', ''])
+    assert risk_index.hash_ids(ids).tolist() == [risk_index.hash_id(key) for key in ids.tolist()]
+
+
+def test_lookups_find_every_student():
+    table, probabilities, _ = make_table()
+    assert table.lookup('STU_00042') == 42
+    assert table.lookup('STU_99999') == -1
+    np.testing.assert_array_equal(table.lookup_many(encode_ids(['STU_04999', 'nope', 'STU_00000'])), [4999, -1, 0])
+    np.testing.assert_array_equal(table.lookup_many(table.ids), np.arange(len(table)))
+
+    record = table.get('STU_00042')
+    assert record['dropout_probability'] == probabilities[42]
+    assert record['percentile'] == pytest.approx(100 * np.mean(probabilities <= probabilities[42]))
+
+
+def test_queries_match_full_sorts():
+    table, probabilities, courses = make_table()
+    top = table.top_k(10)
+    assert [r['student_id'] for r in top] == [f"STU_{i:05d}" for i in np.argsort(-probabilities)[:10]]
+
+    in_course = np.flatnonzero(courses == 3)
+    top = table.top_k(len(in_course) + 5, course='C3')
+    assert [r['student_id'] for r in top] == [f"STU_{i:05d}" for i in in_course[np.argsort(-probabilities[in_course])]]
+
+    high = np.flatnonzero(probabilities >= 0.7)
+    total, page = table.in_band('HIGH', limit=5, offset=3)
+    assert total == len(high)
+    assert [r['dropout_probability'] for r in page] == sorted(probabilities[high], reverse=True)[3:8]
+
+    values = table.percentiles([0, 50, 99.5], course='C3')
+    np.testing.assert_allclose(list(values.values()), np.percentile(probabilities[in_course], [0, 50, 99.5]))
+    with pytest.raises(KeyError):
+        table.rows('C99')
+
+
+def test_save_and_reopen_memory_mapped(tmp_path):
+    table, _, _ = make_table(n=100)
+    root = str(tmp_path / 'index')
+    assert RiskTable.open(root) is None
+    for _ in range(3):
+        generation = table.save(root)
+    assert sorted(p.name for p in (tmp_path / 'index').iterdir()) == ['CURRENT', 'g000002', 'g000003']
+
+    reader = risk_index.RiskIndexReader(root, check_interval=0)
+    reopened = reader.table()
+    assert reader._generation == generation
+    assert reopened.get('STU_00007') == table.get('STU_00007')
+    assert reopened.top_k(3) == table.top_k(3)
+
+
+def test_refresh_rescores_only_changed_students():
+    predictor = StudentDropoutPredictor()
+    X, y = predictor.preprocess_data(make_frame(300))
+    predictor.best_model = build_candidates(random_state=0)['Random Forest'].fit(X.to_numpy(), y)
+    frame = make_frame(50, seed=1)
+    X_raw = predictor.transform.assemble_frame(frame)
+    ids = frame['student_id'].tolist()
+
+    table, stats = refresh(predictor, ids, X_raw, courses=['A', 'B'] * 25)
+    assert stats == {'students': 50, 'rescored': 50, 'reused': 0}
+    np.testing.assert_array_equal(table.probability, predictor.generate_predictions(X_raw)[1])
+    assert table.get(ids[1])['course'] == 'B'
+
+    X_changed = X_raw.copy()
+    X_changed[:5, 0] += 1
+    table, stats = refresh(predictor, ids + ['NEW'], np.vstack([X_changed, X_raw[:1]]), previous=table)
+    assert stats == {'students': 51, 'rescored': 6, 'reused': 45}
+    np.testing.assert_array_equal(table.probability[:50], predictor.generate_predictions(X_changed)[1])
+
+    # A different model rescores everyone
+    predictor.decision_threshold = 0.4
+    _, stats = refresh(predictor, ids, X_raw, previous=table)
+    assert stats['rescored'] == 50
+
+
+def test_read_roster_skips_text_columns(tmp_path):
+    predictor = StudentDropoutPredictor()
+    predictor.preprocess_data(make_frame(300))
+    frame = make_frame(20, seed=2)
+    frame['name'] = [f"Student {i}" for i in range(20)]
+    frame['email'] = [f"s{i}@example.edu" for i in range(20)]
+    frame['course'] = ['A', 'B'] * 10
+    path = str(tmp_path / "roster.csv")
+    frame.to_csv(path, index=False)
+
+    ids, X_raw, courses = risk_index.read_roster(path, predictor.transform)
+    assert ids == frame['student_id'].astype(str).tolist()
+    assert list(courses) == ['A', 'B'] * 10
+    np.testing.assert_allclose(X_raw, predictor.transform.assemble_frame(frame), rtol=1e-12)
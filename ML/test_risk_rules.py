@@ -0,0 +1,101 @@
+# Tests for the vectorized risk banding and recommendation rules
+import numpy as np
+
+from risk_rules import RiskEngine
+from student_dropout_predictor import MEDIUM_RISK_THRESHOLD, HIGH_RISK_THRESHOLD
+
+
+def reference_recommendations(probability, student):
+    """The original per-student if/elif rules"""
+    if probability >= HIGH_RISK_THRESHOLD:
+        recommendations = ["Immediate intervention required", "Schedule emergency counseling session",
+                           "Implement daily attendance monitoring", "Provide intensive academic support"]
+        if student.get('avg_attendance', 100) < 70:
+            recommendations.append("Critical attendance issue - contact family")
+        if student.get('avg_assignment_grade', 100) < 60:
+            recommendations.append("Severe academic performance concern - consider tutoring")
+        return "HIGH", recommendations
+    if probability >= MEDIUM_RISK_THRESHOLD:
+        recommendations = ["Enhanced monitoring recommended", "Weekly check-ins with advisor",
+                           "Additional tutoring support", "Monitor for declining trends"]
+        if student.get('avg_attendance', 100) < 80:
+            recommendations.append("Improve attendance tracking")
+        return "MEDIUM", recommendations
+    return "LOW", ["Continue regular monitoring", "Maintain current support level",
+                   "Consider as peer mentor candidate"]
+
+
+def test_engine_matches_reference_rules():
+    rng = np.random.default_rng(0)
+    n = 5000
+    probabilities = rng.random(n)
+    # Include the exact band boundaries
+    probabilities[:2] = [MEDIUM_RISK_THRESHOLD, HIGH_RISK_THRESHOLD]
+    attendance = rng.uniform(30, 100, n)
+    grades = rng.uniform(20, 100, n)
+
+    engine = RiskEngine()
+    assessment = engine.assess(probabilities, {'avg_attendance': attendance, 'avg_assignment_grade': grades})
+
+    for i in range(n):
+        band, recommendations = reference_recommendations(
+            probabilities[i], {'avg_attendance': attendance[i], 'avg_assignment_grade': grades[i]})
+        assert assessment.band_names[i] == band
+        assert assessment.recommendations[i] == recommendations
+
+    expected_counts = {band: int(np.sum(assessment.band_names == band)) for band in ('LOW', 'MEDIUM', 'HIGH')}
+    assert assessment.counts == expected_counts
+    assert assessment.summary() == {'total_students': n, 'high_risk': expected_counts['HIGH'],
+                                    'medium_risk': expected_counts['MEDIUM'], 'low_risk': expected_counts['LOW']}
+
+
+def test_students_with_the_same_rules_share_one_list():
+    engine = RiskEngine()
+    assessment = engine.assess([0.9, 0.95, 0.1], {'avg_attendance': [50.0, 55.0, 50.0]})
+    assert assessment.recommendations[0] is assessment.recommendations[1]
+    assert "Critical attendance issue - contact family" in assessment.recommendations[0]
+
+
+def test_missing_features_never_trigger_conditions():
+    engine = RiskEngine()
+    assessment = engine.assess([0.9, 0.9], {'avg_attendance': [np.nan, 10.0]})
+    assert assessment.recommendations[0] == reference_recommendations(0.9, {})[1]
+    assert len(assessment.recommendations[1]) == 5
+
+
+def test_custom_rule_table():
+    engine = RiskEngine(bands=[('OK', 0.0), ('WATCH', 0.5)],
+                        rules=[('WATCH', ('late_submissions', '>=', 3), ["Discuss deadlines"])])
+    assessment = engine.assess([0.6, 0.6, 0.2], {'late_submissions': [3, 1, 5]})
+    assert assessment.band_names.tolist() == ['WATCH', 'WATCH', 'OK']
+    assert assessment.recommendations == [["Discuss deadlines"], [], []]
+
+
+def test_risk_drivers_are_the_largest_positive_contributions():
+    engine = RiskEngine()
+    names = ['avg_assignment_score', 'attendance_trend', 'avg_attendance']
+    contributions = np.array([[0.05, -0.1, 0.2], [0.04, 0.0, 0.3], [-0.1, -0.2, -0.05], [0.0, 0.3, -0.4]])
+    drivers, recommendations = engine.explain(contributions, names, engine.band_codes([0.8, 0.9, 0.5, 0.4]))
+
+    assert drivers == [['avg_attendance', 'avg_assignment_score'], ['avg_attendance', 'avg_assignment_score'],
+                       [], ['attendance_trend']]
+    assert drivers[0] is drivers[1] and recommendations[0] is recommendations[1]
+    # Model features match their aliased request field
+    assert recommendations[0][1] == engine.driver_recommendation('avg_assignment_grade')
+    assert recommendations[3] == ["Attendance is declining - follow up on recent absences"]
+    assert engine.explain(contributions, names, engine.band_codes([0.8] * 4), limit=1)[0][0] == ['avg_attendance']
+
+
+def test_low_risk_and_tiny_contributions_name_no_drivers():
+    engine = RiskEngine()
+    names = ['avg_assignment_score', 'attendance_trend', 'avg_attendance']
+    # A LOW student with small positive contributions, and MEDIUM ones below the minimum
+    contributions = np.array([[0.0023, 0.001, 0.03], [0.01, 0.005, 0.0], [0.05, 0.0, 0.0]])
+    codes = engine.band_codes([0.08, 0.5, 0.5])
+    drivers, recommendations = engine.explain(contributions, names, codes)
+    assert drivers == [[], [], ['avg_assignment_score']]
+    assert recommendations[0] == [] and recommendations[1] == []
+
+    # Log-odds contributions need a larger minimum
+    drivers, _ = engine.explain(contributions, names, codes, output='log_odds')
+    assert drivers == [[], [], []]
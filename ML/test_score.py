@@ -0,0 +1,74 @@
+# Tests for the offline batch scoring CLI
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import score
+from risk_rules import DEFAULT_ENGINE
+from synthetic_data import write_synthetic_data
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(ML_DIR, 'student_dropout_model.pkl')
+
+
+@pytest.fixture(scope="module")
+def shards(tmp_path_factory):
+    shard_dir = tmp_path_factory.mktemp("shards")
+    for i, n in enumerate([2500, 1200]):
+        write_synthetic_data(str(shard_dir / f"part-{i}.csv"), n, seed=i)
+    return str(shard_dir)
+
+
+def test_scores_match_predictor_and_rules(shards, tmp_path):
+    summary = score.score(shards, str(tmp_path), MODEL_PATH, workers=1, chunk_size=1000, verbose=False)
+    assert summary['rows'] == 3700
+
+    source = pd.read_csv(os.path.join(shards, 'part-0.csv'))
+    scored = pd.read_csv(tmp_path / 'part-0.scored.csv', keep_default_na=False)
+    assert list(scored.columns) == score.OUTPUT_COLUMNS
+    assert list(scored['student_id']) == list(source['student_id'])
+
+    predictor = score.load_predictor(MODEL_PATH)
+    predictions, probabilities = predictor.generate_predictions(source)
+    np.testing.assert_allclose(scored['dropout_probability'], probabilities)
+    assert list(scored['predicted_dropout']) == list(predictions)
+
+    assessment = DEFAULT_ENGINE.assess(probabilities, {
+        'avg_attendance': source['avg_attendance'].to_numpy(),
+        'avg_assignment_grade': source['avg_assignment_score'].to_numpy(),
+    })
+    assert list(scored['risk_level']) == list(assessment.band_names)
+
+    with open(tmp_path / 'recommendations.json') as f:
+        texts = json.load(f)
+    for ids, expected in zip(scored['recommendation_ids'][:200], assessment.recommendations[:200]):
+        assert [texts[i] for i in ids.split(';')] == expected
+
+
+def test_pool_output_is_identical_and_runs_resume(shards, tmp_path):
+    serial, pooled = tmp_path / 'serial', tmp_path / 'pooled'
+    score.score(shards, str(serial), MODEL_PATH, workers=1, chunk_size=700, verbose=False)
+    score.score(shards, str(pooled), MODEL_PATH, workers=2, chunk_size=700, verbose=False)
+    for name in ['part-0.scored.csv', 'part-1.scored.csv']:
+        assert (serial / name).read_bytes() == (pooled / name).read_bytes()
+
+    # A finished shard is skipped; a missing one is scored again
+    os.remove(pooled / 'part-1.scored.csv')
+    summary = score.score(shards, str(pooled), MODEL_PATH, workers=1, verbose=False)
+    assert (summary['shards'], summary['skipped'], summary['rows']) == (1, 1, 1200)
+    assert (serial / 'part-1.scored.csv').read_bytes() == (pooled / 'part-1.scored.csv').read_bytes()
+
+
+def test_text_columns_are_not_read(shards, tmp_path):
+    source = pd.read_csv(os.path.join(shards, 'part-1.csv'))
+    source.insert(1, 'course', np.where(np.arange(len(source)) % 2, 'CS', 'Math'))
+    source.to_csv(tmp_path / 'roster.csv', index=False)
+
+    score.score(str(tmp_path / 'roster.csv'), str(tmp_path / 'out'), MODEL_PATH, workers=1, verbose=False)
+    scored = pd.read_csv(tmp_path / 'out' / 'roster.scored.csv')
+    score.score(os.path.join(shards, 'part-1.csv'), str(tmp_path / 'plain'), MODEL_PATH, workers=1, verbose=False)
+    expected = pd.read_csv(tmp_path / 'plain' / 'part-1.scored.csv')
+    pd.testing.assert_frame_equal(scored, expected)
@@ -0,0 +1,43 @@
+# End-to-end test of the preforking server (serve.py)
+import http.client
+import json
+import os
+import signal
+import subprocess
+import sys
+
+from load_test import ML_DIR, free_port, wait_until_ready
+
+
+def test_workers_serve_and_drain_on_sigterm(tmp_path):
+    port = free_port()
+    env = dict(os.environ, ML_MODEL_REGISTRY=str(tmp_path / 'registry'))
+    server = subprocess.Popen(
+        [sys.executable, 'serve.py', '--host', '127.0.0.1', '--port', str(port), '--workers', '2'],
+        cwd=ML_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+    )
+    try:
+        wait_until_ready(port)
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        student = {'student_id': 'STU_0001', 'avg_attendance': 70.0, 'avg_assignment_grade': 65.0}
+        conn.request('POST', '/predict', json.dumps(student), {'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        assert response.status == 200
+        assert 0.0 <= json.loads(response.read())['dropout_probability'] <= 1.0
+        conn.close()
+    finally:
+        server.send_signal(signal.SIGTERM)
+        output, _ = server.communicate(timeout=60)
+
+    assert server.returncode == 0
+    assert 'Preloaded model version v0001' in output
+    assert 'All workers stopped' in output
+
+
+def test_respawns_back_off_then_give_up_on_startup_failures():
+    from serve import RespawnPolicy
+    policy = RespawnPolicy(fast_exit=10.0, backoff=0.5, backoff_max=1.5, max_fast_failures=4)
+    assert [policy.exited(0.1) for _ in range(3)] == [0.5, 1.0, 1.5]
+    # A worker that served for a while resets the count
+    assert policy.exited(60.0) == 0.0
+    assert [policy.exited(0.1) for _ in range(4)] == [0.5, 1.0, 1.5, None]
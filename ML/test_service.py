@@ -0,0 +1,362 @@
+# In-process tests for the ML API endpoints
+import json
+import os
+import time
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def wait_until_ready(client, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while client.get("/ready").status_code != 200:
+        assert time.monotonic() < deadline, "model did not become ready"
+        time.sleep(0.05)
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    """
+    Run the app (including its lifespan) from the ML directory, with a fresh
+    registry that imports the bundled model file as its first version
+    """
+    cwd = os.getcwd()
+    os.chdir(ML_DIR)
+    registry_dir = main.REGISTRY_DIR
+    main.REGISTRY_DIR = str(tmp_path_factory.mktemp("registry"))
+    try:
+        with TestClient(main.app) as test_client:
+            wait_until_ready(test_client)
+            yield test_client
+    finally:
+        main.REGISTRY_DIR = registry_dir
+        os.chdir(cwd)
+
+
+def make_students(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "student_id": f"STU_{i:05d}",
+            "avg_attendance": float(rng.uniform(30, 100)),
+            "avg_assignment_grade": float(rng.uniform(20, 100)),
+            "attendance_trend": float(rng.uniform(-1, 1))
+        }
+        for i in range(n)
+    ]
+
+
+def test_bulk_prediction(client):
+    students = make_students(200)
+    response = client.post("/predict/bulk", json={"students": students})
+    assert response.status_code == 200
+
+    body = response.json()
+    assert [p["student_id"] for p in body["predictions"]] == [s["student_id"] for s in students]
+
+    summary = body["summary"]
+    assert summary["total_students"] == len(students)
+    assert summary["high_risk"] + summary["medium_risk"] + summary["low_risk"] == len(students)
+
+    # Vectorized post-processing must agree with the per-student helpers
+    for student, prediction in zip(students, body["predictions"]):
+        probability = prediction["dropout_probability"]
+        assert prediction["risk_level"] == main.get_risk_level(probability)
+        assert prediction["confidence"] == pytest.approx(max(probability, 1 - probability))
+        assert prediction["recommendations"] == main.get_recommendations(probability, student)
+
+
+def test_bulk_prediction_empty(client):
+    response = client.post("/predict/bulk", json={"students": []})
+    assert response.status_code == 200
+    assert response.json() == {
+        "predictions": [],
+        "summary": {"total_students": 0, "high_risk": 0, "medium_risk": 0, "low_risk": 0}
+    }
+
+
+def test_bulk_prediction_validates_ranges(client):
+    students = make_students(3)
+    students[1]["avg_attendance"] = 150.0
+    response = client.post("/predict/bulk", json={"students": students})
+    assert response.status_code == 422
+
+
+def test_bulk_rejects_bad_bodies_and_unavailable_formats(client):
+    body = b"student_id,avg_attendance,avg_assignment_grade\n\xff,80,70\n"
+    response = client.post("/predict/bulk", content=body, headers={"Content-Type": "text/csv"})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", 0]
+
+    response = client.post("/predict/bulk", json={"students": make_students(1)}, headers={"Accept": "text/html"})
+    assert response.status_code == 406
+
+
+def test_single_prediction_matches_bulk(client):
+    students = make_students(5, seed=1)
+    bulk = client.post("/predict/bulk", json={"students": students}).json()["predictions"]
+
+    for student, expected in zip(students, bulk):
+        response = client.post("/predict", json=student)
+        assert response.status_code == 200
+        assert response.json()["dropout_probability"] == pytest.approx(expected["dropout_probability"])
+
+
+def test_inference_metrics_report_batching(client):
+    # A student no earlier test sent, so the prediction cache misses
+    client.post("/predict", json=make_students(1, seed=99)[0])
+    metrics = client.get("/metrics/inference").json()
+    assert metrics["requests"] >= 1
+    assert metrics["batches"] >= 1
+    assert metrics["queue_depth"] == 0
+
+
+def test_prometheus_metrics_cover_each_stage(client):
+    client.post("/predict", json=make_students(1, seed=98)[0])
+    client.post("/predict/bulk", json={"students": make_students(20, seed=98)})
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+
+    text = response.text
+    for stage in ("validation", "feature_assembly", "scaling", "inference", "recommendations", "serialization"):
+        assert f'ml_stage_duration_seconds_count{{stage="{stage}"}}' in text
+    assert 'ml_request_duration_seconds_count{handler="predict_bulk_students"}' in text
+    assert 'ml_inference_batch_rows_bucket{le="32.0"}' in text
+    assert 'ml_model_info{version="v0001"' in text
+    assert 'ml_cache_lookups_total{result="miss"}' in text
+    assert "ml_queue_depth 0" in text
+
+
+def test_explain_returns_contributions_per_student(client):
+    students = make_students(50, seed=5)
+    bulk = client.post("/predict/bulk", json={"students": students}).json()["predictions"]
+    response = client.post("/predict/explain", json={"students": students})
+    assert response.status_code == 200
+
+    body = response.json()
+    assert body["output"] == "probability"
+    assert body["summary"]["total_students"] == len(students)
+    for expected, explanation in zip(bulk, body["explanations"]):
+        assert explanation["student_id"] == expected["student_id"]
+        assert set(explanation["contributions"]) == set(body["feature_names"])
+        total = body["base_value"] + sum(explanation["contributions"].values())
+        assert explanation["dropout_probability"] == pytest.approx(total, abs=1e-9)
+        assert explanation["dropout_probability"] == pytest.approx(expected["dropout_probability"], abs=1e-6)
+        assert explanation["risk_level"] == expected["risk_level"]
+        assert explanation["recommendations"][:len(expected["recommendations"])] == expected["recommendations"]
+        positive = [name for name, value in explanation["contributions"].items() if value >= 0.02]
+        assert set(explanation["risk_drivers"]) <= set(positive)
+        if explanation["risk_level"] == "LOW":
+            assert explanation["risk_drivers"] == []
+            assert explanation["recommendations"] == expected["recommendations"]
+
+    # Repeated feature vectors are served from the explanation cache
+    before = client.get("/metrics/inference").json()["explanation_cache"]
+    csv = "student_id,avg_attendance,avg_assignment_grade,attendance_trend\n" + "".join(
+        f"{s['student_id']},{s['avg_attendance']},{s['avg_assignment_grade']},{s['attendance_trend']}\n"
+        for s in students[:10])
+    again = client.post("/predict/explain", content=csv, headers={"content-type": "text/csv"}).json()
+    after = client.get("/metrics/inference").json()["explanation_cache"]
+    assert after["hits"] == before["hits"] + 10
+    assert again["explanations"] == body["explanations"][:10]
+
+    assert client.post("/predict/explain", json={"students": []}).json()["explanations"] == []
+
+
+def test_risk_index_endpoints(client, tmp_path, monkeypatch):
+    from risk_index import RiskTable, encode_ids
+
+    monkeypatch.setattr(main, "RISK_INDEX_DIR", str(tmp_path / "risk_index"))
+    monkeypatch.setattr(main, "RISK_INDEX_CHECK_S", 0.0)
+    assert client.get("/risk/student/STU_00001").status_code == 503
+
+    probabilities = np.linspace(0, 1, 101)
+    table = RiskTable.build(encode_ids([f"STU_{i:05d}" for i in range(101)] + ["top"]),
+                            np.append(probabilities, 0.0), np.zeros(102, np.uint64),
+                            main.manager.active.fingerprint, np.arange(102) % 2, ["even", "odd"])
+    table.save(main.RISK_INDEX_DIR)
+    index = {"model_fingerprint": main.manager.active.fingerprint, "built_at": table.meta["built_at"],
+             "stale": False}
+
+    body = client.get("/risk/student/STU_00080").json()
+    assert body == {"student_id": "STU_00080", "dropout_probability": 0.8, "risk_level": "HIGH",
+                    "course": "even", "percentile": pytest.approx(100 * 82 / 102), "index": index}
+    assert client.get("/risk/student/top").json()["dropout_probability"] == 0.0
+    assert client.get("/risk/student/UNKNOWN").status_code == 404
+
+    top = client.get("/risk/top", params={"k": 3, "course": "odd"}).json()
+    assert top["index"] == index
+    assert [r["student_id"] for r in top["students"]] == ["STU_00099", "STU_00097", "STU_00095"]
+    assert client.get("/risk/top", params={"course": "none"}).status_code == 404
+
+    band = client.get("/risk/band/medium", params={"limit": 2}).json()
+    assert band["total"] == 40 and [r["student_id"] for r in band["students"]] == ["STU_00069", "STU_00068"]
+
+    percentiles = client.get("/risk/percentiles", params=[("q", 50), ("q", 99.5)]).json()
+    assert percentiles["students"] == 102 and percentiles["index"] == index
+    assert client.get("/risk/percentiles", params={"q": 101}).status_code == 422
+
+    # A table built by another model is flagged as stale
+    RiskTable.build(table.ids, table.probability, np.zeros(102, np.uint64), "older model").save(main.RISK_INDEX_DIR)
+    index = client.get("/risk/band/high").json()["index"]
+    assert index["model_fingerprint"] == "older model" and index["stale"]
+
+
+def test_repeated_predictions_are_served_from_cache(client):
+    student = make_students(1, seed=7)[0]
+    first = client.post("/predict", json=student).json()
+    before = client.get("/metrics/inference").json()
+
+    # Same features under another ID hit the cache and skip the batcher
+    second = client.post("/predict", json={**student, "student_id": "OTHER"}).json()
+    after = client.get("/metrics/inference").json()
+
+    assert second["dropout_probability"] == first["dropout_probability"]
+    assert second["student_id"] == "OTHER"
+    assert after["cache"]["hits"] == before["cache"]["hits"] + 1
+    assert after["requests"] == before["requests"]
+
+
+def test_health_is_separate_from_readiness(client):
+    assert client.get("/health").json()["status"] == "healthy"
+    ready = client.get("/ready").json()
+    assert ready["ready"] and ready["state"] == "ready"
+    assert ready["active_version"] == "v0001"
+
+
+def test_promote_and_roll_back_under_traffic(client):
+    registry = main.manager.registry
+    student = make_students(1, seed=11)[0]
+    before = client.post("/predict", json=student).json()["dropout_probability"]
+
+    new_version = registry.publish(registry.model_path("v0001"), {"note": "retrained"})
+    response = client.post(f"/admin/models/{new_version}/promote")
+    assert response.status_code == 200
+    assert response.json()["active_version"] == new_version
+    assert registry.current() == new_version
+    # Same model bytes, same fingerprint, so cached results stay valid
+    assert client.post("/predict", json=student).json()["dropout_probability"] == before
+
+    response = client.post("/admin/models/rollback")
+    assert response.status_code == 200
+    assert response.json()["active_version"] == "v0001"
+    assert client.post("/admin/models/v9999/promote").status_code == 404
+    assert [v["version"] for v in client.get("/admin/models").json()["versions"]] == ["v0001", new_version]
+
+
+def test_sample_endpoint_uses_rule_engine(client):
+    body = client.get("/test-sample").json()
+    assert body["summary"]["total_students"] == 3
+    for prediction in body["predictions"]:
+        assert prediction["risk_level"] == main.get_risk_level(prediction["dropout_probability"])
+
+
+def test_bulk_ndjson_request_and_response_match_json(client):
+    students = make_students(50, seed=3)
+    expected = client.post("/predict/bulk", json={"students": students}).json()
+
+    body = "\n".join(json.dumps(s) for s in students)
+    response = client.post("/predict/bulk", content=body,
+                           headers={"Content-Type": "application/x-ndjson", "Accept": "application/x-ndjson"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[-1] == {"summary": expected["summary"]}
+    for line, prediction in zip(lines[:-1], expected["predictions"]):
+        assert line == pytest.approx(prediction)
+
+
+def test_bulk_ndjson_validation_errors(client):
+    students = make_students(3)
+    students[2]["avg_assignment_grade"] = -5
+    body = "\n".join(json.dumps(s) for s in students)
+    response = client.post("/predict/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", 2, "avg_assignment_grade"]
+
+
+def test_bulk_rejects_unknown_formats(client):
+    response = client.post("/predict/bulk", content="a,b", headers={"Content-Type": "text/plain"})
+    assert response.status_code == 415
+
+
+def test_bulk_arrow_round_trip(client):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.ipc
+
+    students = make_students(20, seed=4)
+    expected = client.post("/predict/bulk", json={"students": students}).json()["predictions"]
+
+    table = pa.Table.from_pylist(students)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    response = client.post("/predict/bulk", content=sink.getvalue().to_pybytes(), headers={
+        "Content-Type": "application/vnd.apache.arrow.stream", "Accept": "application/vnd.apache.arrow.stream"
+    })
+    assert response.status_code == 200
+
+    result = pa.ipc.open_stream(response.content).read_all()
+    assert result.column("student_id").to_pylist() == [s["student_id"] for s in students]
+    assert result.column("dropout_probability").to_pylist() == pytest.approx(
+        [p["dropout_probability"] for p in expected])
+
+
+def test_stream_scores_ndjson_in_batches(client, monkeypatch):
+    monkeypatch.setattr(main, "STREAM_BATCH_ROWS", 64)
+    students = make_students(300, seed=5)
+    expected = client.post("/predict/bulk", json={"students": students}).json()
+
+    def chunks():
+        # Chunk boundaries that split lines
+        body = "\n".join(json.dumps(s) for s in students).encode()
+        for start in range(0, len(body), 1000):
+            yield body[start:start + 1000]
+
+    response = client.post("/predict/stream", content=chunks(), headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[-1] == {"summary": expected["summary"]}
+    assert len(lines) == len(students) + 1
+    for line, prediction in zip(lines, expected["predictions"]):
+        assert line == pytest.approx(prediction)
+
+
+def test_stream_scores_csv(client):
+    students = make_students(10, seed=6)
+    expected = client.post("/predict/bulk", json={"students": students}).json()["predictions"]
+
+    fields = list(students[0])
+    body = ",".join(fields) + "\n" + "".join(",".join(str(s[f]) for f in fields) + "\n" for s in students)
+    response = client.post("/predict/stream", content=body, headers={"Content-Type": "text/csv"})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["student_id"] for line in lines[:-1]] == [s["student_id"] for s in students]
+    assert [line["dropout_probability"] for line in lines[:-1]] == pytest.approx(
+        [p["dropout_probability"] for p in expected])
+
+
+def test_stream_reports_an_unreadable_csv_header(client):
+    body = b"student_id,\xff\xfe\n" + b"S1,1\n"
+    response = client.post("/predict/stream", content=body, headers={"Content-Type": "text/csv"})
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 1 and "detail" in lines[0]
+
+
+def test_stream_ends_with_error_line_on_invalid_rows(client, monkeypatch):
+    monkeypatch.setattr(main, "STREAM_BATCH_ROWS", 2)
+    students = make_students(5, seed=7)
+    students[3]["avg_attendance"] = 120.0
+    body = "\n".join(json.dumps(s) for s in students)
+    response = client.post("/predict/stream", content=body, headers={"Content-Type": "application/x-ndjson"})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    # The first batch was already scored and sent
+    assert [line["student_id"] for line in lines[:2]] == [s["student_id"] for s in students[:2]]
+    assert lines[-1]["detail"][0]["loc"] == ["body", 3, "avg_attendance"]
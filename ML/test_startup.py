@@ -0,0 +1,13 @@
+# Regression gate for the serving import path (see bench_startup.py)
+from bench_startup import check_startup, measure_startup
+
+
+def test_import_main_stays_slim():
+    result = measure_startup()
+    assert check_startup(result) == []
+
+
+def test_loading_model_imports_only_its_library():
+    result = measure_startup('student_dropout_model.pkl')
+    assert result['model_module'].startswith('sklearn.')
+    assert check_startup(result) == []
@@ -0,0 +1,38 @@
+# Tests for the vectorized synthetic cohort generator
+import pandas as pd
+import pytest
+
+from synthetic_data import BLOCK_SIZE, generate_synthetic_data, iter_chunks, student_ids, write_synthetic_data
+
+
+def test_ids_match_original_format():
+    ids = student_ids(9995, 10002)
+    assert list(ids) == [f"STU_{i + 1:04d}" for i in range(9995, 10002)]
+    assert student_ids(0, 2)[0] == 'STU_0001'
+
+
+def test_output_is_independent_of_chunk_size():
+    n = 2 * BLOCK_SIZE + 123
+    whole = generate_synthetic_data(n, seed=7)
+    chunked = pd.concat(iter_chunks(n, seed=7, chunk_size=BLOCK_SIZE), ignore_index=True)
+    pd.testing.assert_frame_equal(whole, chunked)
+    assert not whole.equals(generate_synthetic_data(n, seed=8))
+
+
+def test_columns_follow_the_original_ranges():
+    df = generate_synthetic_data(5000)
+    assert list(df.columns) == ['student_id', 'avg_assignment_score', 'attendance_trend',
+                                'avg_attendance', 'dropped_out']
+    assert df['avg_assignment_score'].between(0, 100).all()
+    assert df['attendance_trend'].between(-1, 1).all()
+    assert df['avg_attendance'].between(50, 100).all()
+    assert set(df['dropped_out'].unique()) <= {0, 1}
+
+
+def test_csv_streaming_round_trip(tmp_path):
+    path = str(tmp_path / 'cohort.csv')
+    write_synthetic_data(path, 1000, seed=3, chunk_size=1)
+    pd.testing.assert_frame_equal(pd.read_csv(path), generate_synthetic_data(1000, seed=3))
+
+    with pytest.raises(ValueError):
+        write_synthetic_data(str(tmp_path / 'cohort.txt'), 10)
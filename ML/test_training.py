@@ -0,0 +1,45 @@
+# Tests for parallel, budgeted model selection in model_training
+import numpy as np
+
+from student_dropout_predictor import StudentDropoutPredictor
+from test_predictor import make_frame
+
+
+def prepared(n=300):
+    predictor = StudentDropoutPredictor()
+    X, y = predictor.preprocess_data(make_frame(n))
+    return predictor, X, y
+
+
+def test_seeded_runs_are_reproducible_across_pool_sizes():
+    predictor, X, y = prepared()
+    serial, _, _ = predictor.train_models(X, y, seed=3, cv=3, n_jobs=1)
+    parallel, _, _ = predictor.train_models(X, y, seed=3, cv=3, n_jobs=2)
+
+    assert serial.keys() == parallel.keys()
+    for name in serial:
+        np.testing.assert_array_equal(serial[name]['y_pred_proba'], parallel[name]['y_pred_proba'])
+        assert serial[name]['cv_mean'] == parallel[name]['cv_mean']
+
+
+def test_losing_candidates_are_abandoned():
+    predictor, X, y = prepared()
+    results, _, _ = predictor.train_models(X, y, seed=3, cv=3, n_jobs=1, abandon_margin=0.0)
+
+    completed = [row['model'] for row in predictor.training_report if row['status'] == 'completed']
+    assert len(completed) == 1
+    assert results[completed[0]]['model'] is predictor.best_model
+    # Abandoned candidates stop after the two folds used to judge them
+    for row in predictor.training_report:
+        if row['status'] == 'abandoned':
+            assert row['folds_completed'] == 2
+
+
+def test_time_budget_stops_scheduling():
+    predictor, X, y = prepared()
+    results, _, _ = predictor.train_models(X, y, seed=3, cv=3, n_jobs=1, time_budget=0.0)
+
+    # The first full fit always runs so a model can still be selected
+    assert len(results) == 1
+    assert predictor.best_model is next(iter(results.values()))['model']
+    assert sum(row['status'] == 'not run' for row in predictor.training_report) == 3
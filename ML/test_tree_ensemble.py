@@ -0,0 +1,48 @@
+# Parity tests for the NumPy-compiled tree ensembles
+import numpy as np
+import pytest
+
+from model_training import build_candidates
+from student_dropout_predictor import StudentDropoutPredictor
+from test_predictor import make_frame
+from tree_ensemble import compile_ensemble
+
+FAMILIES = ['Random Forest', 'Gradient Boosting', 'XGBoost', 'LightGBM']
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    predictor = StudentDropoutPredictor()
+    df = make_frame(600)
+    X, y = predictor.preprocess_data(df)
+    models = build_candidates(random_state=0)
+    for model in models.values():
+        model.fit(X, y)
+    return predictor, models, df
+
+
+@pytest.mark.parametrize('name', FAMILIES)
+@pytest.mark.parametrize('rows', [1, 7, 3000])
+def test_compiled_matches_predict_proba(fitted, name, rows):
+    _, models, _ = fitted
+    model = models[name]
+    compiled = compile_ensemble(model)
+
+    # Training-like rows plus values outside the training range
+    X = np.random.default_rng(rows).normal(scale=2.0, size=(rows, 3))
+    np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X)[:, 1], rtol=0, atol=1e-6)
+
+
+def test_exported_model_scores_without_the_estimator(fitted, tmp_path):
+    predictor, models, df = fitted
+    predictor.best_model = models['XGBoost']
+    expected = predictor.best_model.predict_proba(predictor.transform.transform(
+        predictor.transform.assemble_frame(df)))[:, 1]
+
+    path = tmp_path / 'model.npz'
+    predictor.export_compiled(path)
+
+    loaded = StudentDropoutPredictor()
+    loaded.load_compiled(path)
+    assert loaded.best_model is None
+    np.testing.assert_allclose(loaded.generate_predictions(df)[1], expected, rtol=0, atol=1e-6)
@@ -0,0 +1,154 @@
+# Tests for the batched TreeSHAP explanations
+from itertools import combinations
+from math import factorial
+
+import numpy as np
+import pytest
+from sklearn.base import clone
+
+import tree_shap
+from model_training import build_candidates
+from student_dropout_predictor import StudentDropoutPredictor
+from test_predictor import make_frame
+from tree_ensemble import OUTPUT_MEAN, compile_ensemble
+from tree_shap import TreeExplainer
+
+FAMILIES = ['Random Forest', 'Gradient Boosting', 'XGBoost', 'LightGBM']
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    predictor = StudentDropoutPredictor()
+    df = make_frame(600)
+    X, y = predictor.preprocess_data(df)
+    models = build_candidates(random_state=0)
+    for model in models.values():
+        model.fit(X, y)
+    return predictor, models, df
+
+
+def rows(n, seed=0):
+    # Training-like rows plus values outside the training range
+    return np.random.default_rng(seed).normal(scale=2.0, size=(n, 3))
+
+
+def conditional_expectation(ensemble, x, subset):
+    """Path-dependent E[f(x) | x_subset]: unknown features follow both children by cover"""
+    def node_value(node):
+        left, right = ensemble.children[node]
+        if left == node:
+            return ensemble.value[node]
+        feature = ensemble.feature[node]
+        if feature in subset:
+            return node_value(left if x[feature] <= ensemble.threshold[node] else right)
+        return (ensemble.cover[left] * node_value(left) + ensemble.cover[right] * node_value(right)) \
+            / ensemble.cover[node]
+
+    total = sum(node_value(root) for root in ensemble.roots)
+    return total / ensemble.n_trees if ensemble.output == OUTPUT_MEAN else total
+
+
+def brute_force_shapley(ensemble, x, n_features):
+    phi = np.zeros(n_features)
+    for i in range(n_features):
+        others = [j for j in range(n_features) if j != i]
+        for size in range(n_features):
+            weight = factorial(size) * factorial(n_features - size - 1) / factorial(n_features)
+            for subset in combinations(others, size):
+                phi[i] += weight * (conditional_expectation(ensemble, x, set(subset) | {i})
+                                    - conditional_expectation(ensemble, x, set(subset)))
+    return phi
+
+
+@pytest.mark.parametrize('name', FAMILIES)
+def test_contributions_sum_to_the_model_output(fitted, name):
+    _, models, _ = fitted
+    compiled = compile_ensemble(models[name])
+    explainer = TreeExplainer(compiled, 3)
+
+    X = rows(2000).astype(compiled.threshold.dtype)
+    phi = explainer.shap_values(X)
+    np.testing.assert_allclose(phi.sum(axis=1) + explainer.expected_value, compiled.decision_function(X),
+                               rtol=0, atol=1e-9)
+    np.testing.assert_allclose(explainer.probabilities(phi), compiled.predict_proba(X), rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize('name', ['Random Forest', 'Gradient Boosting'])
+def test_matches_the_shapley_definition(fitted, name):
+    _, models, _ = fitted
+    # A few small trees keep the reference recursion quick
+    model = clone(models[name]).set_params(n_estimators=5, max_depth=4)
+    X_train = rows(400, seed=1)
+    model.fit(X_train, X_train[:, 0] + X_train[:, 1] * X_train[:, 2] > 0)
+    compiled = compile_ensemble(model)
+
+    X = rows(20, seed=2)
+    phi = TreeExplainer(compiled, 3).shap_values(X)
+    expected = np.array([brute_force_shapley(compiled, x, 3) for x in X.astype(compiled.threshold.dtype)])
+    np.testing.assert_allclose(phi, expected, rtol=0, atol=1e-12)
+
+
+def test_matches_xgboost_pred_contribs(fitted):
+    import xgboost as xgb
+    _, models, _ = fitted
+    model = models['XGBoost']
+    X = rows(500).astype(np.float32)
+    booster = model.get_booster()
+    expected = booster.predict(xgb.DMatrix(X, feature_names=booster.feature_names), pred_contribs=True)
+    phi = TreeExplainer(compile_ensemble(model), 3).shap_values(X)
+    # XGBoost accumulates in float32
+    np.testing.assert_allclose(phi, expected[:, :3], rtol=0, atol=1e-4)
+
+
+def test_matches_lightgbm_pred_contrib(fitted):
+    _, models, _ = fitted
+    model = models['LightGBM']
+    X = rows(500)
+    expected = model.predict(X, pred_contrib=True)
+    explainer = TreeExplainer(compile_ensemble(model), 3)
+    np.testing.assert_allclose(explainer.shap_values(X), expected[:, :3], rtol=0, atol=1e-10)
+    assert explainer.expected_value == pytest.approx(expected[0, 3])
+
+
+def test_direct_evaluation_matches_pattern_tables(fitted, monkeypatch):
+    _, models, _ = fitted
+    compiled = compile_ensemble(models['Random Forest'])
+    X = rows(50).astype(compiled.threshold.dtype)
+    tabulated = TreeExplainer(compiled, 3).shap_values(X)
+
+    monkeypatch.setattr(tree_shap, "PATTERN_MAX_FEATURES", 0)
+    explainer = TreeExplainer(compiled, 3)
+    assert not explainer.tabulated
+    np.testing.assert_allclose(explainer.shap_values(X), tabulated, rtol=0, atol=1e-12)
+
+
+def test_row_chunks_match_one_batch(fitted, monkeypatch):
+    _, models, _ = fitted
+    explainer = TreeExplainer(compile_ensemble(models['LightGBM']), 3)
+    X = rows(30)
+    expected = explainer.shap_values(X)
+    monkeypatch.setattr(tree_shap, "CHUNK_WORK", 1)
+    np.testing.assert_allclose(explainer.shap_values(X), expected, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize('name', ['Random Forest', 'XGBoost'])
+def test_predictor_explain_matches_predictions(fitted, name):
+    predictor, models, df = fitted
+    predictor.best_model = models[name]
+    predictor.compiled_model = None
+    X = predictor.transform.assemble_frame(df)
+
+    probabilities, contributions = predictor.explain(X)
+    assert contributions.shape == (len(df), 3)
+    np.testing.assert_allclose(probabilities, predictor.generate_predictions(X)[1], rtol=0, atol=1e-6)
+    assert predictor.explainer() is predictor.explainer()
+
+
+def test_predictor_explain_requires_a_tree_ensemble(fitted):
+    from sklearn.linear_model import LogisticRegression
+    predictor, _, df = fitted
+    X_train = rows(100)
+    predictor.best_model = LogisticRegression().fit(X_train, X_train[:, 0] > 0)
+    predictor.compiled_model = None
+    with pytest.raises(ValueError):
+        predictor.explain(predictor.transform.assemble_frame(df))
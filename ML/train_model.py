@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 from student_dropout_predictor import StudentDropoutPredictor
+from model_registry import DEFAULT_REGISTRY_DIR, ModelRegistry
 
 if __name__ == "__main__":
     print("Training Student Dropout Prediction Model...")
@@ -9,8 +10,18 @@ if __name__ == "__main__":
     # Generate synthetic data and train the model
     df = predictor.load_data()
     X, y = predictor.preprocess_data(df)
-    results, X_test, y_test = predictor.train_models(X, y)
+    results, X_test, y_test = predictor.train_models(X, y, seed=42)
 
     # Save the trained model
     predictor.save_model('student_dropout_model.pkl')
     print("Model training complete. Saved as 'student_dropout_model.pkl'")
+
+    # Publish it as the registry's current version; running API workers
+    # load, warm up and switch to it without a restart
+    best = next(name for name in results if results[name]['model'] is predictor.best_model)
+    version = ModelRegistry(DEFAULT_REGISTRY_DIR).publish(
+        'student_dropout_model.pkl',
+        {'model': best, 'auc_score': float(results[best]['auc_score'])},
+        set_current=True
+    )
+    print(f"Published to model registry as {version}")
@@ -0,0 +1,382 @@
+"""
+Compile trained tree ensembles into flat NumPy node arrays and evaluate them
+without the originating library.
+
+Supports the four model families of train_models: RandomForestClassifier,
+GradientBoostingClassifier, XGBClassifier and LGBMClassifier (binary, numeric
+splits). Inputs are the already scaled feature rows, which the frozen
+FeatureTransform never leaves NaN, so missing-value routing is not modelled.
+"""
+
+import json
+
+import numpy as np
+
+# Batches with at most this many row x node decisions are evaluated densely
+DENSE_WORK_LIMIT = 1 << 18
+
+# How the summed leaf values of an ensemble become a dropout probability
+OUTPUT_MEAN = 'mean'        # Random Forest: average of per-tree probabilities
+OUTPUT_LOGIT = 'logit'      # Boosting: sigmoid of base margin + summed leaves
+
+
+class UnsupportedModelError(ValueError):
+    """Raised when a model cannot be compiled into a CompiledEnsemble."""
+
+
+class CompiledEnsemble:
+    """
+    A tree ensemble as flat node arrays.
+
+    Node i of the ensemble splits on feature[i]: rows with
+    x[feature[i]] <= threshold[i] go to children[i, 0], the others to
+    children[i, 1]. Leaves point to themselves with an infinite threshold, so
+    every row can take exactly max_depth steps with no leaf masking. Leaf
+    values are already scaled by any learning rate; cover holds the training
+    weight seen by each node.
+
+    Nodes are stored split nodes first, grouped by feature, then leaves, so
+    the decisions of all split nodes on one feature are a single contiguous
+    comparison.
+    """
+
+    def __init__(self, feature, threshold, children, value, cover, roots, max_depth,
+                 output, base_score=0.0, model_type='', child_slots=None):
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        # Comparisons happen in the threshold dtype (float32 for sklearn and
+        # XGBoost, float64 for LightGBM), as in the original libraries
+        self.threshold = np.ascontiguousarray(threshold)
+        self.children = np.ascontiguousarray(children, dtype=np.int32)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.cover = np.ascontiguousarray(cover, dtype=np.float64)
+        self.roots = np.ascontiguousarray(roots, dtype=np.int32)
+        self.max_depth = int(max_depth)
+        self.output = output
+        self.base_score = float(base_score)
+        self.model_type = model_type
+
+        self._children_flat = self.children.ravel()
+        # Precomputed slots may come from a memory-mapped artifact
+        if child_slots is None:
+            child_slots = 2 * self._children_flat.astype(np.intp)
+        self._child_slots = np.asarray(child_slots, dtype=np.intp)
+        leaf = self.is_leaf()
+        split_features = self.feature[~leaf]
+        if np.any(leaf[:len(split_features)]) or np.any(np.diff(split_features) < 0):
+            raise ValueError("Split nodes must precede leaves and be sorted by feature")
+        features, starts = np.unique(split_features, return_index=True)
+        ends = np.append(starts[1:], len(split_features))
+        self._feature_blocks = list(zip(features.tolist(), starts.tolist(), ends.tolist()))
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def is_leaf(self):
+        return self.children[:, 0] == np.arange(self.n_nodes)
+
+    def apply(self, X):
+        """
+        Return the (n_rows, n_trees) leaf node index reached by each row.
+        """
+        X = np.ascontiguousarray(X, dtype=self.threshold.dtype)
+        if len(X) * self.n_nodes <= DENSE_WORK_LIMIT:
+            return self._apply_dense(X)
+        return self._apply_sparse(X)
+
+    def _apply_sparse(self, X):
+        # Walk every (row, tree) pair one level per step, gathering only the
+        # nodes currently visited
+        n_rows, n_features = X.shape
+        X_flat = X.ravel()
+        row_offsets = (np.arange(n_rows, dtype=np.intp) * n_features)[:, None]
+
+        nodes = np.broadcast_to(self.roots, (n_rows, self.n_trees)).astype(np.intp)
+        for _ in range(self.max_depth):
+            x = X_flat.take(row_offsets + self.feature.take(nodes))
+            go_right = x > self.threshold.take(nodes)
+            nodes = self._children_flat.take(2 * nodes + go_right)
+        return nodes
+
+    def _apply_dense(self, X):
+        # For a handful of rows, decide every split node with one contiguous
+        # comparison per feature, then walk using those decisions. The walk
+        # tracks slots (2 * node) so each level is a gather, an add and a
+        # gather.
+        n_rows = len(X)
+        go_right = np.zeros((n_rows, self.n_nodes, 2), dtype=np.int8)
+        for feature, start, end in self._feature_blocks:
+            np.greater(X[:, feature, None], self.threshold[start:end], out=go_right[:, start:end, 0],
+                       casting='unsafe')
+        go_right[:, :, 1] = go_right[:, :, 0]
+        go_right = go_right.ravel()
+
+        slots = np.broadcast_to(2 * self.roots, (n_rows, self.n_trees)).astype(np.intp)
+        if n_rows == 1:
+            for _ in range(self.max_depth):
+                slots = self._child_slots.take(slots + go_right.take(slots))
+        else:
+            row_offsets = (np.arange(n_rows, dtype=np.intp) * 2 * self.n_nodes)[:, None]
+            for _ in range(self.max_depth):
+                slots = self._child_slots.take(slots + go_right.take(slots + row_offsets))
+        return slots >> 1
+
+    def decision_function(self, X):
+        """
+        Raw ensemble output: mean leaf probability for forests, margin for
+        boosted ensembles.
+        """
+        leaf_values = self.value.take(self.apply(X)).sum(axis=1)
+        if self.output == OUTPUT_MEAN:
+            return leaf_values / self.n_trees
+        return leaf_values + self.base_score
+
+    def predict_proba(self, X):
+        """
+        Probability of the positive (dropout) class for each row.
+        """
+        raw = self.decision_function(X)
+        if self.output == OUTPUT_MEAN:
+            return raw
+        return 1.0 / (1.0 + np.exp(-raw))
+
+    def to_arrays(self):
+        return {
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'children': self.children,
+            'value': self.value,
+            'cover': self.cover,
+            'roots': self.roots,
+        }
+
+    def metadata(self):
+        return {
+            'max_depth': self.max_depth,
+            'output': self.output,
+            'base_score': self.base_score,
+            'model_type': self.model_type,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays, metadata):
+        return cls(**arrays, **metadata)
+
+    def save(self, filepath, transform=None):
+        """
+        Export the node arrays, and optionally the frozen feature transform,
+        to a single .npz file.
+        """
+        arrays = dict(self.to_arrays())
+        metadata = {'ensemble': self.metadata()}
+        if transform is not None:
+            transform_data = transform.to_dict()
+            metadata['feature_names'] = transform_data.pop('feature_names')
+            arrays.update({f'transform_{k}': v for k, v in transform_data.items()})
+        np.savez(filepath, metadata=np.array(json.dumps(metadata)), **arrays)
+
+    @classmethod
+    def load(cls, filepath):
+        """
+        Load an ensemble saved by save(); returns (ensemble, transform or None).
+        """
+        from feature_transform import FeatureTransform
+
+        with np.load(filepath) as data:
+            metadata = json.loads(str(data['metadata']))
+            ensemble = cls.from_arrays(
+                {k: data[k] for k in ('feature', 'threshold', 'children', 'value', 'cover', 'roots')},
+                metadata['ensemble']
+            )
+            transform = None
+            if 'feature_names' in metadata:
+                transform = FeatureTransform(
+                    metadata['feature_names'], data['transform_mean'],
+                    data['transform_scale'], data['transform_medians']
+                )
+        return ensemble, transform
+
+
+class _Builder:
+    """Accumulates trees into flat arrays with global node indices."""
+
+    def __init__(self, threshold_dtype):
+        self.threshold_dtype = threshold_dtype
+        self.feature, self.threshold, self.left, self.right = [], [], [], []
+        self.value, self.cover, self.roots = [], [], []
+        self.max_depth = 0
+        self.n_nodes = 0
+
+    def add_tree(self, feature, threshold, left, right, value, cover):
+        """
+        Add one tree given per-node arrays; leaves have left == -1.
+        """
+        offset = self.n_nodes
+        n = len(feature)
+        self.n_nodes += n
+        leaf = np.asarray(left) < 0
+        own = np.arange(n) + offset
+
+        self.roots.append(offset)
+        self.feature.append(np.where(leaf, 0, feature))
+        self.threshold.append(np.where(leaf, np.inf, threshold))
+        self.left.append(np.where(leaf, own, np.asarray(left) + offset))
+        self.right.append(np.where(leaf, own, np.asarray(right) + offset))
+        self.value.append(np.where(leaf, value, 0.0))
+        self.cover.append(np.asarray(cover, dtype=np.float64))
+        self.max_depth = max(self.max_depth, _tree_depth(np.asarray(left), np.asarray(right)))
+
+    def build(self, output, base_score=0.0, model_type=''):
+        feature = np.concatenate(self.feature)
+        left = np.concatenate(self.left)
+        leaf = left == np.arange(len(left))
+
+        # Reorder nodes: split nodes grouped by feature, then leaves
+        order = np.lexsort((feature, leaf))
+        new_index = np.empty_like(order)
+        new_index[order] = np.arange(len(order))
+        children = np.stack([left, np.concatenate(self.right)], axis=1)
+
+        return CompiledEnsemble(
+            feature=feature[order],
+            threshold=np.concatenate(self.threshold).astype(self.threshold_dtype)[order],
+            children=new_index[children[order]],
+            value=np.concatenate(self.value)[order],
+            cover=np.concatenate(self.cover)[order],
+            roots=new_index[self.roots],
+            max_depth=self.max_depth,
+            output=output,
+            base_score=base_score,
+            model_type=model_type,
+        )
+
+
+def _tree_depth(left, right):
+    """Depth (edges on the longest root-to-leaf path) of a tree rooted at node 0."""
+    depth = np.zeros(len(left), dtype=np.int64)
+    # Nodes are numbered so that parents precede children in sklearn, XGBoost
+    # and our LightGBM flattening
+    for node in range(len(left)):
+        if left[node] >= 0:
+            depth[left[node]] = depth[right[node]] = depth[node] + 1
+    return int(depth.max())
+
+
+def _float32_at_most(threshold):
+    """
+    Largest float32 t with t <= threshold, so that for float32 inputs
+    x <= t exactly when x <= threshold.
+    """
+    threshold = np.asarray(threshold, dtype=np.float64)
+    t = threshold.astype(np.float32)
+    too_big = t.astype(np.float64) > threshold
+    t[too_big] = np.nextafter(t[too_big], np.float32(-np.inf))
+    return t
+
+
+def _compile_sklearn_trees(trees, leaf_values, builder):
+    for tree, values in zip(trees, leaf_values):
+        builder.add_tree(
+            tree.feature, _float32_at_most(tree.threshold), tree.children_left,
+            tree.children_right, values, tree.weighted_n_node_samples
+        )
+
+
+def compile_random_forest(model):
+    builder = _Builder(np.float32)
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    positive = list(model.classes_).index(1)
+    leaf_values = []
+    for tree in trees:
+        counts = tree.value[:, 0, :]
+        leaf_values.append(counts[:, positive] / counts.sum(axis=1))
+    _compile_sklearn_trees(trees, leaf_values, builder)
+    return builder.build(OUTPUT_MEAN, model_type='RandomForestClassifier')
+
+
+def compile_gradient_boosting(model):
+    if model.estimators_.shape[1] != 1:
+        raise UnsupportedModelError("Only binary GradientBoostingClassifier models can be compiled")
+    builder = _Builder(np.float32)
+    trees = [estimator.tree_ for estimator in model.estimators_[:, 0]]
+    leaf_values = [model.learning_rate * tree.value[:, 0, 0] for tree in trees]
+    _compile_sklearn_trees(trees, leaf_values, builder)
+    base_score = model._raw_predict_init(np.zeros((1, model.n_features_in_)))[0, 0]
+    return builder.build(OUTPUT_LOGIT, base_score, 'GradientBoostingClassifier')
+
+
+def compile_xgboost(model):
+    booster = model.get_booster()
+    learner = json.loads(booster.save_raw(raw_format='json'))['learner']
+    if learner['objective']['name'] != 'binary:logistic':
+        raise UnsupportedModelError("Only binary:logistic XGBoost models can be compiled")
+
+    builder = _Builder(np.float32)
+    for tree in learner['gradient_booster']['model']['trees']:
+        if any(tree['split_type']):
+            raise UnsupportedModelError("Categorical XGBoost splits are not supported")
+        left = np.array(tree['left_children'])
+        conditions = np.array(tree['split_conditions'], dtype=np.float32)
+        # XGBoost sends x < t left; for float32 x that is x <= the float32 below t
+        thresholds = np.nextafter(conditions, np.float32(-np.inf))
+        builder.add_tree(
+            tree['split_indices'], thresholds, left, tree['right_children'],
+            conditions.astype(np.float64), tree['sum_hessian']
+        )
+
+    base_score = float(learner['learner_model_param']['base_score'])
+    return builder.build(OUTPUT_LOGIT, np.log(base_score / (1 - base_score)), 'XGBClassifier')
+
+
+def compile_lightgbm(model):
+    dump = model.booster_.dump_model()
+    if dump['num_tree_per_iteration'] != 1 or dump['objective'].split()[0] != 'binary':
+        raise UnsupportedModelError("Only binary LightGBM models can be compiled")
+
+    builder = _Builder(np.float64)
+    for info in dump['tree_info']:
+        feature, threshold, left, right, value, cover = [], [], [], [], [], []
+        stack = [(info['tree_structure'], None, None)]
+        # Depth-first numbering keeps parents ahead of their children
+        while stack:
+            node, parent, side = stack.pop()
+            index = len(feature)
+            if parent is not None:
+                (left if side == 0 else right)[parent] = index
+            feature.append(node.get('split_feature', 0))
+            threshold.append(node.get('threshold', np.inf))
+            left.append(-1)
+            right.append(-1)
+            value.append(node.get('leaf_value', 0.0))
+            cover.append(node.get('internal_count', node.get('leaf_count', 0)))
+            if 'split_feature' in node:
+                if node['decision_type'] != '<=':
+                    raise UnsupportedModelError("Categorical LightGBM splits are not supported")
+                stack.append((node['right_child'], index, 1))
+                stack.append((node['left_child'], index, 0))
+        builder.add_tree(feature, threshold, left, right, value, cover)
+
+    # The initial score is folded into the first tree's leaves
+    return builder.build(OUTPUT_LOGIT, 0.0, 'LGBMClassifier')
+
+
+_COMPILERS = {
+    'RandomForestClassifier': compile_random_forest,
+    'GradientBoostingClassifier': compile_gradient_boosting,
+    'XGBClassifier': compile_xgboost,
+    'LGBMClassifier': compile_lightgbm,
+}
+
+
+def compile_ensemble(model):
+    """
+    Compile a fitted train_models estimator into a CompiledEnsemble.
+    """
+    compiler = _COMPILERS.get(type(model).__name__)
+    if compiler is None:
+        raise UnsupportedModelError(f"Cannot compile {type(model).__name__} models")
+    return compiler(model)
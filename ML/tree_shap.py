@@ -0,0 +1,246 @@
+"""
+Exact per-feature contributions (path-dependent TreeSHAP) for a
+CompiledEnsemble, vectorized over the batch.
+
+TreeSHAP's per-row recursion is replaced by a per-leaf form. For each leaf,
+the path from its root gives every feature it splits on an interval
+(lower, upper] and a "zero fraction" z: the product of the cover ratios of
+the path's edges on that feature. A row's "one fraction" o for the feature
+is 1 if its value lies in the interval, else 0. The leaf adds
+
+    v * (o_i - z_i) * sum_k w_k [t^k] prod_{j != i} (z_j + o_j t)
+
+to feature i, with w_k = k! (d - 1 - k)! / d! for the leaf's d path
+features, which is what the EXTEND/UNWIND steps of the recursive
+algorithm compute. The o pattern is all that depends on the row. Leaves
+with at most PATTERN_MAX_FEATURES path features therefore get their
+contributions tabulated for every pattern up front, and explaining a
+batch becomes one pattern lookup per (row, leaf), summed for all leaves
+at once as a sparse product (see _tabulated_contributions).
+
+Contributions are in the ensemble's raw output: probability for forests,
+log-odds for boosted models. They sum with expected_value to
+decision_function. Splits are monotone in each feature, so contributions
+computed on scaled rows also hold for the raw features.
+"""
+
+from math import factorial
+
+import numpy as np
+from scipy import sparse
+
+from tree_ensemble import OUTPUT_MEAN
+
+# Leaves with at most this many distinct path features use pattern tables
+PATTERN_MAX_FEATURES = 6
+# (row, leaf) pairs per evaluated chunk
+CHUNK_WORK = 1 << 20
+
+# TreeExplainer.output: the scale contributions are on
+OUTPUT_PROBABILITY = 'probability'
+OUTPUT_LOG_ODDS = 'log_odds'
+
+
+def _path_weights(d):
+    return np.array([factorial(k) * factorial(d - 1 - k) / factorial(d) for k in range(d)])
+
+
+def path_contributions(o, z, v):
+    """
+    Contributions of leaves with d path features: o is (..., n_leaves, d)
+    one fractions, z the (n_leaves, d) zero fractions and v the
+    (n_leaves,) leaf values. Returns (..., n_leaves, d).
+    """
+    o = np.asarray(o, dtype=np.float64)
+    d = z.shape[-1]
+    shape = np.broadcast_shapes(o.shape, z.shape)
+    o = np.broadcast_to(o, shape)
+
+    # Coefficients of prod_j (z_j + o_j t)
+    poly = np.zeros(shape[:-1] + (d + 1,))
+    poly[..., 0] = 1.0
+    for j in range(d):
+        shifted = poly[..., :-1] * o[..., j, None]
+        poly *= z[..., j, None]
+        poly[..., 1:] += shifted
+
+    weights = _path_weights(d)
+    safe_z = np.where(z > 0, z, 1.0)
+    out = np.empty(shape)
+    for i in range(d):
+        # Divide (z_i + o_i t) back out: top-down where o_i is 1, by z_i where it is 0
+        quotient = np.empty(shape[:-1] + (d,))
+        quotient[..., d - 1] = poly[..., d]
+        for k in range(d - 1, 0, -1):
+            quotient[..., k - 1] = poly[..., k] - z[..., i] * quotient[..., k]
+        quotient = np.where(o[..., i, None] > 0, quotient, poly[..., :d] / safe_z[..., i, None])
+        out[..., i] = (o[..., i] - z[..., i]) * (quotient @ weights)
+    return out * v[..., :, None]
+
+
+class _LeafGroup:
+    """
+    Leaves with the same number d of distinct path features. Bounds are
+    stored per path feature, (d, n_leaves), for row-wise broadcasting.
+    """
+
+    def __init__(self, feature, lower, upper, z, value, n_features):
+        n_leaves, d = feature.shape
+        self.d = d
+        self.feature = np.ascontiguousarray(feature.T)
+        self.lower = np.ascontiguousarray(lower.T)[..., None]
+        self.upper = np.ascontiguousarray(upper.T)[..., None]
+        self.z = z
+        self.value = value
+        # One-hot map from (leaf, path feature) to model feature
+        self.feature_map = np.zeros((n_leaves * d, n_features))
+        self.feature_map[np.arange(n_leaves * d), feature.ravel()] = 1.0
+
+    def __len__(self):
+        return len(self.value)
+
+    def inside(self, Xt):
+        """(d, n_leaves, n_rows) mask of rows within each path interval; Xt is X transposed"""
+        columns = Xt[self.feature]
+        return (columns > self.lower) & (columns <= self.upper)
+
+    def patterns(self, Xt):
+        """(n_leaves, n_rows) one-fraction bit patterns"""
+        inside = self.inside(Xt).view(np.uint8)
+        pattern = inside[0].copy()
+        for j in range(1, self.d):
+            pattern |= inside[j] << j
+        return pattern
+
+    def tabulate(self):
+        """(n_leaves * 2^d, n_features) contributions of every leaf and pattern"""
+        patterns = (np.arange(1 << self.d)[:, None] >> np.arange(self.d)) & 1
+        contributions = path_contributions(patterns[:, None, :], self.z, self.value)
+        n_leaves = len(self)
+        per_pair = contributions.transpose(1, 0, 2).reshape(n_leaves, 1 << self.d, 1, self.d)
+        feature_map = self.feature_map.reshape(n_leaves, 1, self.d, -1)
+        return (per_pair @ feature_map).reshape(n_leaves << self.d, -1)
+
+    def contributions(self, Xt):
+        """(n_rows, n_features) contributions evaluated directly"""
+        contributions = path_contributions(self.inside(Xt).transpose(2, 1, 0), self.z, self.value)
+        return contributions.reshape(Xt.shape[1], -1) @ self.feature_map
+
+
+class TreeExplainer:
+    """
+    Path-dependent TreeSHAP for a CompiledEnsemble over n_features inputs.
+    expected_value plus a row's contributions is its decision_function, on
+    the scale named by output.
+    """
+
+    def __init__(self, ensemble, n_features):
+        self.ensemble = ensemble
+        self.n_features = n_features
+        self.output = OUTPUT_PROBABILITY if ensemble.output == OUTPUT_MEAN else OUTPUT_LOG_ODDS
+        scale = 1.0 / ensemble.n_trees if ensemble.output == OUTPUT_MEAN else 1.0
+
+        leaves, lower, upper, z, seen = self._leaf_paths(ensemble, n_features)
+        value = ensemble.value[leaves] * scale
+        self.expected_value = float((value * z.prod(axis=1)).sum())
+        if ensemble.output != OUTPUT_MEAN:
+            self.expected_value += ensemble.base_score
+
+        # Leaves grouped by path feature count; tabulated groups share one table
+        self.tabulated, self.direct = [], []
+        n_path_features = seen.sum(axis=1)
+        for d in range(1, n_features + 1):
+            in_group = np.flatnonzero(n_path_features == d)
+            if not len(in_group):
+                continue
+            # The leaf's path features, in feature order
+            feature = np.sort(np.argsort(~seen[in_group], axis=1, kind='stable')[:, :d], axis=1)
+            bounds = [np.take_along_axis(a[in_group], feature, axis=1) for a in (lower, upper, z)]
+            group = _LeafGroup(feature, *bounds, value[in_group], n_features)
+            (self.tabulated if d <= PATTERN_MAX_FEATURES else self.direct).append(group)
+
+        tables = [group.tabulate() for group in self.tabulated]
+        self.table = np.concatenate(tables) if tables else np.zeros((0, n_features))
+        # Table row of each tabulated leaf's all-zero pattern
+        starts = np.cumsum([0] + [len(table) for table in tables])
+        self.table_offsets = [(start + (np.arange(len(group)) << group.d)).astype(np.int32)
+                              for start, group in zip(starts, self.tabulated)]
+        self.n_tabulated = sum(len(group) for group in self.tabulated)
+
+    @staticmethod
+    def _leaf_paths(ensemble, n_features):
+        """
+        (leaf nodes, lower and upper bounds, zero fractions, seen mask) with
+        one row per leaf and one column per feature, walking every tree one
+        level at a time.
+        """
+        dtype = ensemble.threshold.dtype
+        nodes = ensemble.roots.astype(np.intp)
+        lower = np.full((len(nodes), n_features), -np.inf, dtype=dtype)
+        upper = np.full((len(nodes), n_features), np.inf, dtype=dtype)
+        z = np.ones((len(nodes), n_features))
+        seen = np.zeros((len(nodes), n_features), dtype=bool)
+        found = []
+        while len(nodes):
+            leaf = ensemble.children[nodes, 0] == nodes
+            found.append((nodes[leaf], lower[leaf], upper[leaf], z[leaf], seen[leaf]))
+            split = ~leaf
+            nodes, lower, upper, z, seen = nodes[split], lower[split], upper[split], z[split], seen[split]
+
+            rows = np.arange(len(nodes))
+            feature = ensemble.feature[nodes]
+            threshold = ensemble.threshold[nodes]
+            cover = ensemble.cover[nodes]
+            children = []
+            for side in (0, 1):
+                child = ensemble.children[nodes, side].astype(np.intp)
+                child_lower, child_upper, child_z, child_seen = lower.copy(), upper.copy(), z.copy(), seen.copy()
+                if side == 0:
+                    child_upper[rows, feature] = np.minimum(upper[rows, feature], threshold)
+                else:
+                    child_lower[rows, feature] = np.maximum(lower[rows, feature], threshold)
+                ratio = np.divide(ensemble.cover[child], cover, out=np.zeros(len(nodes)), where=cover > 0)
+                child_z[rows, feature] *= ratio
+                child_seen[rows, feature] = True
+                children.append((child, child_lower, child_upper, child_z, child_seen))
+            nodes, lower, upper, z, seen = (np.concatenate(parts) for parts in zip(*children))
+        return tuple(np.concatenate(parts) for parts in zip(*found))
+
+    def shap_values(self, X):
+        """(n_rows, n_features) contributions for scaled rows X"""
+        X = np.asarray(X, dtype=self.ensemble.threshold.dtype)
+        phi = np.zeros((len(X), self.n_features))
+        n_leaves = max(1, self.n_tabulated + sum(len(group) for group in self.direct))
+        chunk = max(1, CHUNK_WORK // n_leaves)
+        for start in range(0, len(X), chunk):
+            rows = slice(start, start + chunk)
+            Xt = np.ascontiguousarray(X[rows].T)
+            phi[rows] = self._tabulated_contributions(Xt)
+            for group in self.direct:
+                phi[rows] += group.contributions(Xt)
+        return phi
+
+    def probabilities(self, contributions):
+        """Dropout probability of each row from its contributions"""
+        raw = self.expected_value + contributions.sum(axis=1)
+        if self.output == OUTPUT_PROBABILITY:
+            return raw
+        return 1.0 / (1.0 + np.exp(-raw))
+
+    def _tabulated_contributions(self, Xt):
+        """
+        Sum of the table rows picked by each row's patterns, as a product
+        of a one-hot (row, table row) matrix with the table.
+        """
+        n_rows = Xt.shape[1]
+        if not self.n_tabulated:
+            return np.zeros((n_rows, self.n_features))
+        index = np.empty((n_rows, self.n_tabulated), dtype=np.int32)
+        column = 0
+        for group, offsets in zip(self.tabulated, self.table_offsets):
+            np.add(group.patterns(Xt).T, offsets, out=index[:, column:column + len(group)])
+            column += len(group)
+        picks = sparse.csr_matrix((np.ones(index.size), index.ravel(),
+                                   np.arange(0, index.size + 1, self.n_tabulated)),
+                                  shape=(n_rows, len(self.table)))
+        return picks @ self.table
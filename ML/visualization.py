@@ -0,0 +1,128 @@
+"""
+Visualization helpers for StudentDropoutPredictor results.
+"""
+
+import pandas as pd
+from sklearn.metrics import confusion_matrix, roc_curve
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+
+def create_visualizations(predictor, results, X_test, y_test):
+    """
+    Create comprehensive visualizations for the ML model results.
+    """
+    
+    # 1. Model Comparison
+    model_names = list(results.keys())
+    auc_scores = [results[name]['auc_score'] for name in model_names]
+    cv_means = [results[name]['cv_mean'] for name in model_names]
+    
+    fig = make_subplots(
+        rows=2, cols=2,
+        subplot_titles=('Model AUC Comparison', 'ROC Curves', 'Feature Importance', 'Confusion Matrix'),
+        specs=[[{"secondary_y": False}, {"secondary_y": False}],
+               [{"secondary_y": False}, {"secondary_y": False}]]
+    )
+    
+    # Model comparison bar chart
+    fig.add_trace(
+        go.Bar(x=model_names, y=auc_scores, name='Test AUC', marker_color='lightblue'),
+        row=1, col=1
+    )
+    fig.add_trace(
+        go.Bar(x=model_names, y=cv_means, name='CV AUC', marker_color='lightgreen'),
+        row=1, col=1
+    )
+    
+    # ROC Curves
+    for name in model_names:
+        fpr, tpr, _ = roc_curve(results[name]['y_test'], results[name]['y_pred_proba'])
+        fig.add_trace(
+            go.Scatter(x=fpr, y=tpr, name=f'{name} (AUC: {results[name]["auc_score"]:.3f})', mode='lines'),
+            row=1, col=2
+        )
+    
+    # Diagonal line for random classifier
+    fig.add_trace(
+        go.Scatter(x=[0, 1], y=[0, 1], mode='lines', line=dict(dash='dash'), name='Random'),
+        row=1, col=2
+    )
+    
+    # Feature importance
+    importance_df = predictor.feature_importance_analysis()
+    if importance_df is not None:
+        top_features = importance_df.head(10)
+        fig.add_trace(
+            go.Bar(x=top_features['importance'], y=top_features['feature'], orientation='h'),
+            row=2, col=1
+        )
+    
+    # Confusion matrix for best model
+    best_model_name = max(results.keys(), key=lambda x: results[x]['auc_score'])
+    cm = confusion_matrix(results[best_model_name]['y_test'], results[best_model_name]['y_pred'])
+    
+    fig.add_trace(
+        go.Heatmap(z=cm, x=['Not Dropped', 'Dropped'], y=['Not Dropped', 'Dropped'], 
+                   colorscale='Blues', showscale=False),
+        row=2, col=2
+    )
+    
+    fig.update_layout(height=800, title_text="Student Dropout Prediction - Model Analysis")
+    fig.show()
+    
+    return fig
+
+def create_risk_analysis_dashboard(df, predictions, probabilities):
+    """
+    Create a dashboard for risk analysis.
+    """
+    # Add predictions to dataframe
+    df_viz = df.copy()
+    df_viz['predicted_dropout'] = predictions
+    df_viz['dropout_probability'] = probabilities
+    df_viz['risk_level'] = pd.cut(probabilities, bins=[0, 0.3, 0.7, 1.0], 
+                                  labels=['Low Risk', 'Medium Risk', 'High Risk'])
+    
+    fig = make_subplots(
+        rows=2, cols=2,
+        subplot_titles=('Risk Distribution', 'Attendance vs Assignment Grades', 
+                       'Risk by Attendance', 'Probability Distribution'),
+        specs=[[{"secondary_y": False}, {"secondary_y": False}],
+               [{"secondary_y": False}, {"secondary_y": False}]]
+    )
+    
+    # Risk distribution
+    risk_counts = df_viz['risk_level'].value_counts()
+    fig.add_trace(
+        go.Pie(labels=risk_counts.index, values=risk_counts.values, name="Risk Distribution"),
+        row=1, col=1
+    )
+    
+    # Attendance vs Assignment grades colored by risk
+    fig.add_trace(
+        go.Scatter(x=df_viz['avg_attendance'], y=df_viz['avg_assignment_grade'],
+                   mode='markers', marker=dict(color=df_viz['dropout_probability'], 
+                                             colorscale='Reds', size=8),
+                   text=df_viz['risk_level'], name="Students"),
+        row=1, col=2
+    )
+    
+    # Risk by attendance bins
+    attendance_bins = pd.cut(df_viz['avg_attendance'], bins=5)
+    risk_by_attendance = df_viz.groupby(attendance_bins)['dropout_probability'].mean()
+    fig.add_trace(
+        go.Bar(x=[str(x) for x in risk_by_attendance.index], y=risk_by_attendance.values),
+        row=2, col=1
+    )
+    
+    # Probability distribution
+    fig.add_trace(
+        go.Histogram(x=df_viz['dropout_probability'], nbinsx=20, name="Probability Distribution"),
+        row=2, col=2
+    )
+    
+    fig.update_layout(height=800, title_text="Student Dropout Risk Analysis Dashboard")
+    fig.show()
+    
+    return fig, df_viz